@@ -0,0 +1,225 @@
+"""End-to-end benchmark of the slide pipeline on one machine.
+
+Starts the api and slides_service with local stand-ins for the cloud
+services and the LLM (BACKEND=local, LLM_BACKEND=fake, RENDER_BACKEND=fake
+unless --real-render), then for every concurrency level and file size runs
+jobs through `POST /v1/slides`, follows each one on the SSE stream of
+`/v1/slides/{id}` and downloads both artifacts from `/v1/results/{id}`.
+
+Reports p50/p95/p99 of submission, time to first SSE event, time to
+completion and result download, plus completed jobs per second for this
+single api + slides_service instance pair, as JSON for comparing runs.
+
+Usage (from backend/api):
+    python -m benchmarks.e2e --concurrency 1 8 32 --sizes 16384 262144 --jobs-per-level 32 --output e2e.json
+    python -m benchmarks.e2e --url http://localhost:8080   # against already running services
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+from benchmarks.mixed_load import percentiles
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+WORDS = ["market", "growth", "customer", "revenue", "product", "risk", "plan", "team", "launch", "margin"]
+
+
+def sample_file(size: int, seed: int) -> tuple[str, bytes, str]:
+    """Markdown of about `size` bytes; distinct per job so no cache or dedupe hides work
+    """
+    rng = random.Random(seed)
+    paragraphs = [f"# Report {seed}"]
+    total = len(paragraphs[0])
+    while total < size:
+        paragraph = " ".join(rng.choice(WORDS) for _ in range(60))
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return f"report-{seed}.md", "\n\n".join(paragraphs).encode()[:size], "text/markdown"
+
+
+def start_services(args, workdir: str) -> list[subprocess.Popen]:
+    env = {
+        **os.environ,
+        "BACKEND": "local",
+        "LOCAL_DB_PATH": os.path.join(workdir, "jobs.db"),
+        "LOCAL_BLOB_ROOT": os.path.join(workdir, "blobs"),
+        "SLIDES_SERVICE_URL": f"http://127.0.0.1:{args.slides_port}",
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_SECONDS": str(args.llm_seconds),
+        "RESULT_CACHE_ENABLED": "false",
+        # Every job comes from one address; lane capacity still applies
+        "RATE_LIMIT_PER_MINUTE": "0",
+    }
+    if not args.real_render:
+        env.update({"RENDER_BACKEND": "fake", "FAKE_RENDER_SECONDS": str(args.render_seconds)})
+
+    processes = []
+    for service, port in (("slides_service", args.slides_port), ("api", args.api_port)):
+        cwd = os.path.join(BACKEND_DIR, service)
+        service_env = {**env, "PYTHONPATH": os.pathsep.join(filter(None, [cwd, os.environ.get("PYTHONPATH")]))}
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            cwd=cwd,
+            env=service_env,
+        ))
+    return processes
+
+
+async def wait_ready(urls: list[str], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        for url in urls:
+            while True:
+                try:
+                    if (await client.get(url)).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"{url} did not become ready")
+                await asyncio.sleep(0.2)
+
+
+async def run_job(client: httpx.AsyncClient, args, size: int, seed: int) -> dict:
+    sample = {"size": size}
+    start = time.perf_counter()
+    response = await client.post(
+        "/v1/slides",
+        data={"data": json.dumps({"theme": args.theme, "settings": {}})},
+        files=[("files", sample_file(size, seed))],
+    )
+    sample["submit"] = time.perf_counter() - start
+    if response.status_code != 202:
+        sample["error"] = f"submit HTTP {response.status_code}"
+        return sample
+    job_id = response.json()["id"]
+
+    status = None
+    async with client.stream("GET", f"/v1/slides/{job_id}", headers={"Accept": "text/event-stream"}) as stream:
+        event = None
+        async for line in stream.aiter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+                sample.setdefault("firstEvent", time.perf_counter() - start)
+            elif line.startswith("data:") and event in ("update", "close"):
+                status = json.loads(line[len("data:"):]).get("status", status)
+                if event == "close":
+                    break
+    sample["completion"] = time.perf_counter() - start
+    if status != "completed":
+        sample["error"] = f"job {status}"
+        return sample
+
+    for name, params in (("downloadHtml", {}), ("downloadPdf", {"download": "true"})):
+        download_start = time.perf_counter()
+        result = await client.get(f"/v1/results/{job_id}", params=params)
+        sample[name] = time.perf_counter() - download_start
+        if result.status_code != 200:
+            sample["error"] = f"{name} HTTP {result.status_code}"
+    return sample
+
+
+async def run_level(client: httpx.AsyncClient, args, concurrency: int, size: int, offset: int) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(seed: int) -> dict:
+        async with gate:
+            try:
+                return await run_job(client, args, size, seed)
+            except httpx.HTTPError as e:
+                return {"size": size, "error": str(e)}
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(one(offset + n) for n in range(args.jobs_per_level)))
+    elapsed = time.perf_counter() - start
+
+    completed = [sample for sample in samples if "error" not in sample]
+    errors = [sample["error"] for sample in samples if "error" in sample]
+    return {
+        "concurrency": concurrency,
+        "fileBytes": size,
+        "jobs": len(samples),
+        "completed": len(completed),
+        "errors": sorted(set(errors)),
+        "seconds": round(elapsed, 3),
+        "jobsPerSecond": round(len(completed) / elapsed, 3),
+        **{metric: percentiles([s[metric] for s in samples if metric in s])
+           for metric in ("submit", "firstEvent", "completion", "downloadHtml", "downloadPdf")},
+    }
+
+
+async def main_async(args) -> dict:
+    processes = []
+    url = args.url
+    workdir = tempfile.mkdtemp(prefix="ai-slider-e2e-")
+    if url is None:
+        processes = start_services(args, workdir)
+        url = f"http://127.0.0.1:{args.api_port}"
+
+    try:
+        await wait_ready([f"{url}/"] + ([f"http://127.0.0.1:{args.slides_port}/"] if processes else []), args.startup_timeout)
+
+        limits = httpx.Limits(max_connections=max(args.concurrency) * 2 + 10)
+        timeout = httpx.Timeout(args.timeout, read=None)
+        levels = []
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+            offset = 0
+            for size in args.sizes:
+                for concurrency in args.concurrency:
+                    levels.append(await run_level(client, args, concurrency, size, offset))
+                    offset += args.jobs_per_level
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "config": {
+            "url": url,
+            "spawned": bool(processes),
+            "llmSeconds": args.llm_seconds,
+            "renderSeconds": None if args.real_render else args.render_seconds,
+            "jobsPerLevel": args.jobs_per_level,
+        },
+        "levels": levels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Benchmark running services instead of starting local ones")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16 * 1024, 256 * 1024])
+    parser.add_argument("--jobs-per-level", type=int, default=16)
+    parser.add_argument("--theme", default="default")
+    parser.add_argument("--llm-seconds", type=float, default=1.0)
+    parser.add_argument("--render-seconds", type=float, default=0.3)
+    parser.add_argument("--real-render", action="store_true", help="Render with Marp instead of the fake renderer")
+    parser.add_argument("--api-port", type=int, default=18080)
+    parser.add_argument("--slides-port", type=int, default=18081)
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(main_async(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Latency of the API under mixed load.
+
+Keeps N SSE streams open on `/v1/slides/{id}` while submitting jobs to
+`POST /v1/slides` and polling `GET /v1/slides/{id}` as JSON, then reports
+latency percentiles for each request type. A blocking call in any handler
+shows up as a latency spike for every other request on the same worker.
+
+Usage (API running on localhost:8080):
+    python -m benchmarks.mixed_load --url http://localhost:8080 --streams 50 --submits 20 --polls 200
+"""
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+
+SAMPLE_FILE = ("spec.md", b"# Spec\n\n" + b"Lorem ipsum dolor sit amet. " * 200, "text/markdown")
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+    return {"count": len(ordered), "p50Ms": pick(0.50), "p95Ms": pick(0.95), "p99Ms": pick(0.99), "maxMs": round(ordered[-1] * 1000, 2)}
+
+
+async def submit(client: httpx.AsyncClient, theme: str) -> tuple[float, str | None]:
+    data = {"data": json.dumps({"theme": theme, "settings": {}})}
+    start = time.perf_counter()
+    response = await client.post("/v1/slides", data=data, files=[("files", SAMPLE_FILE)])
+    elapsed = time.perf_counter() - start
+    job_id = response.json().get("id") if response.status_code == 202 else None
+    return elapsed, job_id
+
+
+async def poll(client: httpx.AsyncClient, job_id: str) -> float:
+    start = time.perf_counter()
+    await client.get(f"/v1/slides/{job_id}")
+    return time.perf_counter() - start
+
+
+async def hold_stream(client: httpx.AsyncClient, job_id: str, first_event: list[float], stop: asyncio.Event) -> None:
+    start = time.perf_counter()
+    try:
+        async with client.stream("GET", f"/v1/slides/{job_id}", headers={"Accept": "text/event-stream"}) as response:
+            seen = False
+            async for line in response.aiter_lines():
+                if not seen and line.startswith("event:"):
+                    first_event.append(time.perf_counter() - start)
+                    seen = True
+                if stop.is_set():
+                    break
+    except httpx.HTTPError:
+        pass
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.streams + args.parallel * 2)
+    timeout = httpx.Timeout(args.timeout, read=None)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        # Jobs for the SSE streams to watch
+        seeds = await asyncio.gather(*(submit(client, args.theme) for _ in range(min(args.streams, args.seed_jobs) or 1)))
+        seed_ids = [job_id for _, job_id in seeds if job_id]
+        if not seed_ids:
+            raise SystemExit("Could not create any job to watch")
+
+        stop = asyncio.Event()
+        first_event: list[float] = []
+        streams = [asyncio.create_task(hold_stream(client, seed_ids[i % len(seed_ids)], first_event, stop)) for i in range(args.streams)]
+        await asyncio.sleep(args.settle)
+
+        submit_latency: list[float] = []
+        poll_latency: list[float] = []
+        gate = asyncio.Semaphore(args.parallel)
+
+        async def one_submit():
+            async with gate:
+                elapsed, _ = await submit(client, args.theme)
+                submit_latency.append(elapsed)
+
+        async def one_poll(i: int):
+            async with gate:
+                poll_latency.append(await poll(client, seed_ids[i % len(seed_ids)]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one_submit() for _ in range(args.submits)], *[one_poll(i) for i in range(args.polls)])
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        for stream in streams:
+            stream.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+
+    return {
+        "streams": args.streams,
+        "seconds": round(elapsed, 3),
+        "submit": percentiles(submit_latency),
+        "poll": percentiles(poll_latency),
+        "sseFirstEvent": percentiles(first_event),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--theme", default="default")
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--seed-jobs", type=int, default=10)
+    parser.add_argument("--submits", type=int, default=20)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--parallel", type=int, default=10)
+    parser.add_argument("--settle", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Per-stage micro benchmarks for the api's upload path.
+
+Times the request-side stages of `POST /v1/slides` in isolation against
+the local blob store: hashing uploads for the result cache (content_key)
+and streaming them to storage (QueueService.upload_files_to_gcs), for
+each file size and file count. Prints one JSON object with p50/p95/p99.
+
+Usage (from backend/api):
+    python -m benchmarks.stages --iterations 20 --sizes 16384 1048576 8388608 --files 1 4
+"""
+import os
+import io
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+from starlette.datastructures import Headers, UploadFile
+
+WORKDIR = tempfile.mkdtemp(prefix="ai-slider-stages-")
+os.environ.setdefault("BACKEND", "local")
+os.environ.setdefault("LOCAL_DB_PATH", os.path.join(WORKDIR, "jobs.db"))
+os.environ.setdefault("LOCAL_BLOB_ROOT", os.path.join(WORKDIR, "blobs"))
+
+from benchmarks.mixed_load import percentiles
+from services.queue import QueueService
+from services.result_cache import content_key
+
+
+def uploads(size: int, count: int) -> list[UploadFile]:
+    return [
+        UploadFile(io.BytesIO(os.urandom(size)), filename=f"doc-{n}.pdf", headers=Headers({"content-type": "application/pdf"}))
+        for n in range(count)
+    ]
+
+
+async def measure(fn, prepare, iterations: int) -> dict:
+    samples = []
+    for n in range(iterations):
+        argument = prepare(n)
+        start = time.perf_counter()
+        await fn(argument)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+async def run(args) -> list[dict]:
+    queue_service = QueueService()
+    results = []
+
+    for size in args.sizes:
+        for count in args.files:
+            variant = {"fileBytes": size, "files": count}
+            files = uploads(size, count)
+
+            async def hash_files(_):
+                await content_key("default", {}, files)
+
+            results.append({"stage": "content_key", **variant, **await measure(hash_files, lambda n: None, args.iterations)})
+
+            async def upload(job_id):
+                for file in files:
+                    await file.seek(0)
+                await queue_service.upload_files_to_gcs(job_id, files)
+
+            results.append({"stage": "upload_files", **variant, **await measure(upload, lambda n: f"bench-{size}-{count}-{n}", args.iterations)})
+
+            for n in range(args.iterations):
+                await queue_service.delete_job_files(f"bench-{size}-{count}-{n}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16 * 1024, 1024 * 1024, 8 * 1024 * 1024])
+    parser.add_argument("--files", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    print(json.dumps({"stages": asyncio.run(run(args))}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
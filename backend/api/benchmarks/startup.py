@@ -0,0 +1,193 @@
+"""Cold-start benchmark of the api and slides_service.
+
+For each service, in fresh interpreters:
+  * import time of `main` (median of --runs), with the packages that took
+    longest according to `python -X importtime`;
+  * time to first byte: from spawning uvicorn until the health check
+    (`GET /`) answers, then the latency of the first request that needs
+    the backends (`GET /v1/slides/{id}` for an unknown job on the api).
+
+Services run with local stand-ins by default (BACKEND=local, LLM_BACKEND=fake,
+RENDER_BACKEND=fake); pass --backend gcp to time the Google clients too.
+Prints one JSON object. With --baseline, exits with status 1 when a metric is
+more than --tolerance slower than the saved run; --max-import-seconds and
+--max-first-byte-seconds set absolute limits.
+
+Usage (from backend/api):
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --baseline startup.json --tolerance 0.25
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+import httpx
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMPORT_SCRIPT = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+# First request on each service that goes past the health check
+FIRST_REQUESTS = {"api": "/v1/slides/startup-probe", "slides_service": "/metrics"}
+COMPARED = ("importSeconds", "firstByteSeconds", "firstRequestSeconds")
+
+
+def service_env(args, service: str, workdir: str) -> dict:
+    cwd = os.path.join(BACKEND_DIR, service)
+    env = {
+        **os.environ,
+        "BACKEND": args.backend,
+        "LOCAL_DB_PATH": os.path.join(workdir, "jobs.db"),
+        "LOCAL_BLOB_ROOT": os.path.join(workdir, "blobs"),
+        "LLM_BACKEND": "fake",
+        "RENDER_BACKEND": "fake",
+        "PYTHONPATH": os.pathsep.join(filter(None, [cwd, os.environ.get("PYTHONPATH")])),
+    }
+    if args.no_warmup:
+        env["WARMUP_ENABLED"] = "false"
+    return env
+
+
+def import_seconds(service: str, env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=os.path.join(BACKEND_DIR, service), env=env, capture_output=True, text=True, check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(service: str, env: dict, count: int) -> list[dict]:
+    """Packages by the import time spent in their own modules, from `python -X importtime`
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=os.path.join(BACKEND_DIR, service), env=env, capture_output=True, text=True, check=True,
+    )
+    packages: dict[str, int] = {}
+    for line in output.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:count]
+    return [{"package": package, "ms": round(us / 1000, 1)} for package, us in ranked]
+
+
+def first_byte(service: str, env: dict, port: int, timeout: float) -> dict:
+    """Spawn uvicorn and poll the health check until it answers
+    """
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.join(BACKEND_DIR, service),
+        env=env,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=timeout) as client:
+            while True:
+                try:
+                    if client.get("/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None:
+                    raise SystemExit(f"{service} exited with status {process.returncode}")
+                if time.perf_counter() - start > timeout:
+                    raise SystemExit(f"{service} did not answer within {timeout}s")
+                time.sleep(0.005)
+            sample = {"firstByteSeconds": time.perf_counter() - start}
+
+            request_start = time.perf_counter()
+            response = client.get(FIRST_REQUESTS[service])
+            sample["firstRequestSeconds"] = time.perf_counter() - request_start
+            sample["firstRequestStatus"] = response.status_code
+        return sample
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def measure(args, service: str, port: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="ai-slider-startup-")
+    try:
+        env = service_env(args, service, workdir)
+        imports = [import_seconds(service, env) for _ in range(args.runs)]
+        starts = [first_byte(service, env, port, args.timeout) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "service": service,
+        "importSeconds": round(statistics.median(imports), 4),
+        "firstByteSeconds": round(statistics.median(sample["firstByteSeconds"] for sample in starts), 4),
+        "firstRequestSeconds": round(statistics.median(sample["firstRequestSeconds"] for sample in starts), 4),
+        "firstRequestStatus": starts[-1]["firstRequestStatus"],
+        "slowestImports": slowest_imports(service, env, args.top),
+    }
+
+
+def regressions(results: list[dict], args) -> list[str]:
+    problems = []
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result["service"]: result for result in json.load(f)["results"]}
+
+    for result in results:
+        service = result["service"]
+        if args.max_import_seconds and result["importSeconds"] > args.max_import_seconds:
+            problems.append(f"{service}: import took {result['importSeconds']}s, limit {args.max_import_seconds}s")
+        if args.max_first_byte_seconds and result["firstByteSeconds"] > args.max_first_byte_seconds:
+            problems.append(f"{service}: first byte after {result['firstByteSeconds']}s, limit {args.max_first_byte_seconds}s")
+        previous = baseline.get(service)
+        if previous is None:
+            continue
+        for metric in COMPARED:
+            # Small absolute differences are noise, whatever their ratio
+            limit = max(previous[metric] * (1 + args.tolerance), previous[metric] + args.min_delta)
+            if result[metric] > limit:
+                problems.append(f"{service}: {metric} {result[metric]}s, baseline {previous[metric]}s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", choices=sorted(FIRST_REQUESTS), default=["api", "slides_service"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--backend", choices=["local", "gcp"], default="local")
+    parser.add_argument("--no-warmup", action="store_true", help="Start with WARMUP_ENABLED=false")
+    parser.add_argument("--port", type=int, default=18280)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--top", type=int, default=8, help="Slowest imported packages to report")
+    parser.add_argument("--baseline", help="Earlier --output of this benchmark to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Slowdowns below this many seconds are ignored")
+    parser.add_argument("--max-import-seconds", type=float, default=0.0)
+    parser.add_argument("--max-first-byte-seconds", type=float, default=0.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = [measure(args, service, args.port + n) for n, service in enumerate(args.services)]
+    report = {"config": {"runs": args.runs, "backend": args.backend, "warmup": not args.no_warmup}, "results": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    problems = regressions(results, args)
+    for problem in problems:
+        print(f"Regression: {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Bulk status lookup against one lookup per job.
+
+Seeds N jobs (half of them completed, with a results document) in the
+local job store, then compares `QueueService.get_jobs(ids)` with N
+concurrent `get_job_by_id` calls, as a dashboard polling each job would
+make. Every job store call waits `--rtt-ms` first, to stand in for the
+Firestore round trip. Prints one JSON object with latency percentiles and
+the number of job store reads per lookup.
+
+Usage (from backend/api):
+    python -m benchmarks.status --jobs 10 50 200 --iterations 20 --rtt-ms 8
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="ai-slider-status-")
+os.environ.setdefault("BACKEND", "local")
+os.environ.setdefault("LOCAL_DB_PATH", os.path.join(WORKDIR, "jobs.db"))
+os.environ.setdefault("LOCAL_BLOB_ROOT", os.path.join(WORKDIR, "blobs"))
+
+from benchmarks.mixed_load import percentiles
+from services.backends import Write
+from services.queue import QueueService
+
+
+class RoundTripStore:
+
+
+    def __init__(self, store, rtt: float):
+        """Adds a fixed delay to every read of `store` and counts the reads
+        """
+        self.store = store
+        self.rtt = rtt
+        self.reads = 0
+
+
+    async def get(self, collection: str, doc_id: str):
+        self.reads += 1
+        await asyncio.sleep(self.rtt)
+        return await self.store.get(collection, doc_id)
+
+
+    async def get_many(self, collection: str, doc_ids: list[str]):
+        self.reads += 1
+        await asyncio.sleep(self.rtt)
+        return await self.store.get_many(collection, doc_ids)
+
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+async def seed(queue_service: QueueService, count: int) -> list[str]:
+    now = int(time.time())
+    job_ids = [f"status-bench-{count}-{n}" for n in range(count)]
+    writes = []
+    for n, job_id in enumerate(job_ids):
+        status = "completed" if n % 2 == 0 else "processing"
+        writes.append(Write("set", "jobs", job_id, {
+            "id": job_id, "status": status, "message": status, "createdAt": now, "updatedAt": now,
+        }))
+        if status == "completed":
+            writes.append(Write("set", "results", job_id, {"id": job_id, "resultUrl": f"/results/{job_id}"}))
+    await queue_service.store.commit(writes)
+    return job_ids
+
+
+async def measure(store: RoundTripStore, lookup, iterations: int) -> dict:
+    samples = []
+    store.reads = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await lookup()
+        samples.append(time.perf_counter() - start)
+    return {**percentiles(samples), "readsPerLookup": store.reads / iterations}
+
+
+async def run(args) -> list[dict]:
+    queue_service = QueueService()
+    results = []
+    for count in args.jobs:
+        job_ids = await seed(queue_service, count)
+        store = RoundTripStore(queue_service.store, args.rtt_ms / 1000)
+        queue_service.backends.store = store
+
+        async def individual():
+            await asyncio.gather(*(queue_service.get_job_by_id(job_id) for job_id in job_ids))
+
+        async def bulk():
+            await queue_service.get_jobs(job_ids)
+
+        results.append({"jobs": count, "lookup": "individual", **await measure(store, individual, args.iterations)})
+        results.append({"jobs": count, "lookup": "bulk", **await measure(store, bulk, args.iterations)})
+        queue_service.backends.store = store.store
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=8.0)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(json.dumps({"config": {"rttMs": args.rtt_ms, "iterations": args.iterations}, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
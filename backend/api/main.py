@@ -1,13 +1,60 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from routers import slides
+from services.sweeper import ExpirySweeper
+from utils.limits import MAX_BATCH_REQUEST_BYTES, MAX_REQUEST_BYTES, MULTIPART_OVERHEAD_BYTES, BodySizeLimitMiddleware
+from utils.telemetry import TRACE_HEADER, metrics_response
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweepers = []
+
+    async def start_background_work():
+        # Cloud clients are created while the instance already answers requests;
+        # WARMUP_ENABLED=false leaves them to the first request that needs them
+        if os.getenv("WARMUP_ENABLED", "true").lower() == "true":
+            await slides.service.warm_up()
+        # Deletes expired jobs/results and orphaned uploads; SWEEPER_ENABLED=false leaves it to another instance
+        if os.getenv("SWEEPER_ENABLED", "true").lower() == "true":
+            try:
+                sweeper = ExpirySweeper(slides.service.store, slides.service.blobs)
+            except Exception as e:
+                logging.error(f"Expiry sweeper not started: {e}")
+                return
+            sweeper.start()
+            sweepers.append(sweeper)
+
+    startup = asyncio.create_task(start_background_work())
+    yield
+    startup.cancel()
+    await asyncio.gather(startup, return_exceptions=True)
+    for sweeper in sweepers:
+        await sweeper.stop()
+
 
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=MAX_REQUEST_BYTES + MULTIPART_OVERHEAD_BYTES,
+    paths=("/v1/slides",),
+)
+
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=MAX_BATCH_REQUEST_BYTES + MULTIPART_OVERHEAD_BYTES,
+    paths=("/v1/slides/batch",),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +63,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[TRACE_HEADER, "ETag"],
 )
 
 app.include_router(slides.router, prefix="/v1")
@@ -23,3 +71,8 @@ app.include_router(slides.router, prefix="/v1")
 @app.get("/")
 def health_check():
     return {"message": "API Server is alive"}
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
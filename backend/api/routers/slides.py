@@ -1,35 +1,34 @@
 import os
 import json
+import time
 import logging
-import mimetypes
 from typing import Optional
 
-from fastapi import APIRouter, Form, HTTPException, Query, Request, Response, UploadFile, File as FastAPIFile
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi import APIRouter, Form, Header, HTTPException, Query, Request, Response, UploadFile, File as FastAPIFile
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 
-from models.slide import  File, FirestoreResult, Job, SlideRequest, SlideResponse
+from models.slide import Job, SlideRequest, SlideResponse
 from utils.mime import validate_file_type
+from utils.limits import UploadTooLargeError
+from utils.ranges import parse_range
+from utils.http_cache import choose_encoding, content_etag, etag_matches
+from utils.telemetry import TRACE_HEADER, new_trace_id
 from services.queue import QueueService
+from services.hub import changed_since
+from services.admission import AdmissionRejected
+from services.batch import MAX_BATCH_JOBS, MAX_STATUS_IDS, assign_files
 
 
 router = APIRouter()
 
-service = QueueService()
+# Presets of the slides service's artifact optimization (services/slides/optimize.py there)
+ARTIFACT_QUALITIES = ("original", "lossless", "standard", "compact")
 
-@router.post("/slides")
-async def generate_slides(
-    data: str = Form(...),
-    files: list[UploadFile] = FastAPIFile(...)
-):
-    # Parse JSON from the 'data' form field
-    try:
-        req_data = json.loads(data)
-        slide_req = SlideRequest(**req_data)
-    except Exception as e:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Invalid request format: {str(e)}")
+service = QueueService()
 
+def validate_slide_request(slide_req: SlideRequest, files: list[UploadFile]) -> None:
+    """Raise HTTPException (400) for an unsupported theme, setting or file
+    """
     if slide_req.theme not in SlideRequest.valid_themes:
         raise HTTPException(
             status_code=400, 
@@ -45,36 +44,80 @@ async def generate_slides(
             status_code=400, 
             detail=f"Invalid audience: {slide_req.settings.audience}. Supported values are: {', '.join(SlideRequest.valid_audiences)}")
 
+    # getattr: SlideSettings models that do not declare artifactQuality leave it out
+    quality = getattr(slide_req.settings, "artifactQuality", None)
+    if quality and quality not in ARTIFACT_QUALITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid artifactQuality: {quality}. Supported values are: {', '.join(ARTIFACT_QUALITIES)}")
+
     if not files:
         raise HTTPException(
             status_code=400, 
             detail="No files uploaded")
 
-    file_data_list = []
     for file in files:
-        try:
-            content = await file.read()
-            mime_type = mimetypes.guess_type(file.filename)[0] or "application/octet-stream"
-            if not validate_file_type(file.filename):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Unsupported file type: {file.filename}. Only PDF, Markdown, and TXT files are allowed")
-
-            file_data_list.append(File(filename=file.filename, data=content, type=mime_type))
-        except Exception as e:
+        if not validate_file_type(file.filename):
             raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to read file {file.filename}: {str(e)}")
+                status_code=400, 
+                detail=f"Unsupported file type: {file.filename}. Only PDF, Markdown, and TXT files are allowed")
+
+
+def admission_response(e: AdmissionRejected, trace_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"detail": str(e), "retryAfter": e.retry_after, "estimatedWaitSeconds": e.retry_after},
+        headers={"Retry-After": str(e.retry_after), TRACE_HEADER: trace_id})
+
+
+def client_id(request: Request) -> str:
+    """Client address for rate limiting. Cloud Run's proxy appends it to X-Forwarded-For,
+       so the last entry is the one the client cannot forge
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
 
-    # Add Job to Queue
+
+@router.post("/slides")
+async def generate_slides(
+    request: Request,
+    data: str = Form(...),
+    files: list[UploadFile] = FastAPIFile(...),
+    trace_id: Optional[str] = Header(None, alias=TRACE_HEADER),
+):
+    # Parse JSON from the 'data' form field
+    try:
+        req_data = json.loads(data)
+        slide_req = SlideRequest(**req_data)
+        # Opt out of the result cache to force a fresh generation
+        no_cache = bool(req_data.get("noCache", False))
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid request format: {str(e)}")
+
+    validate_slide_request(slide_req, files)
+
+    # Add Job to Queue (files are streamed to GCS, not read into memory)
+    trace_id = trace_id or new_trace_id()
     try:
-        job : Job = service.add_job(slide_req.theme, file_data_list, slide_req.settings)
+        job : Job = await service.add_job(
+            slide_req.theme, files, slide_req.settings,
+            use_cache=not no_cache, trace_id=trace_id, client_id=client_id(request))
+    except AdmissionRejected as e:
+        return admission_response(e, trace_id)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=413, 
+            detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=503, 
             detail=str(e))
 
-    logging.info(f"Received slide generation request: Theme: {slide_req.theme}, Files count: {len(file_data_list)}, Settings: {slide_req.settings}")
+    logging.info(f"Received slide generation request: Theme: {slide_req.theme}, Files count: {len(files)}, Settings: {slide_req.settings}")
 
     return JSONResponse(
         status_code=202,
@@ -84,31 +127,176 @@ async def generate_slides(
             message=job.message,
             createdAt=job.createdAt,
             updatedAt=job.updatedAt
-        ).model_dump()
+        ).model_dump(),
+        headers={TRACE_HEADER: trace_id},
+    )
+
+
+@router.post("/slides/batch")
+async def generate_slides_batch(
+    request: Request,
+    data: str = Form(...),
+    files: list[UploadFile] = FastAPIFile(...),
+    trace_id: Optional[str] = Header(None, alias=TRACE_HEADER),
+):
+    """Create many jobs in one request. `data` is {"jobs": [{"theme", "settings", "files", "noCache"}, ...]}
+       where `files` lists the indices of the job's uploads in the `files` form field.
+       Returns the batch ID and, in request order, each job's ID or the error that rejected it.
+    """
+    try:
+        specs = json.loads(data)["jobs"]
+        if not isinstance(specs, list) or not specs:
+            raise ValueError("jobs must be a non-empty list")
+        if len(specs) > MAX_BATCH_JOBS:
+            raise ValueError(f"At most {MAX_BATCH_JOBS} jobs are accepted per batch")
+        assigned = assign_files(specs, len(files))
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request format: {str(e)}")
+
+    # Invalid jobs are reported in their place instead of failing the whole batch
+    items: list[dict | None] = [None] * len(specs)
+    valid, job_specs = [], []
+    for index, (spec, indices) in enumerate(zip(specs, assigned)):
+        job_files = [files[i] for i in indices]
+        try:
+            slide_req = SlideRequest(**spec)
+            validate_slide_request(slide_req, job_files)
+        except HTTPException as e:
+            items[index] = {"index": index, "statusCode": e.status_code, "error": e.detail}
+            continue
+        except Exception as e:
+            items[index] = {"index": index, "statusCode": 400, "error": f"Invalid request format: {str(e)}"}
+            continue
+        valid.append(index)
+        job_specs.append((slide_req.theme, job_files, slide_req.settings, not bool(spec.get("noCache", False))))
+
+    trace_id = trace_id or new_trace_id()
+    try:
+        batch_id, results = await service.add_jobs(job_specs, trace_id=trace_id, client_id=client_id(request))
+    except AdmissionRejected as e:
+        return admission_response(e, trace_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e))
+
+    for index, result in zip(valid, results):
+        if isinstance(result, AdmissionRejected):
+            items[index] = {"index": index, "statusCode": result.status_code, "error": str(result), "retryAfter": result.retry_after}
+        elif isinstance(result, UploadTooLargeError):
+            items[index] = {"index": index, "statusCode": 413, "error": str(result)}
+        elif isinstance(result, Exception):
+            items[index] = {"index": index, "statusCode": 503, "error": str(result)}
+        else:
+            items[index] = {"index": index, "id": result.id, "status": result.status.value, "message": result.message}
+
+    logging.info(f"Received batch {batch_id}: {len(valid)} of {len(specs)} jobs valid, files count: {len(files)}")
+
+    return JSONResponse(
+        status_code=202,
+        content={"batchId": batch_id, "jobs": items},
+        headers={TRACE_HEADER: trace_id},
     )
+
+
+@router.get("/slides")
+async def get_slide_statuses(ids: str = Query(...)):
+    """Status of many jobs at once; `ids` is a comma separated list of job IDs
+    """
+    return await job_statuses([job_id.strip() for job_id in ids.split(",") if job_id.strip()])
+
+
+@router.post("/slides/status")
+async def post_slide_statuses(request: Request):
+    """Same as GET /slides?ids=, for lists too long for a URL: the body is {"ids": [...]}
+    """
+    try:
+        ids = (await request.json())["ids"]
+        if not isinstance(ids, list) or not all(isinstance(job_id, str) for job_id in ids):
+            raise ValueError("ids must be a list of strings")
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid request format: {str(e)}")
+    return await job_statuses(ids)
+
+
+async def job_statuses(ids: list[str]) -> JSONResponse:
+    if not ids:
+        raise HTTPException(status_code=400, detail="No job IDs given")
+    if len(ids) > MAX_STATUS_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STATUS_IDS} job IDs are accepted per request")
+    try:
+        jobs = await service.get_jobs(ids)
+    except Exception as e:
+        logging.error(f"Bulk status lookup of {len(ids)} jobs failed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse({"jobs": jobs})
+
+
+@router.get("/slides/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Status of every job of a batch
+    """
+    batch = await service.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return JSONResponse(batch)
+
              
+def status_body(job: dict) -> dict:
+    status = job["status"]
+    return {
+        "id": job["id"],
+        "status": getattr(status, "value", status),
+        "message": job["message"],
+        "resultUrl": job["resultUrl"],
+        "updatedAt": job["updatedAt"],
+        "progress": job["progress"],
+        "preview": job["preview"],
+    }
+
+
 @router.get("/slides/{id}")
 async def stream_slide_status(
     request: Request, 
-    id: str
+    id: str,
+    since: Optional[int] = Query(None),
+    wait: float = Query(0),
 ):
     """Returns slide status via SSE or JSON. 
        Closes stream when job is completed or failed.
+       A JSON request with If-None-Match (the ETag of an earlier response) or `since` (its updatedAt)
+       is answered with 304 while nothing changed; with `wait` it is held up to that many seconds
+       until the job changes, as a long-poll alternative to SSE.
     """
-    job : Job = service.get_job_by_id(id)
+    accept_header = request.headers.get("Accept", "")
+    if_none_match = request.headers.get("If-None-Match")
+
+    if "text/event-stream" not in accept_header and (if_none_match is not None or since is not None):
+        def unchanged(state: dict) -> bool:
+            if if_none_match is not None:
+                return etag_matches(if_none_match, content_etag(status_body(state)))
+            return not changed_since(status_body(state), since)
+
+        state = await service.poll_job(request, id, unchanged, max(wait, 0))
+        if state is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        body = status_body(state)
+        headers = {"ETag": content_etag(body), "Cache-Control": "no-cache"}
+        if unchanged(state):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(body, headers=headers)
+
+    job = await service.get_job_by_id(id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    accept_header = request.headers.get("Accept", "")
-    
     if "text/event-stream" not in accept_header:
-        return JSONResponse({
-            "id": job.id,
-            "status": job.status,
-            "message": job.message,
-            "resultUrl": job.resultUrl,
-            "updatedAt": job.updatedAt
-        })  
+        body = status_body(job)
+        return JSONResponse(body, headers={"ETag": content_etag(body), "Cache-Control": "no-cache"})
 
     return StreamingResponse(
         service.stream_events(request, id),
@@ -124,29 +312,83 @@ async def stream_slide_status(
     
 @router.get("/results/{id}") 
 async def get_slide_result(
+    request: Request,
     id: str, 
-    download: Optional[bool] = Query(False)
+    download: Optional[bool] = Query(False),
+    redirect: Optional[bool] = Query(None)
 ):
-    """Returns slide result (PDF or HTML).  
-       Automatically deletes the result if it is expired.
+    """Returns slide result (PDF or HTML), streamed from GCS with HTTP Range support.  
+       With `redirect` (or RESULT_REDIRECT=true) answers with a short-lived signed URL instead.
+       An expired result is answered with 404 (reads only compare `expiresAt`);
+       the background ExpirySweeper deletes it.
     """
     try:
-        result : FirestoreResult = service.get_result_by_id(id)
+        result = await service.get_result_by_id(id)
     except Exception as e:
         raise HTTPException(
             status_code=404, 
             detail=f"Result not found: {e}")
-    
-    if download:
-        return Response(
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=presentation-{id}.pdf"
-            },
-            content=result.pdfData
-        )
-    else:
-        return HTMLResponse(
-            status_code=200, 
-            content=result.htmlData)
-        
\ No newline at end of file
+
+    artifact = result.get("pdf") if download else result.get("html")
+    if not artifact:
+        raise HTTPException(
+            status_code=404, 
+            detail="Result not found: artifact is missing")
+
+    filename = f"presentation-{id}.pdf" if download else None
+
+    if redirect is None:
+        redirect = os.getenv("RESULT_REDIRECT", "false").lower() == "true"
+
+    if redirect:
+        try:
+            url = await service.signed_result_url(artifact["path"], filename)
+        except Exception as e:
+            logging.warning(f"Failed to sign result URL for {id}, streaming instead: {e}")
+        else:
+            return RedirectResponse(url, status_code=307)
+
+    headers = {"Accept-Ranges": "bytes"}
+    if filename:
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+    # Results are immutable until they expire, so clients may cache them for the remaining lifetime
+    max_age = max(int(result.get("expiresAt", 0)) - int(time.time()), 0)
+    headers["Cache-Control"] = f"private, max-age={max_age}, immutable"
+
+    media_type = artifact["contentType"]
+    encodings = artifact.get("encodings") or {}
+    if encodings:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"), encodings)
+        if encoding:
+            artifact = encodings[encoding]
+            headers["Content-Encoding"] = encoding
+
+    if artifact.get("sha256"):
+        # Strong validator per representation: each encoding has its own digest
+        headers["ETag"] = f'"{artifact["sha256"]}"'
+        if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+            not_modified = {key: value for key, value in headers.items() if key in ("ETag", "Cache-Control", "Vary")}
+            return Response(status_code=304, headers=not_modified)
+
+    size = artifact["size"]
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        service.stream_result(artifact["path"], start, end, size, int(result.get("expiresAt", 0))),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
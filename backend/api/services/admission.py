@@ -0,0 +1,160 @@
+import os
+import math
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+
+from fastapi import UploadFile
+
+from services.backends import DocumentStore
+
+
+LANES = ("interactive", "batch")
+# Single small files go to the interactive lane, everything else waits in the batch lane
+INTERACTIVE_MAX_FILES = int(os.getenv("INTERACTIVE_MAX_FILES", "1"))
+INTERACTIVE_MAX_BYTES = int(os.getenv("INTERACTIVE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Queued plus processing jobs allowed per lane across all api instances
+LANE_CAPACITY = {
+    "interactive": int(os.getenv("ADMISSION_MAX_ACTIVE_INTERACTIVE", "64")),
+    "batch": int(os.getenv("ADMISSION_MAX_ACTIVE_BATCH", "16")),
+}
+# Typical seconds a job of each lane holds its slot, for Retry-After estimates
+LANE_JOB_SECONDS = {
+    "interactive": float(os.getenv("ADMISSION_INTERACTIVE_JOB_SECONDS", "30")),
+    "batch": float(os.getenv("ADMISSION_BATCH_JOB_SECONDS", "90")),
+}
+
+# Per-client token bucket: RATE_LIMIT_PER_MINUTE refill, RATE_LIMIT_BURST capacity; 0 disables it
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+
+# Lane depth is counted in the job store at most this often per instance
+DEPTH_REFRESH_SECONDS = float(os.getenv("ADMISSION_REFRESH_SECONDS", "2"))
+MAX_RETRY_AFTER_SECONDS = 300
+
+
+class AdmissionRejected(Exception):
+
+
+    def __init__(self, status_code: int, message: str, retry_after: int):
+        """Request turned away before any work: 429 for a client over its rate, 503 for a full lane.
+           `retry_after` is also the estimated wait in seconds.
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def job_lane(files: list[UploadFile]) -> str:
+    total = sum(file.size or 0 for file in files)
+    return "interactive" if len(files) <= INTERACTIVE_MAX_FILES and total <= INTERACTIVE_MAX_BYTES else "batch"
+
+
+def take_token(bucket: Optional[dict], now: float, rate_per_minute: float, burst: float) -> dict:
+    """Refill the bucket for the time since its last use and take one token if there is one
+    """
+    tokens = burst
+    if bucket is not None:
+        tokens = min(burst, bucket["tokens"] + (now - bucket["updatedAt"]) * rate_per_minute / 60)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    # A bucket that has refilled completely carries no state and may be swept
+    refill_seconds = (burst - tokens) * 60 / rate_per_minute
+    return {"tokens": tokens, "updatedAt": now, "allowed": allowed, "expiresAt": int(now + refill_seconds) + 1}
+
+
+class AdmissionController:
+
+
+    def __init__(self, store: DocumentStore):
+        """Admission control for new jobs, with all counters in the job store so limits hold across instances.
+           Buckets live in `rate_limits`; lane depth is counted from `jobs` by their `lane` and status.
+        """
+        self.store = store
+        self.enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.stats = {"admitted": 0, "rateLimited": 0, "overloaded": 0}
+
+        self._depth = {lane: 0 for lane in LANES}
+        # Jobs this instance admitted since the last count, so a burst cannot overshoot between counts
+        self._admitted = {lane: 0 for lane in LANES}
+        self._counted_at = float("-inf")
+        self._count_lock: Optional[asyncio.Lock] = None
+
+
+    async def check_rate(self, client_id: str) -> None:
+        """Take a token from the client's bucket or raise AdmissionRejected (429)
+        """
+        if not self.enabled or RATE_LIMIT_PER_MINUTE <= 0:
+            return
+        key = hashlib.sha256(client_id.encode()).hexdigest()[:32]
+        try:
+            bucket = await self.store.transact(
+                "rate_limits", key, lambda current: take_token(current, time.time(), RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST))
+        except Exception as e:
+            # An unavailable job store fails the job itself later; do not reject on its account here
+            logging.warning(f"Rate limit check failed for {key}: {e}")
+            return
+
+        if not bucket["allowed"]:
+            self.stats["rateLimited"] += 1
+            retry_after = math.ceil((1 - bucket["tokens"]) * 60 / RATE_LIMIT_PER_MINUTE)
+            raise AdmissionRejected(429, "Too many requests, please retry later", min(max(retry_after, 1), MAX_RETRY_AFTER_SECONDS))
+
+
+    async def check_capacity(self, lane: str) -> None:
+        """Reserve a slot in `lane` or raise AdmissionRejected (503) with the estimated wait
+        """
+        if not self.enabled:
+            return
+        try:
+            depth = await self.active_jobs(lane)
+        except Exception as e:
+            logging.warning(f"Failed to count active {lane} jobs: {e}")
+            return
+
+        capacity = LANE_CAPACITY[lane]
+        if depth >= capacity:
+            self.stats["overloaded"] += 1
+            raise AdmissionRejected(503, f"The {lane} queue is full, please retry later", self.estimated_wait(lane, depth))
+
+        self._admitted[lane] += 1
+        self.stats["admitted"] += 1
+
+
+    async def active_jobs(self, lane: str) -> int:
+        if time.monotonic() - self._counted_at >= DEPTH_REFRESH_SECONDS:
+            if self._count_lock is None:
+                self._count_lock = asyncio.Lock()
+            async with self._count_lock:
+                # Another request may have refreshed the counts while this one waited
+                if time.monotonic() - self._counted_at >= DEPTH_REFRESH_SECONDS:
+                    await self._count()
+        return self._depth[lane] + self._admitted[lane]
+
+
+    async def _count(self) -> None:
+        # A processing job only holds a slot while its worker renews the lease; the sweeper fails one whose worker died
+        active = (
+            (("status", "==", "queued"),),
+            (("status", "==", "processing"), ("lease.expiresAt", ">", time.time())),
+        )
+        pairs = [(lane, conditions) for lane in LANES for conditions in active]
+        counts = await asyncio.gather(*(self.store.count("jobs", ("lane", "==", lane), *conditions) for lane, conditions in pairs))
+        depth = {lane: 0 for lane in LANES}
+        for (lane, _), count in zip(pairs, counts):
+            depth[lane] += count
+        self._depth = depth
+        self._admitted = {lane: 0 for lane in LANES}
+        self._counted_at = time.monotonic()
+
+
+    def estimated_wait(self, lane: str, depth: int) -> int:
+        """Seconds until a slot frees up, assuming the lane's jobs finish at capacity / job seconds
+        """
+        capacity = max(LANE_CAPACITY[lane], 1)
+        wait = (depth - capacity + 1) * LANE_JOB_SECONDS[lane] / capacity
+        return min(max(math.ceil(wait), 1), MAX_RETRY_AFTER_SECONDS)
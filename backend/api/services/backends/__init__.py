@@ -0,0 +1,66 @@
+import os
+import logging
+from dataclasses import dataclass
+
+from services.backends.base import BlobStore, DocumentStore, Increment, TaskDispatcher, Write
+
+
+# Defaults for each BACKEND preset; JOB_STORE, BLOB_STORE and TASK_DISPATCHER override single parts
+PRESETS = {
+    "gcp": {"JOB_STORE": "firestore", "BLOB_STORE": "gcs", "TASK_DISPATCHER": "cloudtasks"},
+    "local": {"JOB_STORE": "sqlite", "BLOB_STORE": "filesystem", "TASK_DISPATCHER": "local"},
+}
+
+
+@dataclass
+class Backends:
+    store: DocumentStore
+    blobs: BlobStore
+    dispatcher: TaskDispatcher
+
+
+def create_backends() -> Backends:
+    """Build the job store, blob store and task dispatcher selected by the environment.
+       BACKEND=local runs everything on this machine (SQLite, a blob directory and direct HTTP
+       dispatch to SLIDES_SERVICE_URL); the Google clients are only imported for the gcp parts.
+    """
+    preset = PRESETS.get(os.getenv("BACKEND", "gcp"))
+    if preset is None:
+        raise ValueError(f"Unknown BACKEND {os.getenv('BACKEND')!r}, expected one of {', '.join(PRESETS)}")
+    choice = {name: os.getenv(name) or default for name, default in preset.items()}
+    logging.info(f"Using backends: {choice}")
+
+    if choice["JOB_STORE"] == "firestore":
+        from services.backends.gcp import FirestoreStore
+        store = FirestoreStore()
+    elif choice["JOB_STORE"] == "sqlite":
+        from services.backends.local import SQLiteStore
+        store = SQLiteStore(os.getenv("LOCAL_DB_PATH", "/tmp/ai-slider/jobs.db"))
+    elif choice["JOB_STORE"] == "memory":
+        from services.backends.local import MemoryStore
+        store = MemoryStore()
+    else:
+        raise ValueError(f"Unknown JOB_STORE {choice['JOB_STORE']!r}")
+
+    if choice["BLOB_STORE"] == "gcs":
+        from services.backends.gcp import GCSBlobStore
+        blobs = GCSBlobStore()
+    elif choice["BLOB_STORE"] == "filesystem":
+        from services.backends.local import FileBlobStore
+        blobs = FileBlobStore(os.getenv("LOCAL_BLOB_ROOT", "/tmp/ai-slider/blobs"))
+    else:
+        raise ValueError(f"Unknown BLOB_STORE {choice['BLOB_STORE']!r}")
+
+    if choice["TASK_DISPATCHER"] == "cloudtasks":
+        from services.backends.gcp import CloudTasksDispatcher
+        dispatcher = CloudTasksDispatcher()
+    elif choice["TASK_DISPATCHER"] == "local":
+        from services.backends.local import LocalDispatcher
+        dispatcher = LocalDispatcher(
+            os.getenv("SLIDES_SERVICE_URL", "http://localhost:8081"),
+            concurrency=int(os.getenv("LOCAL_DISPATCH_CONCURRENCY", "32")),
+        )
+    else:
+        raise ValueError(f"Unknown TASK_DISPATCHER {choice['TASK_DISPATCHER']!r}")
+
+    return Backends(store=store, blobs=blobs, dispatcher=dispatcher)
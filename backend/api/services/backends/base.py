@@ -0,0 +1,136 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional
+
+
+@dataclass(frozen=True)
+class Increment:
+    """Field value that adds `amount` to the stored number instead of replacing it
+    """
+    amount: int = 1
+
+
+@dataclass
+class Write:
+    """One operation of an atomic batch: `set` replaces a document, `update` merges into an existing one, `delete` removes it
+    """
+    op: str
+    collection: str
+    doc_id: str
+    data: dict = field(default_factory=dict)
+
+
+class DocumentStore(ABC):
+    """Job store: collections of JSON documents addressed by ID (Firestore in production)
+    """
+
+
+    @abstractmethod
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        """Return the document or None if it does not exist
+        """
+
+
+    @abstractmethod
+    async def get_many(self, collection: str, doc_ids: list[str]) -> list[Optional[dict]]:
+        """Documents for `doc_ids` (None where missing), in the same order, read in one round trip
+        """
+
+
+    @abstractmethod
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        ...
+
+
+    @abstractmethod
+    async def update(self, collection: str, doc_id: str, updates: dict) -> None:
+        """Merge `updates` into an existing document. Raises KeyError if it does not exist
+        """
+
+
+    @abstractmethod
+    async def delete(self, collection: str, doc_id: str) -> None:
+        ...
+
+
+    @abstractmethod
+    async def commit(self, writes: list[Write]) -> None:
+        """Apply all writes atomically
+        """
+
+
+    @abstractmethod
+    async def query(
+        self,
+        collection: str,
+        where: Optional[tuple[str, str, object]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        """(id, document) pairs matching `where` = (field, op, value) with op one of <, <=, ==, >=, >
+        """
+
+
+    @abstractmethod
+    async def count(self, collection: str, *where: tuple[str, str, object]) -> int:
+        """Number of documents matching all `where` conditions (same form as in `query`)
+        """
+
+
+    @abstractmethod
+    async def transact(self, collection: str, doc_id: str, fn: Callable[[Optional[dict]], dict]) -> dict:
+        """Atomically replace a document with `fn(current document or None)` and return the new one.
+           `fn` may run again if a concurrent writer wins, so it must not have side effects.
+        """
+
+
+    @abstractmethod
+    def watch(self, collection: str, doc_id: str, on_change: Callable[[dict], None]) -> Callable[[], None]:
+        """Call `on_change(document)` whenever the document changes, possibly from another thread.
+           Returns a function that stops watching.
+        """
+
+
+class BlobStore(ABC):
+    """Object storage for uploads and rendered results (GCS in production)
+    """
+
+
+    @abstractmethod
+    async def write_stream(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> int:
+        """Store the object from an async stream of chunks and return its size.
+           If the stream raises, no object is left behind.
+        """
+
+
+    @abstractmethod
+    async def read_range(self, path: str, start: int, end: int) -> bytes:
+        """Bytes `start`..`end` (inclusive) of an object
+        """
+
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        ...
+
+
+    @abstractmethod
+    async def list_prefixes(self) -> list[str]:
+        """Top-level "directories" of the store (job IDs and `results`), without the trailing slash
+        """
+
+
+    async def signed_url(self, path: str, seconds: int, filename: Optional[str] = None) -> Optional[str]:
+        """Short-lived direct download URL, or None if the backend cannot hand out URLs
+        """
+        return None
+
+
+class TaskDispatcher(ABC):
+    """Delivers slide generation tasks to the slides service (Cloud Tasks in production)
+    """
+
+
+    @abstractmethod
+    async def dispatch(self, payload: dict) -> None:
+        ...
@@ -0,0 +1,285 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+from datetime import timedelta
+from typing import AsyncIterator, Callable, Optional
+
+from google.cloud import firestore, storage, tasks_v2
+from google.api_core.exceptions import NotFound
+from google.auth.transport.requests import Request as AuthRequest
+from requests.adapters import HTTPAdapter
+
+from services.backends.base import BlobStore, DocumentStore, Increment, TaskDispatcher, Write
+from utils.limits import UPLOAD_CHUNK_BYTES
+from utils.telemetry import TRACE_HEADER
+
+
+# Objects per GCS batch request (the API accepts at most 100)
+GCS_DELETE_BATCH = 100
+
+
+def to_firestore(data: dict) -> dict:
+    return {key: firestore.Increment(value.amount) if isinstance(value, Increment) else value for key, value in data.items()}
+
+
+class FirestoreStore(DocumentStore):
+
+
+    def __init__(self):
+        # One async client per process: requests share its gRPC channel instead of blocking the event loop
+        self.db = firestore.AsyncClient()
+        # Snapshot listeners only exist on the sync client; created on first watch
+        self._listen_db = None
+
+
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        try:
+            doc = await self.db.collection(collection).document(doc_id).get()
+        except NotFound:
+            return None
+        return doc.to_dict() if doc.exists else None
+
+
+    async def get_many(self, collection: str, doc_ids: list[str]) -> list[Optional[dict]]:
+        refs = [self.db.collection(collection).document(doc_id) for doc_id in set(doc_ids)]
+        found = {}
+        # One BatchGetDocuments call; snapshots arrive in any order
+        async for snapshot in self.db.get_all(refs):
+            if snapshot.exists:
+                found[snapshot.id] = snapshot.to_dict()
+        return [found.get(doc_id) for doc_id in doc_ids]
+
+
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        await self.db.collection(collection).document(doc_id).set(to_firestore(data))
+
+
+    async def update(self, collection: str, doc_id: str, updates: dict) -> None:
+        try:
+            await self.db.collection(collection).document(doc_id).update(to_firestore(updates))
+        except NotFound:
+            raise KeyError(f"{collection}/{doc_id} not found")
+
+
+    async def delete(self, collection: str, doc_id: str) -> None:
+        await self.db.collection(collection).document(doc_id).delete()
+
+
+    async def commit(self, writes: list[Write]) -> None:
+        batch = self.db.batch()
+        for write in writes:
+            ref = self.db.collection(write.collection).document(write.doc_id)
+            if write.op == "set":
+                batch.set(ref, to_firestore(write.data))
+            elif write.op == "update":
+                batch.update(ref, to_firestore(write.data))
+            elif write.op == "delete":
+                batch.delete(ref)
+            else:
+                raise ValueError(f"Unknown write operation: {write.op}")
+        await batch.commit()
+
+
+    async def query(
+        self,
+        collection: str,
+        where: Optional[tuple[str, str, object]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        query = self.db.collection(collection)
+        if where is not None:
+            query = query.where(*where)
+        if order_by is not None:
+            query = query.order_by(order_by)
+        if limit is not None:
+            query = query.limit(limit)
+        return [(doc.id, doc.to_dict()) async for doc in query.stream()]
+
+
+    async def count(self, collection: str, *where: tuple[str, str, object]) -> int:
+        query = self.db.collection(collection)
+        for condition in where:
+            query = query.where(*condition)
+        return (await query.count().get())[0][0].value
+
+
+    async def transact(self, collection: str, doc_id: str, fn: Callable[[Optional[dict]], dict]) -> dict:
+        ref = self.db.collection(collection).document(doc_id)
+
+        @firestore.async_transactional
+        async def run(transaction):
+            snapshot = await ref.get(transaction=transaction)
+            data = fn(snapshot.to_dict() if snapshot.exists else None)
+            transaction.set(ref, to_firestore(data))
+            return data
+
+        return await run(self.db.transaction())
+
+
+    def watch(self, collection: str, doc_id: str, on_change: Callable[[dict], None]) -> Callable[[], None]:
+        if self._listen_db is None:
+            self._listen_db = firestore.Client()
+
+        def on_snapshot(docs, changes, read_time):
+            for doc in docs:
+                if doc.exists:
+                    on_change(doc.to_dict())
+
+        watch = self._listen_db.collection(collection).document(doc_id).on_snapshot(on_snapshot)
+        return watch.unsubscribe
+
+
+class GCSBlobStore(BlobStore):
+
+
+    def __init__(self):
+        # Storage has no async client; its calls run in worker threads over a pooled HTTP session
+        self.client = storage.Client()
+        pool_size = int(os.getenv("STORAGE_HTTP_POOL_SIZE", "32"))
+        self.client._http.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+
+        self.bucket_name = os.getenv("GCS_BUCKET_NAME", "ai-slider-files")
+        self._bucket = None
+        self._bucket_lock = threading.Lock()
+
+
+    def get_bucket(self) -> storage.Bucket:
+        """Return the bucket, checking (and creating) it only once per process
+        """
+        if self._bucket is not None:
+            return self._bucket
+
+        with self._bucket_lock:
+            if self._bucket is not None:
+                return self._bucket
+
+            bucket = self.client.bucket(self.bucket_name)
+
+            # If the bucket does not exist, create a new one
+            try:
+                bucket.reload()
+            except NotFound:
+                try:
+                    bucket.create(location="asia-northeast3")
+                    logging.info(f"Created bucket {self.bucket_name}")
+                except Exception as e:
+                    raise RuntimeError(f"Failed to create bucket: {e}")
+            except Exception as e:
+                raise RuntimeError(f"Failed to check bucket: {e}")
+
+            self._bucket = bucket
+            return bucket
+
+
+    async def write_stream(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> int:
+        """Resumable upload in UPLOAD_CHUNK_BYTES pieces
+        """
+        bucket = await asyncio.to_thread(self.get_bucket)
+        writer = await asyncio.to_thread(bucket.blob(path).open, "wb", chunk_size=UPLOAD_CHUNK_BYTES, content_type=content_type)
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                await asyncio.to_thread(writer.write, chunk)
+        except BaseException:
+            # The writer would otherwise finalize the upload when garbage-collected (IOBase.__del__ calls close()),
+            # committing a truncated object; terminating cancels the resumable session so nothing is stored
+            await asyncio.to_thread(writer.terminate)
+            raise
+        # Closing the writer finalizes the resumable upload
+        await asyncio.to_thread(writer.close)
+        return size
+
+
+    async def read_range(self, path: str, start: int, end: int) -> bytes:
+        blob = self.client.bucket(self.bucket_name).blob(path)
+        return await asyncio.to_thread(blob.download_as_bytes, start=start, end=end)
+
+
+    async def delete_prefix(self, prefix: str) -> None:
+        def delete():
+            blobs = list(self.client.list_blobs(self.bucket_name, prefix=prefix))
+            # One batch request per GCS_DELETE_BATCH objects instead of a request per object
+            for start in range(0, len(blobs), GCS_DELETE_BATCH):
+                with self.client.batch():
+                    for blob in blobs[start:start + GCS_DELETE_BATCH]:
+                        blob.delete()
+
+        await asyncio.to_thread(delete)
+
+
+    async def list_prefixes(self) -> list[str]:
+        def list_prefixes():
+            iterator = self.client.list_blobs(self.bucket_name, delimiter="/")
+            # Prefixes are collected while the pages are consumed
+            for _ in iterator.pages:
+                pass
+            return [prefix.rstrip("/") for prefix in iterator.prefixes]
+
+        return await asyncio.to_thread(list_prefixes)
+
+
+    async def signed_url(self, path: str, seconds: int, filename: Optional[str] = None) -> Optional[str]:
+        """Create a V4 signed URL.
+           On Cloud Run there is no private key, so signing goes through the IAM signBlob API.
+        """
+        def sign() -> str:
+            credentials = self.client._credentials
+            if not credentials.valid:
+                credentials.refresh(AuthRequest())
+
+            blob = self.client.bucket(self.bucket_name).blob(path)
+            options = {}
+            if not hasattr(credentials, "sign_bytes"):
+                options = {"service_account_email": credentials.service_account_email, "access_token": credentials.token}
+            return blob.generate_signed_url(
+                version="v4",
+                expiration=timedelta(seconds=seconds),
+                method="GET",
+                response_disposition=f"attachment; filename={filename}" if filename else None,
+                **options,
+            )
+
+        return await asyncio.to_thread(sign)
+
+
+class CloudTasksDispatcher(TaskDispatcher):
+
+
+    def __init__(self):
+        self.client = tasks_v2.CloudTasksAsyncClient()
+        self.project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
+        self.region = os.getenv("CLOUD_TASKS_REGION", "asia-northeast3")
+        self.queue_id = os.getenv("CLOUD_TASKS_QUEUE_ID", "slides-generation-queue")
+        # Batch-lane jobs go to their own queue when one is configured, so they cannot delay interactive ones
+        self.lane_queue_ids = {"batch": os.getenv("CLOUD_TASKS_BATCH_QUEUE_ID") or self.queue_id}
+        self.service_url = os.getenv("SLIDES_SERVICE_URL")
+
+
+    async def dispatch(self, payload: dict) -> None:
+        queue_id = self.lane_queue_ids.get(payload.get("lane"), self.queue_id)
+        parent = self.client.queue_path(self.project_id, self.region, queue_id)
+        task_url = f"{self.service_url}/tasks/process-slides"
+
+        try:
+            payload_bytes = json.dumps(payload).encode()
+        except Exception as e:
+            raise RuntimeError(f"Failed to serialize task payload: {e}")
+
+        task = {
+            "http_request": {
+                "http_method": tasks_v2.HttpMethod.POST,
+                "url": task_url,
+                "headers": {"Content-Type": "application/json", TRACE_HEADER: payload.get("traceId", "")},
+                "body": payload_bytes,
+                "oidc_token": {
+                    "service_account_email": f"slides-service-invoker@{self.project_id}.iam.gserviceaccount.com",
+                    "audience": task_url
+                }
+            }
+        }
+
+        await self.client.create_task(request={"parent": parent, "task": task})
@@ -0,0 +1,512 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import sqlite3
+import operator
+import threading
+from collections import defaultdict
+from copy import deepcopy
+from typing import AsyncIterator, Callable, Optional
+
+import httpx
+
+from services.backends.base import BlobStore, DocumentStore, Increment, TaskDispatcher, Write
+from utils.telemetry import TRACE_HEADER
+
+
+# Watchers only need recent changes; older rows are pruned every so many writes
+CHANGES_RETENTION_SECONDS = 300
+CHANGES_PRUNE_EVERY = 1000
+
+SQLITE_MAX_IDS = 500
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, "==": operator.eq, ">=": operator.ge, ">": operator.gt}
+
+
+def apply_updates(document: dict, updates: dict) -> dict:
+    merged = dict(document)
+    for key, value in updates.items():
+        merged[key] = merged.get(key, 0) + value.amount if isinstance(value, Increment) else value
+    return merged
+
+
+def resolve_set(data: dict) -> dict:
+    return {key: value.amount if isinstance(value, Increment) else value for key, value in data.items()}
+
+
+def field_value(document: dict, field: str):
+    # Dotted paths reach into maps, as in Firestore queries ("lease.expiresAt")
+    for key in field.split("."):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(key)
+    return document
+
+
+def matches(document: dict, field: str, op: str, value) -> bool:
+    current = field_value(document, field)
+    return current is not None and OPERATORS[op](current, value)
+
+
+class MemoryStore(DocumentStore):
+
+
+    def __init__(self):
+        """Process-local document store for tests and single-process runs
+        """
+        self._collections: dict[str, dict[str, dict]] = defaultdict(dict)
+        self._watchers: dict[tuple[str, str], list[Callable[[dict], None]]] = defaultdict(list)
+
+
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        document = self._collections[collection].get(doc_id)
+        return deepcopy(document) if document is not None else None
+
+
+    async def get_many(self, collection: str, doc_ids: list[str]) -> list[Optional[dict]]:
+        return [await self.get(collection, doc_id) for doc_id in doc_ids]
+
+
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        await self.commit([Write("set", collection, doc_id, data)])
+
+
+    async def update(self, collection: str, doc_id: str, updates: dict) -> None:
+        await self.commit([Write("update", collection, doc_id, updates)])
+
+
+    async def delete(self, collection: str, doc_id: str) -> None:
+        await self.commit([Write("delete", collection, doc_id)])
+
+
+    async def commit(self, writes: list[Write]) -> None:
+        for write in writes:
+            if write.op == "update" and write.doc_id not in self._collections[write.collection]:
+                raise KeyError(f"{write.collection}/{write.doc_id} not found")
+
+        for write in writes:
+            documents = self._collections[write.collection]
+            if write.op == "set":
+                documents[write.doc_id] = deepcopy(resolve_set(write.data))
+            elif write.op == "update":
+                documents[write.doc_id] = apply_updates(documents[write.doc_id], deepcopy(write.data))
+            elif write.op == "delete":
+                documents.pop(write.doc_id, None)
+            else:
+                raise ValueError(f"Unknown write operation: {write.op}")
+
+        for write in writes:
+            document = self._collections[write.collection].get(write.doc_id)
+            if document is None:
+                continue
+            for on_change in list(self._watchers.get((write.collection, write.doc_id), ())):
+                on_change(deepcopy(document))
+
+
+    async def query(
+        self,
+        collection: str,
+        where: Optional[tuple[str, str, object]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        items = list(self._collections[collection].items())
+        if where is not None:
+            field, op, value = where
+            items = [(doc_id, doc) for doc_id, doc in items if matches(doc, field, op, value)]
+        if order_by is not None:
+            items = sorted(
+                (item for item in items if field_value(item[1], order_by) is not None),
+                key=lambda item: field_value(item[1], order_by),
+            )
+        return [(doc_id, deepcopy(doc)) for doc_id, doc in items[:limit]]
+
+
+    async def count(self, collection: str, *where: tuple[str, str, object]) -> int:
+        return sum(
+            all(matches(doc, field, op, value) for field, op, value in where)
+            for doc in self._collections[collection].values()
+        )
+
+
+    async def transact(self, collection: str, doc_id: str, fn: Callable[[Optional[dict]], dict]) -> dict:
+        # Nothing awaits between the read and the write, so no other task can interleave
+        data = fn(deepcopy(self._collections[collection].get(doc_id)))
+        await self.commit([Write("set", collection, doc_id, data)])
+        return deepcopy(data)
+
+
+    def watch(self, collection: str, doc_id: str, on_change: Callable[[dict], None]) -> Callable[[], None]:
+        key = (collection, doc_id)
+        self._watchers[key].append(on_change)
+
+        document = self._collections[collection].get(doc_id)
+        if document is not None:
+            # Like a Firestore listener, the first callback carries the current state
+            on_change(deepcopy(document))
+
+        def unsubscribe():
+            if on_change in self._watchers.get(key, ()):
+                self._watchers[key].remove(on_change)
+                if not self._watchers[key]:
+                    del self._watchers[key]
+
+        return unsubscribe
+
+
+class SQLiteStore(DocumentStore):
+
+
+    def __init__(self, path: str, poll_interval: float = 0.1):
+        """Document store in a SQLite file, shareable by the api and slides_service processes on one machine.
+           Every write also appends to a `changes` table, which watchers poll from a background thread.
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (collection, id)
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                changed_at REAL NOT NULL
+            );
+        """)
+
+        self._watchers: dict[tuple[str, str], list[Callable[[dict], None]]] = defaultdict(list)
+        self._watch_lock = threading.Lock()
+        self._poller: Optional[threading.Thread] = None
+
+
+    def _connect(self) -> sqlite3.Connection:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+    def _run(self, fn, *args):
+        with self._lock:
+            return fn(self._conn, *args)
+
+
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        def get(conn):
+            row = conn.execute("SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)).fetchone()
+            return json.loads(row[0]) if row else None
+
+        return await asyncio.to_thread(self._run, get)
+
+
+    async def get_many(self, collection: str, doc_ids: list[str]) -> list[Optional[dict]]:
+        def get_many(conn):
+            found = {}
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(doc_ids), SQLITE_MAX_IDS):
+                chunk = doc_ids[start:start + SQLITE_MAX_IDS]
+                rows = conn.execute(
+                    f"SELECT id, data FROM documents WHERE collection = ? AND id IN ({', '.join('?' * len(chunk))})",
+                    [collection, *chunk],
+                ).fetchall()
+                found.update((doc_id, json.loads(data)) for doc_id, data in rows)
+            return [found.get(doc_id) for doc_id in doc_ids]
+
+        return await asyncio.to_thread(self._run, get_many)
+
+
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        await self.commit([Write("set", collection, doc_id, data)])
+
+
+    async def update(self, collection: str, doc_id: str, updates: dict) -> None:
+        await self.commit([Write("update", collection, doc_id, updates)])
+
+
+    async def delete(self, collection: str, doc_id: str) -> None:
+        await self.commit([Write("delete", collection, doc_id)])
+
+
+    async def commit(self, writes: list[Write]) -> None:
+        await asyncio.to_thread(self._run, self._commit, writes)
+
+
+    def _commit(self, conn: sqlite3.Connection, writes: list[Write]) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for write in writes:
+                if write.op == "set":
+                    data = resolve_set(write.data)
+                elif write.op == "update":
+                    row = conn.execute(
+                        "SELECT data FROM documents WHERE collection = ? AND id = ?", (write.collection, write.doc_id)).fetchone()
+                    if row is None:
+                        raise KeyError(f"{write.collection}/{write.doc_id} not found")
+                    data = apply_updates(json.loads(row[0]), write.data)
+                elif write.op == "delete":
+                    conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (write.collection, write.doc_id))
+                    continue
+                else:
+                    raise ValueError(f"Unknown write operation: {write.op}")
+
+                self._put(conn, write.collection, write.doc_id, data)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+    def _put(self, conn: sqlite3.Connection, collection: str, doc_id: str, data: dict) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+            (collection, doc_id, json.dumps(data)),
+        )
+        seq = conn.execute(
+            "INSERT INTO changes (collection, id, changed_at) VALUES (?, ?, ?)",
+            (collection, doc_id, time.time()),
+        ).lastrowid
+        if seq % CHANGES_PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM changes WHERE changed_at < ?", (time.time() - CHANGES_RETENTION_SECONDS,))
+
+
+    async def transact(self, collection: str, doc_id: str, fn: Callable[[Optional[dict]], dict]) -> dict:
+        def transact(conn):
+            # BEGIN IMMEDIATE takes the write lock up front, so other processes wait rather than race
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)).fetchone()
+                data = fn(json.loads(row[0]) if row else None)
+                self._put(conn, collection, doc_id, data)
+                conn.execute("COMMIT")
+                return data
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        return await asyncio.to_thread(self._run, transact)
+
+
+    async def query(
+        self,
+        collection: str,
+        where: Optional[tuple[str, str, object]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple[str, dict]]:
+        sql = "SELECT id, data FROM documents WHERE collection = ?"
+        params: list = [collection]
+        if where is not None:
+            field, op, value = where
+            if op not in OPERATORS:
+                raise ValueError(f"Unsupported operator: {op}")
+            sql += f" AND json_extract(data, ?) {'=' if op == '==' else op} ?"
+            params += [f"$.{field}", value]
+        if order_by is not None:
+            sql += " AND json_extract(data, ?) IS NOT NULL ORDER BY json_extract(data, ?)"
+            params += [f"$.{order_by}", f"$.{order_by}"]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        def query(conn):
+            return [(doc_id, json.loads(data)) for doc_id, data in conn.execute(sql, params).fetchall()]
+
+        return await asyncio.to_thread(self._run, query)
+
+
+    async def count(self, collection: str, *where: tuple[str, str, object]) -> int:
+        sql = "SELECT COUNT(*) FROM documents WHERE collection = ?"
+        params: list = [collection]
+        for field, op, value in where:
+            if op not in OPERATORS:
+                raise ValueError(f"Unsupported operator: {op}")
+            sql += f" AND json_extract(data, ?) {'=' if op == '==' else op} ?"
+            params += [f"$.{field}", value]
+
+        def count(conn):
+            return conn.execute(sql, params).fetchone()[0]
+
+        return await asyncio.to_thread(self._run, count)
+
+
+    def watch(self, collection: str, doc_id: str, on_change: Callable[[dict], None]) -> Callable[[], None]:
+        key = (collection, doc_id)
+        with self._watch_lock:
+            self._watchers[key].append(on_change)
+            if self._poller is None or not self._poller.is_alive():
+                # Start from the current end of the change log, so nothing after this call is missed
+                last_seq = self._run(lambda conn: conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0])
+                self._poller = threading.Thread(target=self._poll, args=(last_seq,), name="sqlite-store-watch", daemon=True)
+                self._poller.start()
+
+        # Like a Firestore listener, the first callback carries the current state
+        document = self._run(lambda conn: conn.execute(
+            "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)).fetchone())
+        if document is not None:
+            on_change(json.loads(document[0]))
+
+        def unsubscribe():
+            with self._watch_lock:
+                if on_change in self._watchers.get(key, ()):
+                    self._watchers[key].remove(on_change)
+                    if not self._watchers[key]:
+                        del self._watchers[key]
+
+        return unsubscribe
+
+
+    def _poll(self, last_seq: int) -> None:
+        # Own connection, so polling never waits behind the request path
+        conn = self._connect()
+        try:
+            while True:
+                with self._watch_lock:
+                    if not self._watchers:
+                        self._poller = None
+                        return
+
+                rows = conn.execute(
+                    "SELECT seq, collection, id FROM changes WHERE seq > ? ORDER BY seq", (last_seq,)).fetchall()
+                if rows:
+                    last_seq = rows[-1][0]
+                # Several changes to one document since the last poll are reported once, with its latest state
+                for collection, doc_id in dict.fromkeys((collection, doc_id) for _, collection, doc_id in rows):
+                    with self._watch_lock:
+                        callbacks = list(self._watchers.get((collection, doc_id), ()))
+                    if not callbacks:
+                        continue
+                    row = conn.execute(
+                        "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)).fetchone()
+                    if row is None:
+                        continue
+                    for on_change in callbacks:
+                        try:
+                            on_change(json.loads(row[0]))
+                        except Exception as e:
+                            logging.warning(f"Watcher of {collection}/{doc_id} failed: {e}")
+                time.sleep(self.poll_interval)
+        finally:
+            conn.close()
+
+
+class FileBlobStore(BlobStore):
+
+
+    def __init__(self, root: str):
+        """Blob store in a local directory; object paths map to files below `root`
+        """
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+
+    def file_path(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid object path: {path}")
+        return full_path
+
+
+    async def write_stream(self, path: str, chunks: AsyncIterator[bytes], content_type: str) -> int:
+        full_path = self.file_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see a partial object
+        temp_path = f"{full_path}.{uuid.uuid4().hex}.part"
+        size = 0
+        try:
+            with open(temp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return size
+
+
+    async def read_range(self, path: str, start: int, end: int) -> bytes:
+        def read():
+            with open(self.file_path(path), "rb") as f:
+                f.seek(start)
+                return f.read(end - start + 1)
+
+        return await asyncio.to_thread(read)
+
+
+    async def delete_prefix(self, prefix: str) -> None:
+        def delete():
+            target = self.file_path(prefix.rstrip("/"))
+            if prefix.endswith("/"):
+                shutil.rmtree(target, ignore_errors=True)
+                return
+            directory, name = os.path.split(target)
+            if os.path.isdir(directory):
+                for entry in os.listdir(directory):
+                    if entry.startswith(name):
+                        entry_path = os.path.join(directory, entry)
+                        if os.path.isdir(entry_path):
+                            shutil.rmtree(entry_path, ignore_errors=True)
+                        else:
+                            os.remove(entry_path)
+
+        await asyncio.to_thread(delete)
+
+
+    async def list_prefixes(self) -> list[str]:
+        def list_prefixes():
+            return sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir())
+
+        return await asyncio.to_thread(list_prefixes)
+
+
+class LocalDispatcher(TaskDispatcher):
+
+
+    def __init__(self, service_url: str, concurrency: int = 32, attempts: int = 3):
+        """Posts tasks straight to the slides service from background asyncio tasks, retrying failures
+           like Cloud Tasks would. Tasks still running when the process exits are lost.
+           Each lane has its own `concurrency` slots, like the separate Cloud Tasks queues.
+        """
+        self.task_url = f"{service_url.rstrip('/')}/tasks/process-slides"
+        self.semaphores = defaultdict(lambda: asyncio.Semaphore(concurrency))
+        self.attempts = attempts
+        self.client: Optional[httpx.AsyncClient] = None
+        self._tasks: set[asyncio.Task] = set()
+
+
+    async def dispatch(self, payload: dict) -> None:
+        task = asyncio.create_task(self._deliver(payload))
+        # Keep a reference until the task finishes, or it may be garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+    async def _deliver(self, payload: dict) -> None:
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=None)
+
+        async with self.semaphores[payload.get("lane", "interactive")]:
+            for attempt in range(1, self.attempts + 1):
+                try:
+                    response = await self.client.post(self.task_url, json=payload, headers={TRACE_HEADER: payload.get("traceId", "")})
+                    if response.status_code < 500:
+                        return
+                    error = f"HTTP {response.status_code}"
+                except httpx.HTTPError as e:
+                    error = str(e)
+                logging.warning(f"Task for job {payload.get('jobID')} failed (attempt {attempt}): {error}")
+                if attempt < self.attempts:
+                    await asyncio.sleep(min(2 ** attempt, 30))
@@ -0,0 +1,57 @@
+import os
+import logging
+
+from services.backends import DocumentStore, Write
+
+
+# Jobs accepted in one POST /v1/slides/batch request
+MAX_BATCH_JOBS = int(os.getenv("MAX_BATCH_JOBS", "200"))
+# Cache lookups, uploads and task creations of one batch that run at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+# Job IDs accepted by one bulk status lookup (GET /v1/slides?ids= or POST /v1/slides/status)
+MAX_STATUS_IDS = int(os.getenv("MAX_STATUS_IDS", "500"))
+# Firestore accepts at most 500 writes per batched write
+BATCH_WRITE_LIMIT = 500
+# The batch document only lists its jobs, which expire on their own; it is kept for a day
+BATCH_TTL_SECONDS = int(os.getenv("BATCH_TTL_SECONDS", str(24 * 3600)))
+
+
+def assign_files(specs: list[dict], file_count: int) -> list[list[int]]:
+    """Indices of the uploaded files each job spec refers to (its `files` list).
+       Every upload belongs to exactly one job, since an upload can only be streamed once.
+       Raises ValueError naming the first problem.
+    """
+    owners: dict[int, int] = {}
+    assigned = []
+    for number, spec in enumerate(specs):
+        indices = spec.get("files")
+        if not isinstance(indices, list) or not indices:
+            raise ValueError(f"jobs[{number}].files must be a non-empty list of upload indices")
+        for index in indices:
+            if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < file_count:
+                raise ValueError(f"jobs[{number}].files refers to unknown upload {index!r}")
+            if index in owners:
+                raise ValueError(f"Upload {index} is used by jobs[{owners[index]}] and jobs[{number}]")
+            owners[index] = number
+        assigned.append(indices)
+
+    unused = sorted(set(range(file_count)) - set(owners))
+    if unused:
+        raise ValueError(f"Uploads {unused} are not used by any job")
+    return assigned
+
+
+async def commit_in_chunks(store: DocumentStore, writes: list[Write], size: int = BATCH_WRITE_LIMIT) -> list[Exception | None]:
+    """Commit `writes` as batched writes of at most `size` operations.
+       Each chunk is atomic on its own; returns the outcome of each write (None or the chunk's error).
+    """
+    outcomes: list[Exception | None] = []
+    for start in range(0, len(writes), size):
+        chunk = writes[start:start + size]
+        try:
+            await store.commit(chunk)
+            outcomes.extend([None] * len(chunk))
+        except Exception as e:
+            logging.error(f"Batched write of {len(chunk)} documents failed: {e}")
+            outcomes.extend([e] * len(chunk))
+    return outcomes
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# (job_id) -> latest job state, or None if the job does not exist
+StateLoader = Callable[[str], Awaitable[Optional[dict]]]
+# (job_id, on_change) -> unsubscribe; on_change may be called from any thread
+Listener = Callable[[str, Callable[[dict], None]], Callable[[], None]]
+# (state) -> state with derived fields filled in (e.g. the result URL of a completed job)
+Enricher = Callable[[dict], Awaitable[dict]]
+
+
+def changed_since(state: dict, since: int) -> bool:
+    """Whether a job state is newer than the `updatedAt` a client already has.
+       `updatedAt` has whole-second resolution, so a write in the same second counts as unchanged,
+       except a terminal one: no later write would ever deliver it.
+    """
+    updated_at = state.get("updatedAt") or 0
+    return updated_at > since or (updated_at == since and state.get("status") in TERMINAL_STATUSES)
+
+
+class Subscription:
+
+
+    def __init__(self, job_id: str, max_queue: int):
+        self.job_id = job_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+
+    def offer(self, update: dict) -> None:
+        """Queue an update, dropping the oldest one if the subscriber is not keeping up.
+           Every update is a full job state, so only the newest ones matter.
+        """
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(update)
+
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Wait up to `timeout` seconds for the next update, None on timeout
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class _JobWatch:
+
+
+    def __init__(self):
+        self.subscribers: set[Subscription] = set()
+        self.last_state: Optional[dict] = None
+        self.ready = asyncio.Event()
+        self.error: Optional[Exception] = None
+        self.unsubscribe: Optional[Callable[[], None]] = None
+
+
+    def stop_listening(self) -> None:
+        if self.unsubscribe is not None:
+            try:
+                self.unsubscribe()
+            except Exception as e:
+                logging.warning(f"Failed to remove job listener: {e}")
+            self.unsubscribe = None
+
+
+class JobWatchHub:
+
+
+    def __init__(self, load_state: StateLoader, listen: Listener, enrich: Optional[Enricher] = None, max_queue: int = 16):
+        """Process-wide fan-out of job updates to SSE subscribers.
+           Keeps one backend listener per job ID no matter how many clients watch it,
+           replays the last known state to late joiners and drops the listener
+           when the last subscriber leaves.
+        """
+        self.load_state = load_state
+        self.listen = listen
+        self.enrich = enrich
+        self.max_queue = max_queue
+        self._watches: dict[str, _JobWatch] = {}
+
+
+    def listener_count(self) -> int:
+        return sum(1 for watch in self._watches.values() if watch.unsubscribe is not None)
+
+
+    def subscriber_count(self, job_id: str) -> int:
+        watch = self._watches.get(job_id)
+        return len(watch.subscribers) if watch else 0
+
+
+    async def subscribe(self, job_id: str) -> Subscription:
+        """Register a subscriber; its queue starts with the last known state of the job.
+           Raises LookupError if the job does not exist.
+        """
+        subscription = Subscription(job_id, self.max_queue)
+        watch = self._watches.get(job_id)
+
+        if watch is None:
+            watch = _JobWatch()
+            self._watches[job_id] = watch
+            # Not tied to this subscriber, so a disconnect cannot cancel the load for others
+            asyncio.ensure_future(self._start(job_id, watch))
+
+        watch.subscribers.add(subscription)
+        try:
+            await watch.ready.wait()
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+
+        if watch.error is not None:
+            self.unsubscribe(subscription)
+            raise watch.error
+
+        if watch.last_state is not None:
+            subscription.offer(watch.last_state)
+        return subscription
+
+
+    def peek(self, job_id: str) -> Optional[dict]:
+        """Last known state of a job that is already being watched, without any read
+        """
+        watch = self._watches.get(job_id)
+        if watch is None or not watch.ready.is_set() or watch.error is not None:
+            return None
+        return watch.last_state
+
+
+    async def wait(
+        self,
+        job_id: str,
+        unchanged: Callable[[dict], bool],
+        timeout: float,
+        disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        check_interval: float = 1.0,
+    ) -> dict:
+        """Long poll: return the job's state as soon as `unchanged(state)` is false, or its latest
+           state once `timeout` seconds pass (or `disconnected()` says the client left).
+           Held requests share the job's listener with SSE subscribers.
+           Raises LookupError if the job does not exist.
+        """
+        subscription = await self.subscribe(job_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            # subscribe() queued the last known state
+            state = subscription.queue.get_nowait()
+            while unchanged(state) and state.get("status") not in TERMINAL_STATUSES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                update = await subscription.get(timeout=min(remaining, check_interval))
+                if update is not None:
+                    state = update
+                elif disconnected is not None and await disconnected():
+                    break
+            return state
+        finally:
+            self.unsubscribe(subscription)
+
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        watch = self._watches.get(subscription.job_id)
+        if watch is None or subscription not in watch.subscribers:
+            return
+        watch.subscribers.discard(subscription)
+        if not watch.subscribers:
+            watch.stop_listening()
+            del self._watches[subscription.job_id]
+
+
+    async def _start(self, job_id: str, watch: _JobWatch) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            state = await self.load_state(job_id)
+            if state is None:
+                raise LookupError("job not found")
+            watch.last_state = state
+
+            if state.get("status") not in TERMINAL_STATUSES:
+                def on_change(state: dict):
+                    # Backend listeners call back on their own thread
+                    loop.call_soon_threadsafe(self._receive, job_id, state)
+
+                watch.unsubscribe = self.listen(job_id, on_change)
+        except Exception as e:
+            watch.error = e
+        finally:
+            watch.ready.set()
+
+        if watch.error is not None or self._watches.get(job_id) is not watch:
+            # Failed, or every subscriber left while the job was loading
+            watch.stop_listening()
+            if self._watches.get(job_id) is watch:
+                del self._watches[job_id]
+
+
+    def _receive(self, job_id: str, state: dict) -> None:
+        if self.enrich is None:
+            self._publish(job_id, state)
+            return
+
+        async def enrich_and_publish():
+            try:
+                enriched = await self.enrich(state)
+            except Exception as e:
+                logging.warning(f"Failed to enrich update for job {job_id}: {e}")
+                enriched = state
+            self._publish(job_id, enriched)
+
+        asyncio.ensure_future(enrich_and_publish())
+
+
+    def _publish(self, job_id: str, state: dict) -> None:
+        watch = self._watches.get(job_id)
+        if watch is None:
+            return
+
+        if state == watch.last_state:
+            # The listener's first snapshot repeats the state loaded on subscribe. Any other difference
+            # (e.g. progress or preview written in the same second as the last update) is delivered.
+            return
+
+        watch.last_state = state
+        for subscription in watch.subscribers:
+            subscription.offer(state)
+
+        if state.get("status") in TERMINAL_STATUSES:
+            watch.stop_listening()
@@ -0,0 +1,121 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from prometheus_client import Counter, Gauge
+
+
+CACHE_ENABLED = os.getenv("MEMORY_CACHE_ENABLED", "true").lower() == "true"
+# Upper bound on how long any entry is kept, also for documents without `expiresAt`
+CACHE_TTL_SECONDS = float(os.getenv("MEMORY_CACHE_TTL_SECONDS", "3600"))
+
+CACHE_EVENTS = Counter(
+    "api_memory_cache_events_total",
+    "Lookups and removals of the api's in-process caches",
+    ["cache", "event"],
+)
+CACHE_ENTRIES = Gauge("api_memory_cache_entries", "Entries held by an in-process cache", ["cache"])
+CACHE_BYTES = Gauge("api_memory_cache_bytes", "Bytes held by an in-process cache", ["cache"])
+
+
+class TTLCache:
+
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: int = 0,
+        max_item_bytes: int = 0,
+        ttl: float = CACHE_TTL_SECONDS,
+        enabled: bool = CACHE_ENABLED,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Bounded LRU cache whose entries also expire, at the latest `ttl` seconds after they were stored.
+           With `max_bytes`, entries carry a size and the least recently used are evicted to stay under it;
+           items over `max_item_bytes` are not cached. Values are shared, so callers must not modify them.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.ttl = ttl
+        self.enabled = enabled and max_entries > 0
+        self.clock = clock
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        # key -> (value, deadline, size), least recently used first
+        self._entries: OrderedDict[Hashable, tuple[object, float, int]] = OrderedDict()
+
+
+    def accepts(self, size: int) -> bool:
+        return self.enabled and (not self.max_item_bytes or size <= self.max_item_bytes)
+
+
+    def get(self, key: Hashable) -> Optional[object]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self._count("misses")
+            return None
+
+        value, deadline, _ = entry
+        if deadline <= self.clock():
+            self._remove(key)
+            self._update_gauges()
+            self._count("expirations")
+            self._count("misses")
+            return None
+
+        self._entries.move_to_end(key)
+        self._count("hits")
+        return value
+
+
+    def put(self, key: Hashable, value: object, expires_at: float = 0, ttl: Optional[float] = None, size: int = 0) -> None:
+        """Store `value` until `expires_at` (epoch seconds, 0 for none) or for `ttl` seconds, whichever is sooner
+        """
+        if not self.accepts(size):
+            return
+        now = self.clock()
+        deadline = now + (self.ttl if ttl is None else ttl)
+        if expires_at:
+            deadline = min(deadline, expires_at)
+        if deadline <= now:
+            return
+
+        self._remove(key)
+        self._entries[key] = (value, deadline, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._count("evictions")
+        self._update_gauges()
+
+
+    def invalidate(self, key: Hashable) -> None:
+        self._remove(key)
+        self._update_gauges()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+
+    def _count(self, event: str) -> None:
+        self.stats[event] += 1
+        CACHE_EVENTS.labels(self.name, event).inc()
+
+
+    def _update_gauges(self) -> None:
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+        CACHE_BYTES.labels(self.name).set(self.bytes)
@@ -1,158 +1,445 @@
 import os
-import io
 import time
 import json
 import asyncio
 import logging
+import mimetypes
 from typing import AsyncGenerator
 from uuid import uuid4
 
-from fastapi import Request
-from google.cloud import firestore, storage, tasks_v2
-from google.api_core.exceptions import NotFound
+from fastapi import Request, UploadFile
 
-from models.slide import File, FirestoreJob, FirestoreResult, Job, SlideSettings, FileReference, TaskPayload, JobStatus
+from models.slide import FirestoreJob, Job, SlideSettings, FileReference, TaskPayload, JobStatus
+from utils.lazy import Lazy
+from utils.limits import UPLOAD_CHUNK_BYTES, UploadBudget, UploadTooLargeError
+from utils.telemetry import Trace, new_trace_id, span, start_trace, use_trace
+from services.hub import TERMINAL_STATUSES, JobWatchHub
+from services.result_cache import ResultCache, content_key
+from services.admission import AdmissionController, job_lane
+from services.batch import BATCH_CONCURRENCY, BATCH_TTL_SECONDS, commit_in_chunks
+from services.sweeper import FAILED_JOB_TTL_SECONDS
+from services.memory_cache import TTLCache
+from services.backends import Backends, BlobStore, DocumentStore, TaskDispatcher, Write, create_backends
+
+
+RESULT_CHUNK_BYTES = 1024 * 1024
+SIGNED_URL_SECONDS = int(os.getenv("RESULT_SIGNED_URL_SECONDS", "300"))
+
+COMPLETED_JOB_TTL_SECONDS = 300
+
+SSE_HEARTBEAT_SECONDS = 30
+SSE_DISCONNECT_CHECK_SECONDS = 1
+# In-process caches of documents that no longer change (see QueueService.read_job)
+JOB_CACHE_MAX_ENTRIES = int(os.getenv("JOB_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_META_CACHE_MAX_ENTRIES", "10000"))
+# A failed job may still be retried by Cloud Tasks, so its state is only trusted briefly
+FAILED_JOB_CACHE_SECONDS = float(os.getenv("FAILED_JOB_CACHE_SECONDS", "15"))
+# Small rendered results kept in memory for downloads; 0 disables
+PAYLOAD_CACHE_MAX_BYTES = int(os.getenv("RESULT_PAYLOAD_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PAYLOAD_CACHE_MAX_OBJECT_BYTES = int(os.getenv("RESULT_PAYLOAD_CACHE_MAX_OBJECT_BYTES", str(512 * 1024)))
+
+# Longest a conditional GET /v1/slides/{id} is held waiting for a change
+LONG_POLL_MAX_SECONDS = float(os.getenv("LONG_POLL_MAX_SECONDS", "30"))
+
+
+def is_expired(document: dict, now: int | None = None) -> bool:
+    """`expiresAt` has passed; missing or 0 means the document does not expire
+    """
+    expires_at = document.get("expiresAt") or 0
+    return expires_at > 0 and (now or int(time.time())) > expires_at
 
 
 class QueueService:
     
     
     def __init__(self):
-        # self.db = firestore.AsyncClient()
-        self.db = firestore.Client()
-        self.storage_client = storage.Client()
-        self.tasks_client = tasks_v2.CloudTasksClient()
-
-        self.project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
-        self.region = os.getenv("CLOUD_TASKS_REGION", "asia-northeast3")
-        self.queue_id = os.getenv("CLOUD_TASKS_QUEUE_ID", "slides-generation-queue")
-        self.service_url = os.getenv("SLIDES_SERVICE_URL")
-        self.bucket_name = os.getenv("GCS_BUCKET_NAME", "ai-slider-files")
-        
+        # Job store, blob store and task dispatcher come from the environment (BACKEND=gcp|local).
+        # Their cloud clients are created on first use or by warm_up(), not when the app is imported.
+        self._backends = Lazy(create_backends, "backends")
+        self._result_cache = Lazy(lambda: ResultCache(self.store), "result cache")
+        self._admission = Lazy(lambda: AdmissionController(self.store), "admission controller")
+
+        self.hub = JobWatchHub(
+            self.load_job_state,
+            self.listen_job,
+            self.with_result_url,
+            max_queue=int(os.getenv("SSE_QUEUE_SIZE", "16")),
+        )
 
-    def collection(self):
-        return self.db.collection("jobs")
-    
-    
-    def results_collection(self):
-        return self.db.collection("results")
-    
-    
-    def upload_file_to_gcs(self, job_id: str, file: File) -> str:
-        """Upload a file to Google Cloud Storage and return the path
+        self.job_cache = TTLCache("jobs", JOB_CACHE_MAX_ENTRIES)
+        self.result_meta_cache = TTLCache("results", RESULT_CACHE_MAX_ENTRIES)
+        self.payload_cache = TTLCache(
+            "payloads",
+            max_entries=JOB_CACHE_MAX_ENTRIES if PAYLOAD_CACHE_MAX_BYTES > 0 else 0,
+            max_bytes=PAYLOAD_CACHE_MAX_BYTES,
+            max_item_bytes=PAYLOAD_CACHE_MAX_OBJECT_BYTES,
+        )
+
+
+    @property
+    def backends(self) -> Backends:
+        return self._backends.get()
+
+
+    @property
+    def store(self) -> DocumentStore:
+        return self.backends.store
+
+
+    @property
+    def blobs(self) -> BlobStore:
+        return self.backends.blobs
+
+
+    @property
+    def dispatcher(self) -> TaskDispatcher:
+        return self.backends.dispatcher
+
+
+    @property
+    def result_cache(self) -> ResultCache:
+        return self._result_cache.get()
+
+
+    @property
+    def admission(self) -> AdmissionController:
+        return self._admission.get()
+
+
+    async def warm_up(self) -> bool:
+        """Create the backends in the background, so the first request does not pay for them
+        """
+        return await self._backends.warm()
+
+
+    async def read_job(self, job_id: str) -> dict | None:
+        """Job document, served from memory once the job has finished.
+           Completed jobs never change again and are cached until their `expiresAt`.
+        """
+        data = self.job_cache.get(job_id)
+        if data is None:
+            data = await self.store.get("jobs", job_id)
+            if data is not None:
+                self.remember_job(job_id, data)
+        return data
+
+
+    def remember_job(self, job_id: str, data: dict) -> None:
+        status = data.get("status")
+        if status == JobStatus.COMPLETED.value:
+            self.job_cache.put(job_id, data, data.get("expiresAt") or 0)
+        elif status == JobStatus.FAILED.value:
+            self.job_cache.put(job_id, data, data.get("expiresAt") or 0, ttl=FAILED_JOB_CACHE_SECONDS)
+
+
+    async def read_result(self, job_id: str) -> dict | None:
+        """Results document; written once when the job completes, so cached until its `expiresAt`
+        """
+        data = self.result_meta_cache.get(job_id)
+        if data is None:
+            data = await self.store.get("results", job_id)
+            if data is not None:
+                self.result_meta_cache.put(job_id, data, data.get("expiresAt") or 0)
+        return data
+
+
+    async def upload_file_to_gcs(self, job_id: str, file: UploadFile, budget: UploadBudget) -> FileReference:
+        """Stream an uploaded file to the blob store (GCS resumable upload) and return its reference.
+           Size limits are enforced per chunk, so an oversized file is never committed.
         """
         object_path = f"{job_id}/{file.filename}"
-        bucket = self.storage_client.bucket(self.bucket_name)
-        
-        # If the bucket does not exist, create a new one
+        content_type = mimetypes.guess_type(file.filename)[0] or "application/octet-stream"
+
+        async def chunks():
+            size = 0
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                budget.consume(file.filename, size, len(chunk))
+                yield chunk
+
         try:
-            bucket.reload()
-        except NotFound:  
-            try:  
-                bucket.create(location="asia-northeast3")
-                logging.info(f"Created bucket {self.bucket_name}")
-            except Exception as e:
-                raise RuntimeError(f"Failed to create bucket: {e}")
+            with span("gcs_upload", contentType=content_type) as attributes:
+                size = await self.blobs.write_stream(object_path, chunks(), content_type)
+                attributes["bytes"] = size
         except Exception as e:
-            raise RuntimeError(f"Failed to check bucket: {e}")
-        
-        blob = bucket.blob(object_path)
+            logging.error("Failed GCS Upload : %s", str(e))
+            raise
         
+        logging.info(f"Upload file {file.filename} ({size} bytes) to {object_path}")    
+        return FileReference(filename=file.filename, type=content_type, gcsPath=object_path)
+
+
+    async def upload_files_to_gcs(self, job_id: str, files: list[UploadFile]) -> list[FileReference]:
+        """Upload all files of a job concurrently under a shared size budget
+        """
+        budget = UploadBudget()
+        tasks = [asyncio.create_task(self.upload_file_to_gcs(job_id, file, budget)) for file in files]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.delete_job_files(job_id)
+            raise
+
+
+    async def delete_job_files(self, job_id: str) -> None:
         try:
-            blob.upload_from_file(io.BytesIO(file.data), content_type=file.type)
-            logging.info("Success GCS Upload :%s", object_path)
+            await self.blobs.delete_prefix(f"{job_id}/")
         except Exception as e:
-            logging.error("Failed GCS Upload : %s", str(e))
-            raise RuntimeError(f"Failed to upload file to GCS: {e}")
-        
-        logging.info(f"Upload file {file.filename} to GCS: gs://{self.bucket_name}/{object_path}")    
-        return object_path
+            logging.warning(f"Failed to clean up uploads of job {job_id}: {e}")
     
     
-    def add_job(self, theme: str, file_data: list[File], settings: SlideSettings) -> Job:
-        """Create a Job in Firestore -> Upload a file to GCS -> Create a Cloud Task -> Return the Job structure
+    async def add_job(
+        self,
+        theme: str,
+        files: list[UploadFile],
+        settings: SlideSettings,
+        use_cache: bool = True,
+        trace_id: str | None = None,
+        client_id: str | None = None,
+    ) -> Job:
+        """Create a Job in Firestore -> Stream files to GCS -> Create a Cloud Task -> Return the Job structure.
+           An identical earlier request (same files, theme and settings) completes the job immediately
+           from the result cache unless `use_cache` is False.
+           `trace_id` follows the job to the slides service, which saves the stage timings of both.
+           Raises AdmissionRejected if `client_id` is over its rate limit or the job's lane is full.
         """
         job_id = str(uuid4())
         now = int(time.time())
-        
-        firestore_job = FirestoreJob(
-            id=job_id,
-            status=JobStatus.QUEUED.value,
-            message="Job added to queue",
-            createdAt=now,
-            updatedAt=now,
-        )
-        
+        trace = start_trace(trace_id, job_id)
+        lane = job_lane(files)
+
+        if client_id is not None:
+            await self.admission.check_rate(client_id)
+
+        cache_key = None
+        if self.result_cache.enabled:
+            with span("content_hash", files=len(files)):
+                cache_key = await content_key(theme, settings.model_dump(), files)
+            cached_result = await self.result_cache.lookup(cache_key) if use_cache else None
+            if cached_result is not None:
+                return await self.complete_from_cache(job_id, theme, settings, cached_result)
+
+        # Cache hits cost no generation, so only new work needs a slot in its lane
+        await self.admission.check_capacity(lane)
+
+        job = self.new_job(job_id, theme, settings, now)
+        document = self.job_document(job, trace.trace_id, lane)
+
         try:
-            logging.info(f"Saving Firestore job: {firestore_job.model_dump()}")
-            self.collection().document(job_id).set(firestore_job.model_dump())
+            logging.info(f"Saving Firestore job: {document}")
+            with span("job_store"):
+                await self.store.set("jobs", job_id, document)
         except Exception as e:
             logging.error(f"Firestore save failed: {e}")
             raise RuntimeError("failed to store job")
 
-        job = Job(
+        await self.enqueue_job(job, files, trace, lane, cache_key)
+        return job
+
+
+    def new_job(self, job_id: str, theme: str, settings: SlideSettings, now: int) -> Job:
+        return Job(
             id=job_id,
             theme=theme,
-            files=file_data,
+            files=[],
             settings=settings,
             status=JobStatus.QUEUED,
             message="Job added to queue",
             createdAt=now,
             updatedAt=now
         )
-        
-        file_refs = []
-        for file in file_data:
-            try:
-                gcs_path = self.upload_file_to_gcs(job_id, file)
-            except Exception as e:
-                self.update_job_status(job, JobStatus.FAILED, f"Failed to upload file {file.filename}: {e}", "")
-                raise RuntimeError(f"failed to upload file: {e}")
-                
-            file_refs.append(FileReference(filename=file.filename, type=file.type, gcsPath=gcs_path))
+
+
+    def job_document(self, job: Job, trace_id: str, lane: str) -> dict:
+        firestore_job = FirestoreJob(
+            id=job.id,
+            status=job.status.value,
+            message=job.message,
+            createdAt=job.createdAt,
+            updatedAt=job.updatedAt,
+        )
+        return {**firestore_job.model_dump(), "traceId": trace_id, "lane": lane}
+
+
+    async def enqueue_job(self, job: Job, files: list[UploadFile], trace: Trace, lane: str, cache_key: str | None) -> None:
+        """Upload the files of a stored job and create its task. Marks the job failed and raises if either fails
+        """
+        job_id = job.id
+        try:
+            file_refs = await self.upload_files_to_gcs(job_id, files)
+        except UploadTooLargeError as e:
+            await self.update_job_status(job, JobStatus.FAILED, str(e), "")
+            raise
+        except Exception as e:
+            await self.update_job_status(job, JobStatus.FAILED, f"Failed to upload files: {e}", "")
+            raise RuntimeError(f"failed to upload file: {e}")
 
         task_payload = TaskPayload(
             jobID=job_id,
-            theme=theme,
+            theme=job.theme,
             files=file_refs,
-            settings=settings
+            settings=job.settings
         )
         
         try:
-            self.__create_cloud_task(task_payload)
+            with span("task_enqueue"):
+                # The slides service continues the trace and adds its stages to these timings
+                await self.dispatcher.dispatch({
+                    **task_payload.model_dump(),
+                    "traceId": trace.trace_id,
+                    "stageTimings": trace.summary(),
+                    "lane": lane,
+                })
         except Exception as e:
-            self.update_job_status(job, JobStatus.FAILED, f"Failed to queue job: {e}", "") 
+            await self.update_job_status(job, JobStatus.FAILED, f"Failed to queue job: {e}", "") 
             raise RuntimeError(f"failed to create Cloud Task: {e}")
-        
-        return job
-    
-    
-    def __create_cloud_task(self, payload: TaskPayload):
-        parent = self.tasks_client.queue_path(self.project_id, self.region, self.queue_id)
-        task_url = f"{self.service_url}/tasks/process-slides"
-        
+
+        if cache_key is not None:
+            await self.result_cache.record(cache_key, job_id)
+
+
+    async def add_jobs(
+        self,
+        specs: list[tuple[str, list[UploadFile], SlideSettings, bool]],
+        trace_id: str | None = None,
+        client_id: str | None = None,
+    ) -> tuple[str, list[Job | Exception]]:
+        """Create a batch of jobs from (theme, files, settings, use_cache) specs. Like add_job, except that
+           the job documents are stored with batched writes and cache lookups, uploads and task creations
+           run concurrently, at most BATCH_CONCURRENCY at a time. Batch jobs always use the batch lane
+           and the client's rate limit is charged once per batch.
+           Returns the batch ID and, for each spec, its Job or the exception that rejected it.
+        """
+        batch_id = str(uuid4())
+        now = int(time.time())
+        trace_id = trace_id or new_trace_id()
+        limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        if client_id is not None:
+            await self.admission.check_rate(client_id)
+
+        async def admit(theme: str, files: list[UploadFile], settings: SlideSettings, use_cache: bool):
+            job_id = str(uuid4())
+            # Each job gets its own trace (sharing the batch's trace ID), in this task's context
+            trace = start_trace(trace_id, job_id)
+            async with limit:
+                cache_key = None
+                if self.result_cache.enabled:
+                    with span("content_hash", files=len(files)):
+                        cache_key = await content_key(theme, settings.model_dump(), files)
+                    cached_result = await self.result_cache.lookup(cache_key) if use_cache else None
+                    if cached_result is not None:
+                        return await self.complete_from_cache(job_id, theme, settings, cached_result)
+                await self.admission.check_capacity("batch")
+            return self.new_job(job_id, theme, settings, now), files, trace, cache_key
+
+        admitted = await asyncio.gather(*(admit(*spec) for spec in specs), return_exceptions=True)
+        results: list[Job | Exception] = [outcome[0] if isinstance(outcome, tuple) else outcome for outcome in admitted]
+        pending = [(index, *outcome) for index, outcome in enumerate(admitted) if isinstance(outcome, tuple)]
+
+        # Written first, so every job that exists can be found through its batch
         try:
-            payload_bytes = json.dumps(payload.model_dump()).encode()
+            await self.store.set("batches", batch_id, {
+                "id": batch_id,
+                "jobIds": [job.id for job in results if isinstance(job, Job)],
+                "traceId": trace_id,
+                "createdAt": now,
+                "expiresAt": now + BATCH_TTL_SECONDS,
+            })
         except Exception as e:
-            raise RuntimeError(f"Failed to serialize task payload: {e}")
-
-        task = {
-            "http_request": {
-                "http_method": tasks_v2.HttpMethod.POST,
-                "url": task_url,
-                "headers": {"Content-Type": "application/json"},
-                "body": payload_bytes,
-                "oidc_token": {
-                    "service_account_email": f"slides-service-invoker@{self.project_id}.iam.gserviceaccount.com",
-                    "audience": task_url
-                }
-            }
-        }
+            logging.error(f"Firestore save failed: {e}")
+            raise RuntimeError("failed to store batch")
+
+        writes = [
+            Write("set", "jobs", job.id, {**self.job_document(job, trace_id, "batch"), "batchId": batch_id})
+            for _, job, _, _, _ in pending
+        ]
+        with span("job_store", jobs=len(writes)):
+            outcomes = await commit_in_chunks(self.store, writes)
+
+        async def enqueue(index: int, job: Job, files: list[UploadFile], trace: Trace, cache_key: str | None) -> None:
+            use_trace(trace)
+            async with limit:
+                try:
+                    await self.enqueue_job(job, files, trace, "batch", cache_key)
+                except Exception as e:
+                    results[index] = e
+
+        stored = []
+        for (index, job, files, trace, cache_key), error in zip(pending, outcomes):
+            if error is not None:
+                results[index] = RuntimeError("failed to store job")
+            else:
+                stored.append(enqueue(index, job, files, trace, cache_key))
+        await asyncio.gather(*stored)
+
+        logging.info(f"Batch {batch_id}: {sum(isinstance(job, Job) for job in results)} of {len(specs)} jobs accepted")
+        return batch_id, results
+
+
+    async def get_batch(self, batch_id: str) -> dict | None:
+        """Status of every job of a batch, or None if the batch does not exist or has expired
+        """
+        try:
+            batch = await self.store.get("batches", batch_id)
+        except Exception as e:
+            logging.error(f"Error retrieving batch {batch_id}: {e}")
+            return None
+        if batch is None or is_expired(batch):
+            return None
+
+        jobs = await self.get_jobs(batch["jobIds"])
+        counts: dict[str, int] = {}
+        for job in jobs:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"id": batch_id, "createdAt": batch["createdAt"], "counts": counts, "jobs": jobs}
+
+
+    async def complete_from_cache(self, job_id: str, theme: str, settings: SlideSettings, cached_result: dict) -> Job:
+        """Create an already completed job whose result points at the cached artifacts.
+           The job and its results document are written in one batch.
+        """
+        now = int(time.time())
+        message = "Slides generated successfully"
+        result_url = f"/results/{job_id}"
+
+        firestore_job = FirestoreJob(
+            id=job_id,
+            status=JobStatus.COMPLETED.value,
+            message=message,
+            createdAt=now,
+            updatedAt=now,
+        )
+        # The copy shares the cached objects, so it must not outlive them
+        result = {**cached_result, "id": job_id, "resultUrl": result_url, "cachedFrom": cached_result["id"]}
+
+        try:
+            await self.store.commit([
+                Write("set", "jobs", job_id, {**firestore_job.model_dump(), "expiresAt": now + COMPLETED_JOB_TTL_SECONDS}),
+                Write("set", "results", job_id, result),
+            ])
+        except Exception as e:
+            logging.error(f"Firestore save failed: {e}")
+            raise RuntimeError("failed to store job")
 
-        self.tasks_client.create_task(request={"parent": parent, "task": task})
+        logging.info(f"Job {job_id} served from result cache (source job {cached_result['id']})")
+        return Job(
+            id=job_id,
+            theme=theme,
+            files=[],
+            settings=settings,
+            status=JobStatus.COMPLETED,
+            message=message,
+            resultUrl=result_url,
+            createdAt=now,
+            updatedAt=now
+        )
     
     
-    def update_job_status(self, job: Job, status: JobStatus, message: str, result_url: str = ""):
+    async def update_job_status(self, job: Job, status: JobStatus, message: str, result_url: str = ""):
         now = int(time.time())
         
         updates = {
@@ -160,9 +447,11 @@ class QueueService:
             "message": message,
             "updatedAt": now,
         }
+        if status == JobStatus.FAILED:
+            updates["expiresAt"] = now + FAILED_JOB_TTL_SECONDS
         
         try: 
-            self.collection().document(job.id).update(updates)
+            await self.store.update("jobs", job.id, updates)
         except Exception as e:
             logging.error(f"Failed to update job status in Firestore: {e}")
             
@@ -175,42 +464,27 @@ class QueueService:
         logging.info(f"Job {job.id} updated: status={status}, message={message}")
     
     
-    def get_job_by_id(self, job_id: str):
+    async def get_job_by_id(self, job_id: str):
         try:
-            doc = self.collection().document(job_id).get()
-        except NotFound:
-            logging.info(f"Job {job_id} not found in Firestore")
-            return None
+            firestore_job_data = await self.read_job(job_id)
         except Exception as e:
             logging.error(f"Error retrieving job {job_id}: {e}")
             return None
         
-        if not doc.exists:
-            logging.info(f"Job {job_id} does not exise")
-            return None
-        
-        firestore_job_data = doc.to_dict()
         if firestore_job_data is None:
-            logging.warning("Job data is None")
+            logging.info(f"Job {job_id} does not exist")
             return None
         
-        now = int(time.time())
-        expires_at = firestore_job_data.get("expiresAt", 0)
-        if expires_at is not None and expires_at > 0 and now > expires_at:
-            try:
-                self.collection().document(job_id).delete()
-                logging.info(f"Deleted expired job {job_id}")
-            except Exception as e:
-                logging.error(f"Failed to delete expired job {job_id}: {e}")
+        # Expired documents are deleted by the sweeper; reads only hide them
+        if is_expired(firestore_job_data):
             return None
         
         result_url = None
         if firestore_job_data.get("status") == JobStatus.COMPLETED.value:
             try:
-                result_doc = self.results_collection().document(job_id).get()
-                if result_doc.exists:
-                    result_data = result_doc.to_dict()
-                    result_data = result_data.get("resultUrl")
+                result_doc = await self.read_result(job_id)
+                if result_doc is not None:
+                    result_url = result_doc.get("resultUrl")
             except Exception as e:
                 logging.warning(f"Failed to fetch result for job {job_id}: {e}")
 
@@ -221,106 +495,161 @@ class QueueService:
             "resultUrl": result_url,
             "createdAt": firestore_job_data["createdAt"],
             "updatedAt": firestore_job_data["updatedAt"],
+            "progress": firestore_job_data.get("progress"),
+            "preview": firestore_job_data.get("preview"),
         }    
         
     
+    async def get_jobs(self, job_ids: list[str]) -> list[dict]:
+        """Compact status of many jobs, in the order of `job_ids`, from two multi-document reads:
+           the jobs, then the results of those that completed. Jobs that do not exist or have
+           expired are reported with the status "missing".
+        """
+        job_ids = list(dict.fromkeys(job_ids))
+        if not job_ids:
+            return []
+        # Finished jobs come from memory; only the rest are read
+        documents = {job_id: self.job_cache.get(job_id) for job_id in job_ids}
+        unknown = [job_id for job_id, doc in documents.items() if doc is None]
+        if unknown:
+            for job_id, doc in zip(unknown, await self.store.get_many("jobs", unknown)):
+                documents[job_id] = doc
+                if doc is not None:
+                    self.remember_job(job_id, doc)
+
+        now = int(time.time())
+        live = {job_id: doc for job_id, doc in documents.items() if doc is not None and not is_expired(doc, now)}
+        completed = [job_id for job_id, doc in live.items() if doc.get("status") == JobStatus.COMPLETED.value]
+        results = {job_id: self.result_meta_cache.get(job_id) for job_id in completed}
+        unknown = [job_id for job_id, doc in results.items() if doc is None]
+        if unknown:
+            try:
+                for job_id, doc in zip(unknown, await self.store.get_many("results", unknown)):
+                    results[job_id] = doc
+                    if doc is not None:
+                        self.result_meta_cache.put(job_id, doc, doc.get("expiresAt") or 0)
+            except Exception as e:
+                logging.warning(f"Failed to fetch results of {len(unknown)} jobs: {e}")
+        result_urls = {job_id: doc.get("resultUrl") for job_id, doc in results.items() if doc is not None}
+
+        summaries = []
+        for job_id in job_ids:
+            doc = live.get(job_id)
+            if doc is None:
+                summaries.append({"id": job_id, "status": "missing"})
+                continue
+            summaries.append({
+                "id": job_id,
+                "status": doc["status"],
+                "message": doc.get("message"),
+                "resultUrl": result_urls.get(job_id),
+                "updatedAt": doc.get("updatedAt"),
+                "progress": doc.get("progress"),
+            })
+        return summaries
+
+
     async def stream_events(self, request: Request, job_id: str) -> AsyncGenerator[str, None]:
         """Streams real-time job status updates via Server-Sent Events (SSE).
+           All connections watching the same job share one job store listener through the hub.
         """
-        queue: asyncio.Queue = asyncio.Queue()
-
-        watch_task = asyncio.create_task(self.watch_job(job_id, queue))
+        try:
+            subscription = await self.hub.subscribe(job_id)
+        except LookupError:
+            yield f"event: close\ndata: {json.dumps({ 'id': job_id, 'status': 'failed', 'message': 'Job not found' })}\n\n"
+            return
 
+        idle = 0
         try:
             while True:
-                if await request.is_disconnected():
-                    watch_task.cancel()
-                    break
-
-                try:
-                    update = await asyncio.wait_for(queue.get(), timeout=30)
-                except asyncio.TimeoutError:
-                    yield "event: ping\ndata: {}\n\n"
-                    continue
-
+                # Wake up every second so a closed connection releases its subscription promptly
+                update = await subscription.get(timeout=SSE_DISCONNECT_CHECK_SECONDS)
                 if update is None:
-                    break
+                    if await request.is_disconnected():
+                        break
+                    idle += SSE_DISCONNECT_CHECK_SECONDS
+                    if idle >= SSE_HEARTBEAT_SECONDS:
+                        idle = 0
+                        yield "event: ping\ndata: {}\n\n"
+                    continue
 
+                idle = 0
                 yield f"event: update\ndata: {json.dumps(update)}\n\n"
 
-                if update["status"] in ("completed", "failed"):
+                if update["status"] in TERMINAL_STATUSES:
                     yield f"event: close\ndata: {json.dumps({ 'id': update['id'], 'status': update['status'], 'message': 'Stream closing normally' })}\n\n"
                     await asyncio.sleep(0.3)
                     break
         finally:
-            watch_task.cancel()
-        
-  
-    async def watch_job(self, job_id: str, updates: asyncio.Queue) -> None:
-        loop = asyncio.get_event_loop()
+            self.hub.unsubscribe(subscription)
 
-        doc_ref = self.db.collection("jobs").document(job_id)
-        doc = doc_ref.get()
-        if not doc.exists:
-            raise ValueError("job not found")
 
-        data = doc.to_dict()
-        await updates.put({
+    async def poll_job(self, request: Request, job_id: str, unchanged, wait: float) -> dict | None:
+        """Latest state of a job for a conditional request, held up to `wait` seconds while
+           `unchanged(state)` is true. Held requests wait on the hub's shared listener instead of
+           reading the job store. Returns None if the job does not exist.
+        """
+        try:
+            if wait <= 0:
+                # A job someone is already watching is answered without a read
+                return self.hub.peek(job_id) or await self.load_job_state(job_id)
+            return await self.hub.wait(
+                job_id, unchanged, min(wait, LONG_POLL_MAX_SECONDS),
+                disconnected=request.is_disconnected, check_interval=SSE_DISCONNECT_CHECK_SECONDS)
+        except LookupError:
+            return None
+        except Exception as e:
+            logging.error(f"Error retrieving job {job_id}: {e}")
+            return None
+
+
+    def job_state(self, job_id: str, data: dict) -> dict:
+        return {
             "id": job_id,
             "status": data.get("status"),
             "message": data.get("message"),
             "resultUrl": data.get("resultUrl"),
-            "updatedAt": data.get("updatedAt")
-        })
+            "updatedAt": data.get("updatedAt"),
+            # Written by the slides worker while the model streams the deck
+            "progress": data.get("progress"),
+            "preview": data.get("preview"),
+        }
 
-        if data.get("status") in [JobStatus.COMPLETED, JobStatus.FAILED]:
-            return
 
-        stop_event = asyncio.Event()
-
-        def on_snapshot(docs, changes, read_time):
-            for doc in docs:
-                data = doc.to_dict()
-                result_url = data.get("resultUrl")
-                
-                if data.get("status") == JobStatus.COMPLETED.value:
-                    try:
-                        result_doc = self.db.collection("results").document(job_id).get()
-                        if result_doc.exists:
-                            result_data = result_doc.to_dict()
-                            result_url = result_data.get("resultUrl", result_url)
-                    except Exception as e:
-                        print(f"Failed to fetch resultUrl from results/{job_id}: {e}")
-
-                update = {
-                    "id": job_id,
-                    "status": data.get("status"),
-                    "message": data.get("message"),
-                    "resultUrl": result_url,
-                    "updatedAt": data.get("updatedAt"),
-                }
-
-                asyncio.run_coroutine_threadsafe(updates.put(update), loop)
-
-                if update["status"] in [JobStatus.COMPLETED.value, JobStatus.FAILED.value]:
-                    asyncio.run_coroutine_threadsafe(stop_event.set(), loop)
-
-        unsubscribe = doc_ref.on_snapshot(on_snapshot)
+    async def load_job_state(self, job_id: str) -> dict | None:
+        data = await self.read_job(job_id)
+        if data is None or is_expired(data):
+            return None
+        return await self.with_result_url(self.job_state(job_id, data))
 
+
+    def listen_job(self, job_id: str, on_change):
+        """Watch a job in the job store and return the unsubscribe function
+        """
+        return self.store.watch("jobs", job_id, lambda data: on_change(self.job_state(job_id, data)))
+
+
+    async def with_result_url(self, state: dict) -> dict:
+        """Fill in the result URL of a completed job from its results document
+        """
+        if state.get("status") != JobStatus.COMPLETED.value:
+            return state
         try:
-            await stop_event.wait()
-        except asyncio.CancelledError:
-            pass
-        finally:
-            unsubscribe() 
+            result_doc = await self.read_result(state["id"])
+            if result_doc is not None:
+                state["resultUrl"] = result_doc.get("resultUrl", state.get("resultUrl"))
+        except Exception as e:
+            logging.warning(f"Failed to fetch resultUrl from results/{state['id']}: {e}")
+        return state
     
     
-    def get_result_by_id(self, job_id: str) -> FirestoreResult:
+    async def get_result_by_id(self, job_id: str) -> dict:
         """
-        Retrieve the slide generation result from Firestore.
+        Retrieve the slide generation result metadata from the job store.
 
         If the result is missing or expired, raises an exception.
-        Returns a FirestoreResult object containing the PDF/HTML content and metadata.
+        The PDF/HTML bytes are stored in the blob store; the returned document holds
+        `pdf` and `html` entries with their object path, size and content type.
 
         Args:
             job_id (str): The ID of the job to retrieve
@@ -329,31 +658,51 @@ class QueueService:
             RuntimeError: If the result is not found, expired, or cannot be parsed
 
         Returns:
-            FirestoreResult: Contains presentation result data and timestamps
+            dict: Result metadata and timestamps
         """
         try:
-            doc = self.results_collection().document(job_id).get()
-        except NotFound:
-            raise RuntimeError("result not found")
+            result_data = await self.read_result(job_id)
         except Exception as e:
             raise RuntimeError(f"error retrieving result: {e}")
 
-        if not doc.exists:
-            raise RuntimeError("result not found")
-
-        result_data = doc.to_dict()
         if result_data is None:
-            raise RuntimeError("result data is empty")
+            raise RuntimeError("result not found")
 
-        now = int(time.time())
-        expires_at = result_data.get("expiresAt", 0)
-        if expires_at > 0 and now > expires_at:
-            try:
-                self.results_collection().document(job_id).delete()
-                logging.info(f"Deleted expired result {job_id}")
-            except Exception as e:
-                logging.warning(f"Failed to delete expired result {job_id}: {e}")
+        if is_expired(result_data):
             raise RuntimeError("result has expired")
 
-        return FirestoreResult(**result_data)
-    
\ No newline at end of file
+        return result_data
+
+
+    async def stream_result(self, gcs_path: str, start: int, end: int, size: int = 0, expires_at: int = 0) -> AsyncGenerator[bytes, None]:
+        """Yield bytes `start`..`end` (inclusive) of a result object in chunks,
+           so the API never holds a whole deck in memory.
+           Objects of `size` up to RESULT_PAYLOAD_CACHE_MAX_OBJECT_BYTES are read whole once
+           and served from memory until the result's `expires_at`.
+        """
+        if size > 0 and self.payload_cache.accepts(size):
+            data = self.payload_cache.get(gcs_path)
+            if data is None:
+                data = await self.blobs.read_range(gcs_path, 0, size - 1)
+                self.payload_cache.put(gcs_path, data, expires_at, size=len(data))
+            yield data[start:end + 1]
+            return
+
+        offset = start
+        while offset <= end:
+            chunk_end = min(offset + RESULT_CHUNK_BYTES - 1, end)
+            chunk = await self.blobs.read_range(gcs_path, offset, chunk_end)
+            if not chunk:
+                break
+            yield chunk
+            offset += len(chunk)
+
+
+    async def signed_result_url(self, gcs_path: str, filename: str | None = None) -> str:
+        """Create a short-lived signed URL for a result object.
+           Raises RuntimeError if the blob store cannot hand out URLs (e.g. the local filesystem store).
+        """
+        url = await self.blobs.signed_url(gcs_path, SIGNED_URL_SECONDS, filename)
+        if url is None:
+            raise RuntimeError("blob store does not support signed URLs")
+        return url
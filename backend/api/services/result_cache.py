@@ -0,0 +1,153 @@
+import os
+import time
+import json
+import asyncio
+import hashlib
+import logging
+
+from fastapi import UploadFile
+from prometheus_client import Counter
+
+from services.backends import DocumentStore, Increment, Write
+
+
+HASH_CHUNK_BYTES = 1024 * 1024
+EVICTION_INTERVAL_SECONDS = 60
+
+# Bump to invalidate every entry when prompts or the model change
+CACHE_VERSION = os.getenv("RESULT_CACHE_VERSION", "1")
+
+RESULT_CACHE_EVENTS = Counter(
+    "api_result_cache_events_total",
+    "Lookups and evictions of the content-addressed result cache",
+    ["event"],
+)
+
+
+def normalize_settings(settings: dict) -> dict:
+    """Drop unset values and normalize strings so equivalent settings hash the same
+    """
+    normalized = {}
+    for key, value in settings.items():
+        if isinstance(value, str):
+            value = value.strip().lower()
+        if value in (None, ""):
+            continue
+        normalized[key] = value
+    return normalized
+
+
+async def file_digest(file: UploadFile) -> str:
+    """SHA-256 of an uploaded file. Reads the spooled upload and rewinds it for the GCS upload
+    """
+    digest = hashlib.sha256()
+    while chunk := await file.read(HASH_CHUNK_BYTES):
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest()
+
+
+async def content_key(theme: str, settings: dict, files: list[UploadFile]) -> str:
+    """Content hash over the file bytes, theme and normalized settings of a request
+    """
+    digests = [await file_digest(file) for file in files]
+    material = {
+        "version": CACHE_VERSION,
+        "theme": theme,
+        "settings": normalize_settings(settings),
+        "files": sorted([file.filename, digest] for file, digest in zip(files, digests)),
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+
+
+    def __init__(self, store: DocumentStore):
+        """Content-addressed index from request hash to the job whose result can be reused.
+           Entries only point at results documents, so a hit copies metadata and never the deck bytes.
+        """
+        self.store = store
+        self.ttl = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+        self.max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000"))
+        # A hit must leave the client enough time to download the result
+        self.min_remaining = int(os.getenv("RESULT_CACHE_MIN_REMAINING_SECONDS", "120"))
+        self.enabled = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._evicting = False
+        self._last_eviction = 0
+
+
+    async def lookup(self, key: str) -> dict | None:
+        """Return the results document cached under `key`, or None on a miss
+        """
+        now = int(time.time())
+        result = None
+        try:
+            entry = await self.store.get("result_cache", key)
+            if entry is not None and entry.get("expiresAt", 0) > now:
+                result_doc = await self.store.get("results", entry["jobId"])
+                if result_doc is not None and result_doc.get("expiresAt", 0) > now + self.min_remaining:
+                    result = result_doc
+        except Exception as e:
+            logging.warning(f"Result cache lookup failed for {key}: {e}")
+
+        if result is None:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        try:
+            await self.store.update("result_cache", key, {"lastUsedAt": now, "hits": Increment(1)})
+        except Exception as e:
+            logging.warning(f"Failed to touch result cache entry {key}: {e}")
+        return result
+
+
+    async def record(self, key: str, job_id: str) -> None:
+        """Point `key` at a newly queued job; the entry becomes a hit once its result exists
+        """
+        now = int(time.time())
+        try:
+            await self.store.set("result_cache", key, {
+                "jobId": job_id,
+                "createdAt": now,
+                "lastUsedAt": now,
+                "expiresAt": now + self.ttl,
+                "hits": 0,
+            })
+        except Exception as e:
+            logging.warning(f"Failed to record result cache entry {key}: {e}")
+            return
+
+        if not self._evicting and now - self._last_eviction >= EVICTION_INTERVAL_SECONDS:
+            asyncio.create_task(self.evict())
+
+
+    async def evict(self) -> None:
+        """Drop expired entries, then the least recently used ones above `max_entries`
+        """
+        self._evicting = True
+        self._last_eviction = int(time.time())
+        try:
+            now = self._last_eviction
+            stale = {doc_id for doc_id, _ in await self.store.query("result_cache", where=("expiresAt", "<=", now), limit=500)}
+
+            count = await self.store.count("result_cache") - len(stale)
+            if count > self.max_entries:
+                oldest = await self.store.query("result_cache", order_by="lastUsedAt", limit=min(count - self.max_entries, 500))
+                stale.update(doc_id for doc_id, _ in oldest)
+
+            if stale:
+                await self.store.commit([Write("delete", "result_cache", doc_id) for doc_id in stale])
+                self._count("evictions", len(stale))
+                logging.info(f"Evicted {len(stale)} result cache entries")
+        except Exception as e:
+            logging.warning(f"Result cache eviction failed: {e}")
+        finally:
+            self._evicting = False
+
+
+    def _count(self, event: str, amount: int = 1) -> None:
+        self.stats[event] += amount
+        RESULT_CACHE_EVENTS.labels(event).inc(amount)
@@ -0,0 +1,186 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Optional
+
+from services.backends import BlobStore, DocumentStore, Write
+from services.hub import TERMINAL_STATUSES
+
+
+SWEEP_INTERVAL_SECONDS = int(os.getenv("SWEEP_INTERVAL_SECONDS", "300"))
+# Documents deleted per query page and batched write (Firestore allows 500 writes per batch)
+SWEEP_BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", "200"))
+# Uploads of a finished job are kept this long, in case Cloud Tasks retries it, before they count as orphaned
+ORPHAN_GRACE_SECONDS = int(os.getenv("ORPHAN_GRACE_SECONDS", "3600"))
+# Failed jobs are kept this long so clients can read why, then deleted by the sweep
+FAILED_JOB_TTL_SECONDS = int(os.getenv("FAILED_JOB_TTL_SECONDS", "3600"))
+# A job whose lease expired this long ago lost its worker and no retry took it over, so it is failed
+ABANDONED_JOB_GRACE_SECONDS = int(os.getenv("ABANDONED_JOB_GRACE_SECONDS", "600"))
+SWEEP_CONCURRENCY = 16
+
+
+class LeaseRenewed(Exception):
+    """The job was claimed again (or deleted) after the abandoned job query
+    """
+
+
+class ExpirySweeper:
+
+
+    def __init__(
+        self,
+        store: DocumentStore,
+        blobs: BlobStore,
+        interval: int = SWEEP_INTERVAL_SECONDS,
+        batch_size: int = SWEEP_BATCH_SIZE,
+        orphan_grace: int = ORPHAN_GRACE_SECONDS,
+        abandoned_grace: int = ABANDONED_JOB_GRACE_SECONDS,
+    ):
+        """Deletes expired jobs and results in the background, so reads only compare `expiresAt`.
+           Also removes upload prefixes (`{job_id}/`) whose job is gone or finished long ago,
+           since the slides service's cleanup is best effort, and fails jobs whose worker died
+           holding the lease (processing jobs never expire on their own).
+        """
+        self.store = store
+        self.blobs = blobs
+        self.interval = interval
+        self.batch_size = batch_size
+        self.orphan_grace = orphan_grace
+        self.abandoned_grace = abandoned_grace
+        self.stats = {"runs": 0, "jobs": 0, "results": 0, "batches": 0, "rate_limits": 0, "orphans": 0, "abandoned": 0}
+        self._semaphore = asyncio.Semaphore(SWEEP_CONCURRENCY)
+        self._task: Optional[asyncio.Task] = None
+
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+    async def _run(self) -> None:
+        # Instances start at random offsets, so they rarely sweep at the same time
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logging.warning(f"Expiry sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+    async def sweep(self, now: Optional[int] = None) -> dict:
+        """Run one pass over jobs, results, batches, rate limit buckets and uploads and return how many of each were deleted
+           (and how many abandoned jobs were failed)
+        """
+        now = now or int(time.time())
+        deleted = {
+            # Before expired jobs, so one failed here gets a fresh `expiresAt` rather than lingering
+            "abandoned": await self.fail_abandoned_jobs(now),
+            "jobs": await self.sweep_collection("jobs", now),
+            "results": await self.sweep_collection("results", now),
+            "batches": await self.sweep_collection("batches", now),
+            # Rate limit buckets expire once they have refilled completely
+            "rate_limits": await self.sweep_collection("rate_limits", now),
+            "orphans": await self.sweep_orphans(now),
+        }
+        self.stats["runs"] += 1
+        for key, count in deleted.items():
+            self.stats[key] += count
+        if any(deleted.values()):
+            logging.info(f"Expiry sweep deleted {deleted}")
+        return deleted
+
+
+    async def sweep_collection(self, collection: str, now: int) -> int:
+        """Delete documents of `collection` whose `expiresAt` has passed, one page at a time.
+           Pages come from the `expiresAt` index in ascending order, so the first unexpired
+           document ends the pass. (`expiresAt` of 0 means the document never expires.)
+        """
+        deleted = 0
+        while True:
+            page = await self.store.query(collection, where=("expiresAt", ">", 0), order_by="expiresAt", limit=self.batch_size)
+            expired = [(doc_id, doc) for doc_id, doc in page if doc["expiresAt"] <= now]
+            if expired:
+                if collection == "results":
+                    # Objects first: if deleting the documents fails, the next pass finds them again
+                    await self.delete_result_objects(expired)
+                await self.store.commit([Write("delete", collection, doc_id) for doc_id, _ in expired])
+                deleted += len(expired)
+            if len(expired) < self.batch_size:
+                return deleted
+
+
+    async def fail_abandoned_jobs(self, now: int) -> int:
+        """Fail jobs whose lease expired more than `abandoned_grace` ago, so they stop holding a lane slot
+           and expire like any failed job. Each job is re-checked in a transaction, since a retried
+           delivery may have claimed it since the query.
+        """
+        def fail(job: Optional[dict]) -> dict:
+            lease = (job or {}).get("lease") or {}
+            if job is None or lease.get("expiresAt", 0) > now - self.abandoned_grace:
+                raise LeaseRenewed()
+            if job.get("status") in TERMINAL_STATUSES:
+                # Only the stale lease is left of a finished job
+                return {**job, "lease": None}
+            return {
+                **job,
+                "status": "failed",
+                "message": "Job was abandoned by its worker",
+                "lease": None,
+                "updatedAt": now,
+                "expiresAt": now + FAILED_JOB_TTL_SECONDS,
+            }
+
+        failed = 0
+        while True:
+            page = await self.store.query(
+                "jobs", where=("lease.expiresAt", "<=", now - self.abandoned_grace), order_by="lease.expiresAt", limit=self.batch_size,
+            )
+            for job_id, job in page:
+                try:
+                    await self.store.transact("jobs", job_id, fail)
+                except LeaseRenewed:
+                    continue
+                if job.get("status") not in TERMINAL_STATUSES:
+                    logging.warning(f"Failed job {job_id}, whose worker stopped renewing its lease at {int(job['lease']['expiresAt'])}")
+                    failed += 1
+            if len(page) < self.batch_size:
+                return failed
+
+
+    async def delete_result_objects(self, results: list[tuple[str, dict]]) -> None:
+        async def delete(job_id: str) -> None:
+            async with self._semaphore:
+                await self.blobs.delete_prefix(f"results/{job_id}/")
+
+        # Results served from the cache point at the source job's objects, which expire with them
+        await asyncio.gather(*(delete(job_id) for job_id, doc in results if not doc.get("cachedFrom")))
+
+
+    async def sweep_orphans(self, now: int) -> int:
+        """Delete upload prefixes whose job no longer exists or finished more than `orphan_grace` ago.
+           Jobs are stored before their uploads start, so a prefix without a job is never in use.
+        """
+        async def sweep(job_id: str) -> bool:
+            async with self._semaphore:
+                job = await self.store.get("jobs", job_id)
+                if job is not None and not (job.get("status") in TERMINAL_STATUSES and job.get("updatedAt", 0) <= now - self.orphan_grace):
+                    return False
+                await self.blobs.delete_prefix(f"{job_id}/")
+                return True
+
+        prefixes = [prefix for prefix in await self.blobs.list_prefixes() if prefix != "results"]
+        swept = await asyncio.gather(*(sweep(prefix) for prefix in prefixes), return_exceptions=True)
+        for prefix, outcome in zip(prefixes, swept):
+            if isinstance(outcome, Exception):
+                logging.warning(f"Failed to sweep uploads of {prefix}: {outcome}")
+        return sum(outcome is True for outcome in swept)
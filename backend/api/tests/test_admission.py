@@ -0,0 +1,90 @@
+import io
+import time
+import asyncio
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from services import admission
+from services.admission import AdmissionController, AdmissionRejected, job_lane, take_token
+from services.backends.local import MemoryStore, SQLiteStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "jobs.db"), poll_interval=0.01)
+
+
+def upload(size: int) -> UploadFile:
+    return UploadFile(io.BytesIO(b"x" * size), size=size, filename="a.md")
+
+
+def test_token_bucket_refills_over_time():
+    """토큰 버킷은 버스트만큼 허용한 뒤 경과 시간에 비례해 다시 채워진다."""
+    bucket = None
+    for _ in range(3):
+        bucket = take_token(bucket, 0, rate_per_minute=6, burst=3)
+        assert bucket["allowed"]
+    assert not take_token(bucket, 0, 6, 3)["allowed"]
+    assert take_token(bucket, 10, 6, 3)["allowed"]
+
+
+def test_rate_limit_is_shared_across_instances(store, monkeypatch):
+    """같은 저장소를 쓰는 여러 인스턴스가 한 클라이언트의 버킷을 공유하고, 초과 시 429와 Retry-After를 낸다."""
+    monkeypatch.setattr(admission, "RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setattr(admission, "RATE_LIMIT_BURST", 2)
+
+    async def scenario():
+        first, second = AdmissionController(store), AdmissionController(store)
+        await first.check_rate("10.0.0.1")
+        await second.check_rate("10.0.0.1")
+        await first.check_rate("10.0.0.2")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await second.check_rate("10.0.0.1")
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert 1 <= rejected.retry_after <= 60
+
+
+def test_full_lane_is_rejected_without_blocking_the_other(store, monkeypatch):
+    """배치 레인이 가득 차면 503을 내지만 인터랙티브 레인은 계속 받는다."""
+    monkeypatch.setitem(admission.LANE_CAPACITY, "batch", 2)
+    monkeypatch.setattr(admission, "DEPTH_REFRESH_SECONDS", 0)
+
+    async def scenario():
+        await store.set("jobs", "a", {"lane": "batch", "status": "queued"})
+        await store.set("jobs", "b", {"lane": "batch", "status": "processing", "lease": {"owner": "x", "expiresAt": time.time() + 60}})
+        await store.set("jobs", "c", {"lane": "batch", "status": "completed"})
+        controller = AdmissionController(store)
+        await controller.check_capacity("interactive")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.check_capacity("batch")
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.retry_after >= 1
+
+
+def test_processing_jobs_with_an_expired_lease_do_not_hold_a_slot(store, monkeypatch):
+    """워커가 죽어 리스가 만료된 처리 중 작업은 레인 정원에 세지 않는다."""
+    monkeypatch.setitem(admission.LANE_CAPACITY, "batch", 2)
+    monkeypatch.setattr(admission, "DEPTH_REFRESH_SECONDS", 0)
+
+    async def scenario():
+        now = time.time()
+        await store.set("jobs", "a", {"lane": "batch", "status": "processing", "lease": {"owner": "x", "expiresAt": now + 60}})
+        await store.set("jobs", "b", {"lane": "batch", "status": "processing", "lease": {"owner": "y", "expiresAt": now - 60}})
+        return await AdmissionController(store).active_jobs("batch")
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_small_single_files_use_the_interactive_lane():
+    assert job_lane([upload(1024)]) == "interactive"
+    assert job_lane([upload(1024), upload(1024)]) == "batch"
+    assert job_lane([upload(admission.INTERACTIVE_MAX_BYTES + 1)]) == "batch"
@@ -0,0 +1,198 @@
+import gc
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.backends import Increment, Write
+from services.backends.local import FileBlobStore, MemoryStore, SQLiteStore
+from services.result_cache import ResultCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / "jobs.db"), poll_interval=0.01)
+
+
+def test_documents_round_trip_and_merge(store):
+    """문서를 저장·병합·삭제하고, 없는 문서를 수정하면 KeyError를 낸다."""
+    async def scenario():
+        await store.set("jobs", "a", {"status": "queued", "hits": 0})
+        await store.update("jobs", "a", {"status": "processing", "hits": Increment(2)})
+        assert await store.get("jobs", "a") == {"status": "processing", "hits": 2}
+
+        with pytest.raises(KeyError):
+            await store.update("jobs", "missing", {"status": "failed"})
+
+        await store.delete("jobs", "a")
+        assert await store.get("jobs", "a") is None
+
+    asyncio.run(scenario())
+
+
+def test_batches_are_atomic(store):
+    """배치 중 하나라도 실패하면 어떤 쓰기도 적용되지 않는다."""
+    async def scenario():
+        with pytest.raises(KeyError):
+            await store.commit([
+                Write("set", "results", "a", {"id": "a"}),
+                Write("update", "jobs", "a", {"status": "completed"}),
+            ])
+        assert await store.get("results", "a") is None
+
+    asyncio.run(scenario())
+
+
+def test_get_many_keeps_order_and_reports_missing(store):
+    """여러 문서를 한 번에 읽으며 요청 순서를 유지하고, 없는 문서는 None으로 돌려준다."""
+    async def scenario():
+        await store.set("jobs", "a", {"n": 1})
+        await store.set("jobs", "b", {"n": 2})
+        return await store.get_many("jobs", ["b", "missing", "a"])
+
+    assert asyncio.run(scenario()) == [{"n": 2}, None, {"n": 1}]
+
+
+def test_query_filters_orders_and_limits(store):
+    async def scenario():
+        for n in range(5):
+            await store.set("result_cache", f"k{n}", {"expiresAt": 100 + n, "lastUsedAt": 10 - n})
+        expired = await store.query("result_cache", where=("expiresAt", "<=", 102))
+        oldest = await store.query("result_cache", order_by="lastUsedAt", limit=2)
+        return sorted(doc_id for doc_id, _ in expired), [doc_id for doc_id, _ in oldest], await store.count("result_cache")
+
+    assert asyncio.run(scenario()) == (["k0", "k1", "k2"], ["k4", "k3"], 5)
+
+
+def test_watch_reports_current_state_and_changes(store):
+    """감시를 시작하면 현재 상태를, 이후에는 변경 사항을 전달한다."""
+    async def scenario():
+        seen = []
+        await store.set("jobs", "a", {"status": "queued"})
+        unsubscribe = store.watch("jobs", "a", lambda data: seen.append(data["status"]))
+        await store.update("jobs", "a", {"status": "processing"})
+        await asyncio.sleep(0.1)
+        unsubscribe()
+        await store.update("jobs", "a", {"status": "completed"})
+        await asyncio.sleep(0.1)
+        return seen
+
+    assert asyncio.run(scenario()) == ["queued", "processing"]
+
+
+def test_file_blob_store(tmp_path):
+    """파일 시스템 저장소는 구간 읽기를 지원하고, 실패한 업로드나 루트 밖 경로는 남기지 않는다."""
+    blobs = FileBlobStore(str(tmp_path))
+
+    async def chunks(*parts, fail=False):
+        for part in parts:
+            yield part
+        if fail:
+            raise RuntimeError("client went away")
+
+    async def scenario():
+        assert await blobs.write_stream("job/a.md", chunks(b"hello ", b"world"), "text/markdown") == 11
+        assert await blobs.read_range("job/a.md", 6, 10) == b"world"
+
+        with pytest.raises(RuntimeError):
+            await blobs.write_stream("job/b.md", chunks(b"partial", fail=True), "text/markdown")
+        assert sorted(p.name for p in (tmp_path / "job").iterdir()) == ["a.md"]
+
+        with pytest.raises(ValueError):
+            await blobs.write_stream("job/../../escape.md", chunks(b"x"), "text/markdown")
+
+        await blobs.delete_prefix("job/")
+        assert not (tmp_path / "job").exists()
+        assert await blobs.signed_url("job/a.md", 60) is None
+
+    asyncio.run(scenario())
+
+
+def test_gcs_upload_that_fails_midway_leaves_no_object():
+    """GCS 업로드 스트림이 중간에 실패하면 재개 가능한 업로드를 취소해 잘린 객체가 남지 않는다."""
+    pytest.importorskip("google.cloud.storage")
+    from google.cloud.storage.fileio import BlobWriter
+    from services.backends.gcp import GCSBlobStore
+
+    stored = {}
+
+    class FakeUpload:
+
+
+        def __init__(self, path, stream):
+            self.path = path
+            self.stream = stream
+            self.upload_url = f"session/{path}"
+
+
+        def transmit_next_chunk(self, transport, **kwargs):
+            # The last chunk finalizes the resumable session and creates the object
+            stored[self.path] = self.stream.read()
+
+
+    class FakeTransport:
+
+
+        def delete(self, url):
+            pass
+
+
+    class FakeBlob:
+
+
+        def __init__(self, path):
+            self.path = path
+            self.bucket = SimpleNamespace(client=None)
+
+
+        def _initiate_resumable_upload(self, client, stream, content_type, size, **kwargs):
+            return FakeUpload(self.path, stream), FakeTransport()
+
+
+        def open(self, mode, chunk_size, content_type):
+            return BlobWriter(self, chunk_size=chunk_size, content_type=content_type)
+
+
+    blobs = GCSBlobStore.__new__(GCSBlobStore)
+    blobs.get_bucket = lambda: SimpleNamespace(blob=FakeBlob)
+
+    async def chunks(*parts, fail=False):
+        for part in parts:
+            yield part
+        if fail:
+            raise RuntimeError("client went away")
+
+    async def scenario():
+        assert await blobs.write_stream("job/a.md", chunks(b"hello ", b"world"), "text/markdown") == 11
+        with pytest.raises(RuntimeError):
+            await blobs.write_stream("job/b.md", chunks(b"partial", fail=True), "text/markdown")
+
+    asyncio.run(scenario())
+    gc.collect()
+    assert stored == {"job/a.md": b"hello world"}
+
+
+def test_result_cache_hits_only_live_results():
+    """결과 캐시는 남은 유효 시간이 충분한 결과만 재사용하고, 만료된 항목을 정리한다."""
+    async def scenario():
+        store = MemoryStore()
+        cache = ResultCache(store)
+        now = int(time.time())
+
+        await store.set("results", "job-1", {"id": "job-1", "expiresAt": now + 3600})
+        await cache.record("key", "job-1")
+        assert (await cache.lookup("key"))["id"] == "job-1"
+        assert (await store.get("result_cache", "key"))["hits"] == 1
+
+        await store.set("results", "job-1", {"id": "job-1", "expiresAt": now + 10})
+        assert await cache.lookup("key") is None
+
+        await store.set("result_cache", "old", {"jobId": "job-0", "expiresAt": now - 1, "lastUsedAt": now - 100})
+        await cache.evict()
+        assert await store.get("result_cache", "old") is None
+        assert cache.stats == {"hits": 1, "misses": 1, "evictions": 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from services.backends import Write
+from services.backends.local import MemoryStore
+from services.batch import assign_files, commit_in_chunks
+
+
+def test_each_upload_belongs_to_exactly_one_job():
+    """배치의 각 업로드 파일은 정확히 하나의 작업에 속해야 한다."""
+    assert assign_files([{"files": [0, 2]}, {"files": [1]}], 3) == [[0, 2], [1]]
+
+    with pytest.raises(ValueError, match="used by jobs\\[0\\] and jobs\\[1\\]"):
+        assign_files([{"files": [0]}, {"files": [0, 1]}], 2)
+    with pytest.raises(ValueError, match="unknown upload"):
+        assign_files([{"files": [3]}], 1)
+    with pytest.raises(ValueError, match="not used"):
+        assign_files([{"files": [0]}], 2)
+    with pytest.raises(ValueError, match="non-empty"):
+        assign_files([{"files": []}], 0)
+
+
+def test_batched_writes_are_split_into_atomic_chunks():
+    """배치 쓰기는 제한 크기 단위로 나누어 커밋하고, 실패한 묶음만 오류로 보고한다."""
+    class FlakyStore(MemoryStore):
+
+
+        def __init__(self):
+            super().__init__()
+            self.commits = 0
+
+
+        async def commit(self, writes):
+            self.commits += 1
+            if self.commits == 2:
+                raise RuntimeError("unavailable")
+            await super().commit(writes)
+
+    async def scenario():
+        store = FlakyStore()
+        writes = [Write("set", "jobs", f"job-{n}", {"n": n}) for n in range(5)]
+        outcomes = await commit_in_chunks(store, writes, size=2)
+        return outcomes, sorted(doc_id for doc_id, _ in await store.query("jobs"))
+
+    outcomes, stored = asyncio.run(scenario())
+    assert [outcome is None for outcome in outcomes] == [True, True, False, False, True]
+    assert stored == ["job-0", "job-1", "job-4"]
@@ -0,0 +1,29 @@
+from utils.http_cache import choose_encoding, content_etag, etag_matches
+
+
+def test_choose_encoding():
+    """Accept-Encoding의 q 값을 따르고, 같으면 br을 gzip보다 우선한다."""
+    assert choose_encoding(None, ["br", "gzip"]) is None
+    assert choose_encoding("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert choose_encoding("gzip, deflate, br", ["gzip"]) == "gzip"
+    assert choose_encoding("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert choose_encoding("br;q=0, gzip;q=0", ["br", "gzip"]) is None
+    assert choose_encoding("*", ["gzip"]) == "gzip"
+    assert choose_encoding("identity", ["br", "gzip"]) is None
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_content_etag_changes_with_the_body():
+    body = {"id": "job", "status": "processing", "progress": {"slides": 1}}
+    etag = content_etag(body)
+    assert etag.startswith('W/"')
+    assert content_etag(dict(reversed(list(body.items())))) == etag
+    assert content_etag({**body, "progress": {"slides": 2}}) != etag
+    assert etag_matches(etag, etag)
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.hub import JobWatchHub, changed_since
+
+
+class FakeJobs:
+
+
+    def __init__(self, states: dict):
+        self.states = states
+        self.loads = 0
+        self.callbacks = {}
+
+
+    async def load_state(self, job_id: str):
+        self.loads += 1
+        return self.states.get(job_id)
+
+
+    def listen(self, job_id: str, on_change):
+        self.callbacks[job_id] = on_change
+        return lambda: self.callbacks.pop(job_id, None)
+
+
+    def push(self, job_id: str, state: dict):
+        # Firestore delivers snapshots on a background thread
+        thread = threading.Thread(target=self.callbacks[job_id], args=(state,))
+        thread.start()
+        thread.join()
+
+
+def state(status: str, updated_at: int) -> dict:
+    return {"id": "job-1", "status": status, "message": status, "resultUrl": None, "updatedAt": updated_at}
+
+
+def test_subscribers_share_one_listener_and_late_joiners_get_last_state():
+    """같은 작업을 구독하는 여러 연결은 리스너 하나를 공유하고, 늦게 합류한 구독자는 마지막 상태를 받는다."""
+    async def scenario():
+        jobs = FakeJobs({"job-1": state("queued", 1)})
+        hub = JobWatchHub(jobs.load_state, jobs.listen)
+
+        first = await hub.subscribe("job-1")
+        second = await hub.subscribe("job-1")
+        assert jobs.loads == 1
+        assert hub.listener_count() == 1
+        assert (await first.get(1))["status"] == "queued"
+        assert (await second.get(1))["status"] == "queued"
+
+        jobs.push("job-1", state("processing", 2))
+        assert (await first.get(1))["status"] == "processing"
+        assert (await second.get(1))["status"] == "processing"
+
+        late = await hub.subscribe("job-1")
+        assert (await late.get(1))["status"] == "processing"
+
+        for subscription in (first, second, late):
+            hub.unsubscribe(subscription)
+        assert hub.listener_count() == 0
+        assert "job-1" not in jobs.callbacks
+
+    asyncio.run(scenario())
+
+
+def test_listener_is_removed_on_terminal_state():
+    async def scenario():
+        jobs = FakeJobs({"job-1": state("processing", 1)})
+        hub = JobWatchHub(jobs.load_state, jobs.listen)
+
+        subscription = await hub.subscribe("job-1")
+        jobs.push("job-1", state("completed", 2))
+        await subscription.get(1)
+        assert (await subscription.get(1))["status"] == "completed"
+        assert hub.listener_count() == 0
+
+        # Terminal jobs are served from the loaded state without a listener
+        jobs.states["job-2"] = dict(state("failed", 3), id="job-2")
+        terminal = await hub.subscribe("job-2")
+        assert (await terminal.get(1))["status"] == "failed"
+        assert hub.listener_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_keeps_newest_updates():
+    async def scenario():
+        jobs = FakeJobs({"job-1": state("queued", 0)})
+        hub = JobWatchHub(jobs.load_state, jobs.listen, max_queue=2)
+
+        subscription = await hub.subscribe("job-1")
+        for updated_at in range(1, 6):
+            jobs.push("job-1", state("processing", updated_at))
+        await asyncio.sleep(0)
+
+        assert [(await subscription.get(1))["updatedAt"] for _ in range(2)] == [4, 5]
+
+    asyncio.run(scenario())
+
+
+def test_unknown_job_raises_lookup_error():
+    async def scenario():
+        jobs = FakeJobs({})
+        hub = JobWatchHub(jobs.load_state, jobs.listen)
+        with pytest.raises(LookupError):
+            await hub.subscribe("missing")
+        assert hub.subscriber_count("missing") == 0
+
+    asyncio.run(scenario())
+
+
+def test_long_polls_share_the_listener_and_return_on_change():
+    """롱 폴링 요청들은 리스너 하나를 공유하고, 상태가 바뀌면 즉시, 아니면 대기 시간이 지나면 응답한다."""
+    async def scenario():
+        jobs = FakeJobs({"job-1": state("processing", 1)})
+        hub = JobWatchHub(jobs.load_state, jobs.listen)
+        unchanged = lambda current: current["updatedAt"] <= 1
+
+        held = [asyncio.ensure_future(hub.wait("job-1", unchanged, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert jobs.loads == 1 and hub.listener_count() == 1
+        assert hub.peek("job-1")["updatedAt"] == 1
+
+        jobs.push("job-1", state("processing", 2))
+        assert [update["updatedAt"] for update in await asyncio.gather(*held)] == [2, 2, 2]
+        assert hub.listener_count() == 0
+
+        timed_out = await hub.wait("job-1", lambda current: True, timeout=0.05)
+        return timed_out
+
+    assert asyncio.run(scenario())["updatedAt"] == 1
+
+
+def test_terminal_write_in_the_same_second_is_delivered_to_since_polls():
+    """마지막 진행 상황과 같은 초에 기록된 완료 상태도 `since` 롱 폴링에 전달된다."""
+    async def scenario():
+        jobs = FakeJobs({"job-1": state("processing", 7)})
+        hub = JobWatchHub(jobs.load_state, jobs.listen)
+        unchanged = lambda current: not changed_since(current, 7)
+
+        assert unchanged(await hub.wait("job-1", unchanged, timeout=0.05))
+        held = asyncio.ensure_future(hub.wait("job-1", unchanged, timeout=5))
+        await asyncio.sleep(0.05)
+        jobs.push("job-1", state("completed", 7))
+        return await held
+
+    final = asyncio.run(scenario())
+    assert final["status"] == "completed" and changed_since(final, 7)
+
+
+def test_updates_differing_only_in_progress_are_not_deduplicated():
+    """같은 초에 상태와 메시지가 같아도 진행률이 바뀐 업데이트는 전달하고, 구독 시 상태를 반복하는 첫 스냅샷만 거른다."""
+    async def scenario():
+        jobs = FakeJobs({"job-1": dict(state("processing", 3), progress={"slides": 1})})
+        hub = JobWatchHub(jobs.load_state, jobs.listen)
+
+        subscription = await hub.subscribe("job-1")
+        await subscription.get(1)
+        jobs.push("job-1", dict(state("processing", 3), progress={"slides": 1}))
+        jobs.push("job-1", dict(state("processing", 3), progress={"slides": 2}))
+        await asyncio.sleep(0)
+        return await subscription.get(1), subscription.queue.qsize()
+
+    update, remaining = asyncio.run(scenario())
+    assert update["progress"] == {"slides": 2}
+    assert remaining == 0
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+from utils.lazy import Lazy
+
+
+def test_object_is_built_once_and_shared_between_threads():
+    """여러 스레드에서 동시에 요청해도 객체는 한 번만 생성되어 공유된다."""
+    builds = []
+    gate = threading.Event()
+
+    def build():
+        gate.wait()
+        builds.append(1)
+        return object()
+
+    provider = Lazy(build, "client")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+    assert provider.ready
+
+
+def test_failed_warmup_is_retried_on_first_use():
+    """백그라운드 워밍업이 실패해도 첫 사용 시 다시 생성을 시도한다."""
+    attempts = []
+
+    def build():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("credentials not ready")
+        return "client"
+
+    provider = Lazy(build, "client")
+    assert asyncio.run(provider.warm()) is False
+    assert not provider.ready
+    assert provider.get() == "client"
+    assert len(attempts) == 2
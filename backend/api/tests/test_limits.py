@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from utils.limits import BodySizeLimitMiddleware, UploadBudget, UploadTooLargeError
+
+
+app = FastAPI()
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=1024, paths=("/upload",))
+
+@app.post("/upload")
+async def upload(files: list[UploadFile] = File(...)):
+    return {"count": len(files)}
+
+@app.post("/other")
+async def other(files: list[UploadFile] = File(...)):
+    return {"count": len(files)}
+
+
+client = TestClient(app)
+
+def test_body_within_limit_is_accepted():
+    response = client.post("/upload", files=[("files", ("a.md", b"x" * 100))])
+    assert response.status_code == 200
+    assert response.json() == {"count": 1}
+
+def test_body_over_limit_is_rejected():
+    """Content-Length가 제한을 넘으면 본문을 읽기 전에 413을 반환한다."""
+    response = client.post("/upload", files=[("files", ("a.md", b"x" * 4096))])
+    assert response.status_code == 413
+
+def test_streamed_body_over_limit_is_rejected():
+    """Content-Length 없이 스트리밍된 본문도 제한을 넘으면 413을 반환한다."""
+    def chunks():
+        yield b'--boundary\r\nContent-Disposition: form-data; name="files"; filename="a.md"\r\n\r\n'
+        for _ in range(8):
+            yield b"x" * 512
+        yield b"\r\n--boundary--\r\n"
+
+    response = client.post("/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=boundary"})
+    assert response.status_code == 413
+
+def test_other_paths_are_not_limited():
+    response = client.post("/other", files=[("files", ("a.md", b"x" * 4096))])
+    assert response.status_code == 200
+
+def test_upload_budget_limits():
+    budget = UploadBudget(max_file_bytes=10, max_request_bytes=15)
+    budget.consume("a.md", 8, 8)
+    with pytest.raises(UploadTooLargeError):
+        budget.consume("a.md", 12, 4)
+
+    budget = UploadBudget(max_file_bytes=10, max_request_bytes=15)
+    budget.consume("a.md", 8, 8)
+    with pytest.raises(UploadTooLargeError):
+        budget.consume("b.md", 8, 8)
@@ -0,0 +1,47 @@
+from services.memory_cache import TTLCache
+
+
+class Clock:
+
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_at_expires_at_or_ttl():
+    """항목은 문서의 expiresAt 또는 TTL 중 먼저 오는 시점에 만료된다."""
+    clock = Clock()
+    cache = TTLCache("test", max_entries=10, ttl=60, enabled=True, clock=clock)
+    cache.put("job", {"status": "completed"}, expires_at=1010)
+    cache.put("result", {"id": "result"})
+    cache.put("gone", {}, expires_at=900)
+
+    assert cache.get("job") == {"status": "completed"}
+    assert cache.get("gone") is None
+    clock.now = 1011
+    assert cache.get("job") is None
+    assert cache.get("result") is not None
+    clock.now = 1061
+    assert cache.get("result") is None
+    assert cache.stats == {"hits": 2, "misses": 3, "evictions": 0, "expirations": 2}
+
+
+def test_least_recently_used_entries_are_evicted_by_count_and_bytes():
+    """항목 수와 바이트 한도를 넘으면 가장 오래 사용하지 않은 항목부터 내보낸다."""
+    cache = TTLCache("test", max_entries=3, max_bytes=10, max_item_bytes=6, enabled=True, clock=Clock())
+    cache.put("a", b"a", size=1)
+    cache.put("b", b"b", size=1)
+    cache.put("c", b"c", size=1)
+    cache.get("a")
+    cache.put("d", b"d", size=1)
+    assert cache.get("b") is None and cache.get("a") == b"a"
+
+    cache.put("big", b"x" * 6, size=6)
+    assert cache.get("c") is None and cache.bytes <= 10
+    cache.put("huge", b"x" * 7, size=7)
+    assert cache.get("huge") is None
+    assert cache.stats["evictions"] == 2
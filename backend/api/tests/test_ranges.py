@@ -0,0 +1,23 @@
+import pytest
+
+from utils.ranges import parse_range
+
+
+def test_parse_range():
+    """단일 바이트 범위를 포함 구간으로 해석한다."""
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+
+
+def test_unsatisfiable_range():
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+    with pytest.raises(ValueError):
+        parse_range("bytes=10-5", 100)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-0", 100)
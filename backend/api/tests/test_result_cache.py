@@ -0,0 +1,60 @@
+import asyncio
+import io
+
+from fastapi import UploadFile
+from prometheus_client import REGISTRY
+
+from services.backends.local import MemoryStore
+from services import result_cache
+from services.result_cache import ResultCache, content_key
+
+
+def upload(name: str, data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=name)
+
+
+def key(theme: str, settings: dict, files: list[tuple[str, bytes]]) -> str:
+    return asyncio.run(content_key(theme, settings, [upload(name, data) for name, data in files]))
+
+
+def test_content_key_ignores_file_order_and_unset_settings():
+    """파일 순서와 비어 있는 설정 값은 캐시 키에 영향을 주지 않는다."""
+    files = [("a.md", b"alpha"), ("b.pdf", b"beta")]
+    base = key("default", {"audience": "General", "slideDetail": None}, files)
+
+    assert key("default", {"audience": " general "}, list(reversed(files))) == base
+    assert key("gaia", {"audience": "general"}, files) != base
+    assert key("default", {"audience": "expert"}, files) != base
+    assert key("default", {"audience": "general"}, [("a.md", b"alpha!"), ("b.pdf", b"beta")]) != base
+
+
+def test_content_key_rewinds_uploads():
+    file = upload("a.md", b"alpha")
+    asyncio.run(content_key("default", {}, [file]))
+    assert asyncio.run(file.read()) == b"alpha"
+
+
+def test_lookups_and_evictions_are_exported_as_metrics(monkeypatch):
+    """결과 캐시의 적중, 미스, 제거 횟수를 stats와 Prometheus 카운터에 함께 기록한다."""
+    monkeypatch.setenv("RESULT_CACHE_MAX_ENTRIES", "1")
+    # Only the explicit eviction below runs
+    monkeypatch.setattr(result_cache, "EVICTION_INTERVAL_SECONDS", 2**40)
+
+    def sample(event: str) -> float:
+        return REGISTRY.get_sample_value("api_result_cache_events_total", {"event": event}) or 0
+
+    async def scenario():
+        store = MemoryStore()
+        cache = ResultCache(store)
+        await store.set("results", "job-1", {"expiresAt": 2**40})
+        await cache.record("hit", "job-1")
+        await cache.record("other", "job-2")
+        await cache.lookup("hit")
+        await cache.lookup("missing")
+        await cache.evict()
+        return cache.stats
+
+    before = {event: sample(event) for event in ("hits", "misses", "evictions")}
+    stats = asyncio.run(scenario())
+    assert stats == {"hits": 1, "misses": 1, "evictions": 1}
+    assert {event: sample(event) - before[event] for event in before} == stats
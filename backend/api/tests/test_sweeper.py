@@ -0,0 +1,82 @@
+import asyncio
+
+from services.backends.local import FileBlobStore, MemoryStore
+from services.sweeper import ExpirySweeper
+
+
+NOW = 1_000_000
+
+
+async def put(blobs, path):
+    async def chunks():
+        yield b"data"
+
+    await blobs.write_stream(path, chunks(), "application/octet-stream")
+
+
+def test_expired_documents_are_deleted_in_pages(tmp_path):
+    """만료된 작업과 결과를 여러 페이지에 걸쳐 삭제하고, 만료되지 않은 문서는 남긴다."""
+    async def scenario():
+        store = MemoryStore()
+        blobs = FileBlobStore(str(tmp_path))
+        for n in range(5):
+            await store.set("jobs", f"old-{n}", {"status": "completed", "expiresAt": NOW - n - 1})
+        await store.set("jobs", "live", {"status": "completed", "expiresAt": NOW + 60})
+        await store.set("jobs", "running", {"status": "processing"})
+        await store.set("results", "old-0", {"expiresAt": NOW - 1})
+        await store.set("results", "copy", {"expiresAt": NOW - 1, "cachedFrom": "live"})
+        await put(blobs, "results/old-0/presentation.pdf")
+        await put(blobs, "results/live/presentation.pdf")
+
+        deleted = await ExpirySweeper(store, blobs, batch_size=2).sweep(now=NOW)
+        jobs = sorted(doc_id for doc_id, _ in await store.query("jobs"))
+        return deleted, jobs, await store.count("results")
+
+    deleted, jobs, results = asyncio.run(scenario())
+    assert deleted == {"abandoned": 0, "jobs": 5, "results": 2, "batches": 0, "rate_limits": 0, "orphans": 0}
+    assert jobs == ["live", "running"]
+    assert results == 0
+    assert not (tmp_path / "results" / "old-0").exists()
+    # Objects of a cached copy belong to the source job
+    assert (tmp_path / "results" / "live" / "presentation.pdf").exists()
+
+
+def test_orphaned_uploads_are_collected(tmp_path):
+    """작업이 없거나 오래전에 끝난 작업의 업로드만 정리한다."""
+    async def scenario():
+        store = MemoryStore()
+        blobs = FileBlobStore(str(tmp_path))
+        await store.set("jobs", "running", {"status": "processing", "updatedAt": NOW - 7200})
+        await store.set("jobs", "recent", {"status": "failed", "updatedAt": NOW - 60})
+        await store.set("jobs", "finished", {"status": "completed", "updatedAt": NOW - 7200})
+        for job_id in ("running", "recent", "finished", "gone"):
+            await put(blobs, f"{job_id}/input.md")
+
+        deleted = await ExpirySweeper(store, blobs, orphan_grace=3600).sweep(now=NOW)
+        return deleted, await blobs.list_prefixes()
+
+    deleted, prefixes = asyncio.run(scenario())
+    assert deleted["orphans"] == 2
+    assert prefixes == ["recent", "running"]
+
+
+def test_jobs_abandoned_by_their_worker_are_failed(tmp_path):
+    """리스가 만료된 지 오래된 처리 중 작업은 실패로 바꿔 만료되게 하고, 리스가 살아 있는 작업은 그대로 둔다."""
+    async def scenario():
+        store = MemoryStore()
+        sweeper = ExpirySweeper(store, FileBlobStore(str(tmp_path)), batch_size=1, abandoned_grace=600)
+        await store.set("jobs", "crashed", {"status": "processing", "lease": {"owner": "a", "expiresAt": NOW - 700}, "expiresAt": 0})
+        await store.set("jobs", "retrying", {"status": "processing", "lease": {"owner": "b", "expiresAt": NOW - 60}, "expiresAt": 0})
+        await store.set("jobs", "running", {"status": "processing", "lease": {"owner": "c", "expiresAt": NOW + 60}, "expiresAt": 0})
+        await store.set("jobs", "done", {"status": "completed", "lease": {"owner": "d", "expiresAt": NOW - 900}, "expiresAt": NOW + 60})
+
+        deleted = await sweeper.sweep(now=NOW)
+        return deleted, {doc_id: doc for doc_id, doc in await store.query("jobs")}
+
+    deleted, jobs = asyncio.run(scenario())
+    assert deleted["abandoned"] == 1
+    crashed = jobs["crashed"]
+    assert crashed["status"] == "failed" and crashed["lease"] is None
+    assert crashed["updatedAt"] == NOW and crashed["expiresAt"] > NOW
+    assert jobs["retrying"]["status"] == jobs["running"]["status"] == "processing"
+    assert jobs["done"]["status"] == "completed" and jobs["done"]["lease"] is None
@@ -0,0 +1,107 @@
+import os
+import json
+
+
+MAX_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_BYTES", str(20 * 1024 * 1024)))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(50 * 1024 * 1024)))
+# Whole POST /v1/slides/batch body; each job of the batch is still held to MAX_REQUEST_BYTES
+MAX_BATCH_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_BATCH_BYTES", str(500 * 1024 * 1024)))
+
+# Resumable upload chunks must be a multiple of 256 KiB
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# Room for multipart boundaries, part headers and the JSON `data` field
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class UploadBudget:
+
+
+    def __init__(self, max_file_bytes: int = MAX_FILE_BYTES, max_request_bytes: int = MAX_REQUEST_BYTES):
+        """Byte counter shared by all files of one request while they are streamed
+        """
+        self.max_file_bytes = max_file_bytes
+        self.max_request_bytes = max_request_bytes
+        self.total = 0
+
+
+    def consume(self, filename: str, file_bytes: int, chunk_bytes: int) -> None:
+        """Account for a chunk of `filename` that brings it to `file_bytes` in total
+        """
+        self.total += chunk_bytes
+        if file_bytes > self.max_file_bytes:
+            raise UploadTooLargeError(f"File {filename} exceeds the {self.max_file_bytes} byte limit")
+        if self.total > self.max_request_bytes:
+            raise UploadTooLargeError(f"Uploaded files exceed the {self.max_request_bytes} byte limit per request")
+
+
+class BodySizeLimitMiddleware:
+
+
+    def __init__(self, app, max_bytes: int, paths: tuple = ()):
+        """Reject request bodies larger than `max_bytes` before they are parsed.
+           Checks Content-Length up front and counts streamed bytes for chunked bodies.
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.paths and scope["path"] not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLargeError("request body too large")
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # Body parsing errors are turned into a 400 by the framework; answer 413 instead
+            if exceeded:
+                if not response_started:
+                    response_started = True
+                    await self._reject(send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLargeError:
+            if not exceeded:
+                raise
+            if not response_started:
+                await self._reject(send)
+
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"Request body exceeds the {self.max_bytes} byte limit"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
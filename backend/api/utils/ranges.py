@@ -0,0 +1,38 @@
+from typing import Optional, Tuple
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` Range header into an inclusive (start, end) pair.
+
+    Returns None when the whole representation should be sent (no header,
+    another unit, or several ranges). Raises ValueError if the range
+    cannot be satisfied for a representation of `size` bytes.
+    """
+    if not header or size <= 0:
+        return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if first == "":
+        if length <= 0:
+            raise ValueError("unsatisfiable range")
+        return max(size - length, 0), size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
@@ -0,0 +1,107 @@
+import time
+import json
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+from uuid import uuid4
+
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+
+TRACE_HEADER = "X-Trace-Id"
+
+STAGE_SECONDS = Histogram(
+    "api_stage_seconds",
+    "Duration of one stage of a slide request in the api",
+    ["stage", "outcome"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+STAGE_BYTES = Histogram(
+    "api_stage_bytes",
+    "Bytes handled by one stage of a slide request in the api",
+    ["stage"],
+    buckets=tuple(4 ** n * 1024 for n in range(9)),
+)
+
+
+class Trace:
+
+
+    def __init__(self, trace_id: str, job_id: str = ""):
+        """Spans of one request. The summary travels to the slides service in the task payload,
+           which adds its own stages and saves the whole summary on the job document.
+        """
+        self.trace_id = trace_id
+        self.job_id = job_id
+        self.stages: dict[str, dict] = {}
+
+
+    def record(self, stage: str, seconds: float, attributes: dict) -> None:
+        summary = self.stages.setdefault(stage, {"count": 0, "ms": 0.0})
+        summary["count"] += 1
+        summary["ms"] = round(summary["ms"] + seconds * 1000, 1)
+        if isinstance(attributes.get("bytes"), int):
+            summary["bytes"] = summary.get("bytes", 0) + attributes["bytes"]
+
+
+    def summary(self) -> dict:
+        return {stage: dict(values) for stage, values in self.stages.items()}
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid4().hex
+
+
+def start_trace(trace_id: Optional[str], job_id: str = "") -> Trace:
+    trace = Trace(trace_id or new_trace_id(), job_id)
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def use_trace(trace: Trace) -> None:
+    """Make an existing trace current again, e.g. in a task that continues a job started in another one
+    """
+    _current.set(trace)
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Time a stage, observe it in the stage histograms and log it as one JSON line.
+       Yields the attributes dict, so a `bytes` count known only at the end can be added.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attributes
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage, outcome).observe(seconds)
+        if isinstance(attributes.get("bytes"), int):
+            STAGE_BYTES.labels(stage).observe(attributes["bytes"])
+
+        trace = _current.get()
+        if trace is not None:
+            trace.record(stage, seconds, attributes)
+        logging.info(json.dumps({
+            "span": stage,
+            "traceId": trace.trace_id if trace else None,
+            "jobId": trace.job_id if trace else None,
+            "durationMs": round(seconds * 1000, 1),
+            "outcome": outcome,
+            **attributes,
+        }, default=str))
+
+
+def metrics_response() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
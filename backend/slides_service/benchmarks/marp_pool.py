@@ -0,0 +1,109 @@
+"""Compare cold `npx @marp-team/marp-cli` spawns with the warm Marp worker pool.
+
+Usage (from backend/slides_service):
+    python -m benchmarks.marp_pool --renders 10 --pool-size 2
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from services.slides.marp_pool import MarpWorkerPool
+
+
+SAMPLE_MARKDOWN = """---
+marp: true
+paginate: true
+---
+
+# Quarterly Report
+
+Generated by the Marp pool benchmark
+
+---
+
+## Highlights
+
+- Revenue grew 12% quarter over quarter
+- Two new regions launched
+- Churn dropped below 3%
+
+---
+
+## Next Steps
+
+1. Expand the sales team
+2. Ship the self-service onboarding flow
+3. Revisit pricing tiers
+"""
+
+
+def cold_render(markdown: str, theme: str) -> None:
+    """Render PDF and HTML the way SlideService did before the pool: two npx spawns
+    """
+    temp_dir = tempfile.mkdtemp(prefix="ai-slider-bench-")
+    try:
+        md_path = os.path.join(temp_dir, "ppt.md")
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        for output, flag in (("ppt.pdf", "--pdf"), ("ppt.html", "--html")):
+            cmd = ["npx", "@marp-team/marp-cli", md_path, "--output", os.path.join(temp_dir, output), flag, "--theme", theme]
+            subprocess.run(cmd, capture_output=True, check=True)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--theme", default=os.path.abspath(os.path.join("services", "slides", "themes", "default.css")))
+    parser.add_argument("--skip-cold", action="store_true")
+    args = parser.parse_args()
+
+    report = {"renders": args.renders, "poolSize": args.pool_size, "concurrency": args.concurrency}
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if not args.skip_cold:
+            cold = list(executor.map(lambda _: timed(cold_render, SAMPLE_MARKDOWN, args.theme), range(args.renders)))
+            report["cold"] = summarize(cold)
+
+        pool = MarpWorkerPool(size=args.pool_size, max_renders=args.renders + 1)
+        try:
+            report["warmupSeconds"] = timed(pool.warmup)
+            warm = list(executor.map(lambda _: timed(pool.render, SAMPLE_MARKDOWN, args.theme), range(args.renders)))
+            report["warm"] = summarize(warm)
+        finally:
+            pool.close()
+
+    if "cold" in report:
+        report["speedup"] = report["cold"]["p50"] / report["warm"]["p50"]
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Load test for /tasks/process-slides on a single instance.
+
+Drives the real `process_slides` handler with in-memory stand-ins for GCS,
+Firestore, the Gemini API and Marp that only add latency, and reports how
+many jobs per second one instance completes at several request-concurrency
+settings (the Cloud Run `--concurrency` value).
+
+Usage (from backend/slides_service):
+    python -m benchmarks.pipeline_load --concurrency 1 4 16 32 --llm-seconds 3 --render-seconds 1.5
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+
+# Start without cloud clients; the stores are replaced by latency-only fakes below
+os.environ.setdefault("BACKEND", "local")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("MARP_POOL_SIZE", "0")
+
+from starlette.requests import Request
+
+from models.task import TaskPayload
+from routers import tasks
+from services.slides.gemini_files import FakeFileAPI, GeminiFileCache
+from services.slides.fake_llm import FakeModel
+from services.slides.marp_pool import fake_pdf
+
+
+class FakeFirestore:
+
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+
+    async def update_job_status(self, job_id: str, status: str, message: str, result_url: str = "", extra: dict | None = None) -> None:
+        await asyncio.sleep(self.latency)
+
+
+    async def complete_job(self, job_id: str, message: str, result_url: str, artifacts: dict, extra: dict | None = None) -> None:
+        await asyncio.sleep(self.latency)
+
+
+    async def acquire_lease(self, job_id: str, owner: str, seconds: int) -> dict | None:
+        await asyncio.sleep(self.latency)
+        return {"status": "queued"}
+
+
+    async def renew_lease(self, job_id: str, owner: str, seconds: int) -> None:
+        await asyncio.sleep(self.latency)
+
+
+    async def save_checkpoint(self, job_id: str, checkpoint: dict) -> None:
+        await asyncio.sleep(self.latency)
+
+
+class FakeGCS:
+
+
+    def __init__(self, latency: float, size: int):
+        self.latency = latency
+        self.data = b"x" * size
+
+
+    async def download_file_from_gcs(self, gcs_path: str):
+        await asyncio.sleep(self.latency)
+        # Distinct bytes per object, so the Gemini file cache only hits on real duplicates
+        return self.data + gcs_path.encode(), "text/markdown"
+
+
+    async def upload_result(self, job_id: str, filename: str, data: bytes, content_type: str) -> dict:
+        await asyncio.sleep(self.latency)
+        return {"path": f"results/{job_id}/{filename}", "size": len(data), "contentType": content_type}
+
+
+    async def upload_file(self, gcs_path: str, data: bytes, content_type: str) -> None:
+        await asyncio.sleep(self.latency)
+
+
+    async def delete_file_from_gcs(self, gcs_path: str) -> None:
+        await asyncio.sleep(self.latency)
+
+
+def install_fakes(args) -> None:
+    service = tasks.slide_service.get()
+    service.model = FakeModel(latency=args.llm_seconds)
+    service.llm_semaphore = asyncio.Semaphore(args.llm_limit)
+    service.render_semaphore = asyncio.Semaphore(args.render_limit)
+    # Blocking stand-ins: these run in worker threads, like the real calls
+    service.render_with_marp = lambda markdown, theme: (time.sleep(args.render_seconds), (fake_pdf(8), b"<html></html>"))[1]
+    service.file_cache = GeminiFileCache(FakeFileAPI(latency=args.upload_seconds), semaphore=service.llm_semaphore)
+
+    tasks.firestore_service.set(FakeFirestore(args.io_seconds))
+    tasks.gcs_service.set(FakeGCS(args.io_seconds, args.file_bytes))
+
+
+def make_payload(index: int, files: int) -> TaskPayload:
+    return TaskPayload.model_validate({
+        "jobID": f"bench-{index}",
+        "theme": "default",
+        "files": [{"filename": f"doc-{n}.md", "type": "text/markdown", "gcsPath": f"bench-{index}/doc-{n}.md"} for n in range(files)],
+        "settings": {},
+    })
+
+
+def task_request(payload: TaskPayload) -> Request:
+    body = payload.model_dump_json().encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request({"type": "http", "method": "POST", "headers": []}, receive)
+
+
+async def run_level(concurrency: int, jobs: int, files: int) -> dict:
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(index: int):
+        async with limit:
+            start = time.perf_counter()
+            payload = make_payload(index, files)
+            await tasks.process_slides(task_request(payload), payload)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(jobs)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "seconds": round(elapsed, 3),
+        "jobsPerSecond": round(jobs / elapsed, 3),
+        "p50": round(latencies[len(latencies) // 2], 3),
+        "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }
+
+
+async def main_async(args) -> list[dict]:
+    install_fakes(args)
+    results = []
+    for concurrency in args.concurrency:
+        jobs = max(concurrency * args.jobs_per_slot, concurrency)
+        results.append(await run_level(concurrency, jobs, args.files))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--jobs-per-slot", type=int, default=3)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--file-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--io-seconds", type=float, default=0.05)
+    parser.add_argument("--upload-seconds", type=float, default=0.5)
+    parser.add_argument("--llm-seconds", type=float, default=3.0)
+    parser.add_argument("--render-seconds", type=float, default=1.5)
+    parser.add_argument("--llm-limit", type=int, default=16)
+    parser.add_argument("--render-limit", type=int, default=2)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
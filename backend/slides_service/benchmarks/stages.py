@@ -0,0 +1,121 @@
+"""Per-stage micro benchmarks for the slides worker.
+
+Times each CPU-side stage of a job in isolation, so a regression can be
+pinned to one stage: input preprocessing, markdown extraction from the
+model response, incremental slide parsing, Marp rendering and HTML
+precompression. Prints one JSON object with p50/p95/p99 per stage.
+
+Usage (from backend/slides_service):
+    python -m benchmarks.stages --iterations 50 --render-iterations 5
+    RENDER_BACKEND=fake python -m benchmarks.stages   # without Marp/Chromium
+"""
+import os
+import json
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+os.environ.setdefault("BACKEND", "local")
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+from services.slides.slides_service import SlideService
+from services.slides.preprocess import preprocess_files
+from services.slides.streaming import SlideStreamParser
+from services.slides.encodings import precompress
+
+
+def percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 3)
+
+    return {"count": len(ordered), "p50Ms": pick(0.50), "p95Ms": pick(0.95), "p99Ms": pick(0.99), "maxMs": round(ordered[-1] * 1000, 3)}
+
+
+def measure(fn, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def sample_deck(slides: int) -> str:
+    rng = random.Random(slides)
+    body = [f"## Slide {n}\n\n" + "\n".join(f"- {rng.choice(['Revenue', 'Churn', 'Hiring', 'Pricing'])} point {n}.{m}" for m in range(4))
+            for n in range(slides)]
+    return "---\nmarp: true\ntheme: default\n---\n\n" + "\n\n---\n\n".join(body)
+
+
+def sample_document(size: int) -> SimpleNamespace:
+    rng = random.Random(size)
+    paragraphs = []
+    total = 0
+    while total < size:
+        paragraph = " ".join(rng.choice(["market", "growth", "customer", "revenue", "product", "risk", "plan"]) for _ in range(60))
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return SimpleNamespace(filename=f"doc-{size}.md", type="text/markdown", data="\n\n".join(paragraphs).encode())
+
+
+def run(args) -> list[dict]:
+    service = SlideService()
+    results = []
+
+    def record(stage: str, variant: str, fn, iterations: int, **extra):
+        try:
+            stats = measure(fn, iterations)
+        except Exception as e:
+            stats = {"error": str(e)}
+        results.append({"stage": stage, "variant": variant, **extra, **stats})
+
+    for size in args.document_bytes:
+        document = sample_document(size)
+        record("preprocess_files", f"{size}B", lambda: preprocess_files([document]), args.iterations, bytes=size)
+
+    for slides in args.slides:
+        deck = sample_deck(slides)
+        response = f"Here is your presentation:\n```markdown\n{deck}\n```\n"
+        record("extract_markdown_content", f"{slides} slides", lambda: service.extract_markdown_content(response), args.iterations, bytes=len(response))
+
+        def parse_stream():
+            parser = SlideStreamParser()
+            for i in range(0, len(response), 64):
+                parser.feed(response[i:i + 64])
+            parser.finish()
+
+        record("stream_parser", f"{slides} slides", parse_stream, args.iterations, bytes=len(response))
+
+        try:
+            html = service.render_with_marp(deck, args.theme)[1]
+        except Exception:
+            # Without Marp, compress a stand-in of similar size
+            html = deck.encode() * 20
+        record("precompress", f"{slides} slides", lambda: precompress(html), args.iterations, bytes=len(html))
+
+        if args.render_iterations:
+            record("render_with_marp", f"{slides} slides", lambda: service.render_with_marp(deck, args.theme), args.render_iterations,
+                   renderer=type(service.render_pool).__name__ if service.render_pool else "marp-cli")
+
+    if service.render_pool is not None:
+        service.render_pool.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--render-iterations", type=int, default=5, help="0 skips Marp rendering")
+    parser.add_argument("--slides", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--document-bytes", type=int, nargs="+", default=[16 * 1024, 256 * 1024, 2 * 1024 * 1024])
+    parser.add_argument("--theme", default="default")
+    args = parser.parse_args()
+
+    print(json.dumps({"stages": run(args)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,38 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 
 from routers import tasks
+from services.infra.telemetry import metrics_response
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients, the Gemini model and the Marp workers are created while the instance already answers requests;
+    # WARMUP_ENABLED=false leaves them to the first task that needs them
+    warmup = None
+    if os.getenv("WARMUP_ENABLED", "true").lower() == "true":
+        warmup = asyncio.create_task(tasks.warm_up())
+    yield
+    if warmup is not None:
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(tasks.router)
 
 @app.get("/")
 def health_check():
     return {"message": "Service Server is alive"}
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
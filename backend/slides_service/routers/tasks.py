@@ -1,77 +1,199 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
+from uuid import uuid4
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 
 from services.slides.slides_service import SlideService
-from services.infra.firestore import FirestoreService
-from services.infra.gcs import GCSService
+from services.slides.encodings import ENCODING_SUFFIXES, precompress
+from services.slides.optimize import optimize_artifacts, quality_preset
+from services.infra.backends import create_blob_store, create_job_store
+from services.infra.lazy import Lazy
+from services.infra.checkpoints import LEASE_SECONDS, JobCheckpoint, LeaseHeldError, LeaseKeeper
+from services.infra.status_writer import JobStatusWriter
+from services.infra.telemetry import TRACE_HEADER, span, start_trace
 from models.task import File, TaskPayload
 
 
 router = APIRouter()
 
-slide_service = SlideService()
-gcs_service = GCSService()
-firestore_service = FirestoreService()  
+# Created on first use or by warm_up() at startup, so importing the app stays cheap.
+# GCS and Firestore, or their local stand-ins (BACKEND=local)
+slide_service = Lazy(SlideService, "slide service")
+gcs_service = Lazy(create_blob_store, "blob store")
+firestore_service = Lazy(create_job_store, "job store")
+
+
+async def warm_up() -> None:
+    """Create the clients and the Gemini model in worker threads, then start the Marp workers
+    """
+    await asyncio.gather(slide_service.warm(), gcs_service.warm(), firestore_service.warm())
+    render_pool = slide_service.get().render_pool if slide_service.ready else None
+    if render_pool is not None:
+        try:
+            await asyncio.to_thread(render_pool.warmup)
+        except Exception as e:
+            logging.error(f"Warmup of the render pool failed: {e}")
 
 @router.post("/tasks/process-slides")
 async def process_slides(
+    request: Request,
     payload: TaskPayload
 ):
     """ Handle slide generation requests from Cloud Tasks
     """
-    async def status_update(message: str):
-        firestore_service.update_job_status(payload.jobID, "processing", message)
+    # The api assigns the trace ID in add_job and sends it, with its own stage timings, along with the task.
+    # Both are read from the raw body (already parsed into `payload`) since TaskPayload does not declare them
+    body = await request.json()
+    trace = start_trace(request.headers.get(TRACE_HEADER) or body.get("traceId"), payload.jobID, body.get("stageTimings"))
 
+    # Cloud Tasks delivers at least once: the lease keeps duplicate deliveries from running the job concurrently
+    owner = uuid4().hex
     try:
-        await status_update("Starting slide generation...")
+        job = await firestore_service.get().acquire_lease(payload.jobID, owner, LEASE_SECONDS)
+    except LeaseHeldError as e:
+        logging.info(f"Job {payload.jobID} is already being processed: {e}")
+        # Any non-2xx response makes Cloud Tasks retry later, by which time the job is done or the lease has expired
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logging.error(f"Failed to lease job {payload.jobID}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if job is None:
+        logging.warning(f"Job {payload.jobID} no longer exists, dropping the task")
+        return JSONResponse(content={"status": "skipped", "jobID": payload.jobID})
+    if job.get("status") == "completed":
+        logging.info(f"Job {payload.jobID} was already completed by an earlier delivery")
+        return JSONResponse(content={"status": "success", "jobID": payload.jobID})
+
+    keeper = LeaseKeeper(firestore_service.get(), payload.jobID, owner)
+    keeper.start()
+    try:
+        checkpoint = JobCheckpoint(firestore_service.get(), gcs_service.get(), payload.jobID, job.get("checkpoint"))
+        await run_job(payload, trace, checkpoint)
+    finally:
+        await keeper.stop()
+
+    return JSONResponse(content={"status": "success", "jobID": payload.jobID})
+
+
+async def run_job(payload: TaskPayload, trace, checkpoint: JobCheckpoint) -> None:
+    """Generate, store and complete one job, skipping the stages an earlier delivery checkpointed
+    """
+    status = JobStatusWriter(firestore_service.get(), payload.jobID)
+    # Terminal writes release the lease; a failed job keeps its checkpoint for the next retry
+
+    try:
+        await status.update("Starting slide generation..." if checkpoint.stage == "started" else "Resuming slide generation...")
+        await status.flush()
     except Exception as e:
         logging.error(f"Failed to update job status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-    files: list[File] = []
-    for file_ref in payload.files:
+    artifacts = checkpoint.data.get("artifacts")
+    if artifacts is None:
+        pdf_data, html_data = await generate(payload, trace, status, checkpoint)
+        pdf_data, html_data, optimization = await optimize_results(payload, pdf_data, html_data)
+
         try:
-            data, content_type = gcs_service.download_file_from_gcs(file_ref.gcsPath)
-            files.append(File(filename=file_ref.filename, data=data, type=content_type))
+            artifacts = await store_results(payload.jobID, pdf_data, html_data)
         except Exception as e:
-            logging.error(f"Failed to download file {file_ref.filename}: {e}")
-            firestore_service.update_job_status(payload.jobID, "failed", f"Download error: {e}")
+            logging.error(f"Failed to store result: {e}")
+            await status.fail(f"Failed to store: {e}", stageTimings=trace.summary(), lease=None)
             raise HTTPException(status_code=500, detail=str(e))
+        await checkpoint.save(artifacts=artifacts, optimization=optimization)
+    else:
+        logging.info(f"Job {payload.jobID} resumes with its results already stored")
+        optimization = checkpoint.data.get("optimization")
 
+    result_url = f"/results/{payload.jobID}"
     try:
-        pdf_data, html_data = await slide_service.generate_slides(
-            theme=payload.theme,
-            files=files,
-            settings=payload.settings,
-            status_update_fn=status_update
-        )
+        await status.complete("Slides generated successfully", result_url, artifacts, optimization=optimization,
+                              stageTimings=trace.summary(), checkpoint=None, lease=None)
     except Exception as e:
-        logging.error(f"Failed to generate slides: {e}")
-        firestore_service.update_job_status(payload.jobID, "failed", f"Failed to generate slides: {e}")
+        # The results are already stored; only the write that marks the job completed failed
+        logging.error(f"Failed to complete job {payload.jobID}: {e}")
+        await status.fail(f"Failed to mark the job completed: {e}", stageTimings=trace.summary(), lease=None)
         raise HTTPException(status_code=500, detail=str(e))
 
-    result_url = f"/results/{payload.jobID}"
+    # The job is already visible as completed; removing the uploads is cleanup
+    paths = [file_ref.gcsPath for file_ref in payload.files]
+    if "markdown" in checkpoint.data:
+        paths.append(checkpoint.data["markdown"])
+    with span("cleanup", objects=len(paths)):
+        await asyncio.gather(*(gcs_service.get().delete_file_from_gcs(path) for path in paths))
+
+
+async def generate(payload: TaskPayload, trace, status: JobStatusWriter, checkpoint: JobCheckpoint) -> tuple[bytes, bytes]:
+    """Render the checkpointed markdown if there is one, otherwise download the inputs and generate the deck
+    """
+    markdown = await checkpoint.load_markdown()
+    if markdown is not None:
+        logging.info(f"Job {payload.jobID} resumes from its generated markdown")
+        try:
+            await status.update("Finalizing your slides...")
+            return await slide_service.get().render_slides(markdown, payload.theme)
+        except Exception as e:
+            logging.error(f"Failed to render slides: {e}")
+            await status.fail(f"Failed to generate slides: {e}", stageTimings=trace.summary(), lease=None)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def download(file_ref) -> File:
+        try:
+            with span("gcs_download") as attributes:
+                data, content_type = await gcs_service.get().download_file_from_gcs(file_ref.gcsPath)
+                attributes["bytes"] = len(data)
+        except Exception as e:
+            logging.error(f"Failed to download file {file_ref.filename}: {e}")
+            raise RuntimeError(f"Download error: {e}")
+        return File(filename=file_ref.filename, data=data, type=content_type)
 
     try:
-        firestore_service.store_result(payload.jobID, result_url, pdf_data, html_data)
+        files: list[File] = await asyncio.gather(*(download(file_ref) for file_ref in payload.files))
     except Exception as e:
-        logging.error(f"Failed to store result: {e}")
-        firestore_service.update_job_status(payload.jobID, "failed", f"Failed to store: {e}")
+        await status.fail(str(e), stageTimings=trace.summary(), lease=None)
         raise HTTPException(status_code=500, detail=str(e))
 
-    for file_ref in payload.files:
-        try:
-            gcs_service.delete_file_from_gcs(file_ref.gcsPath)
-            logging.info(f"Deleted file {file_ref.gcsPath} from GCS")
-        except Exception as e:
-            logging.warning(f"Failed to delete file {file_ref.gcsPath}: {e}")
+    # File API uploads of an earlier delivery (possibly on another instance) are reused while still valid
+    if slide_service.get().file_cache.adopt(checkpoint.data.get("geminiFiles", [])):
+        logging.info(f"Job {payload.jobID} reuses the Gemini uploads of an earlier delivery")
 
     try:
-        firestore_service.set_job_completed(payload.jobID, "Slides generated successfully", result_url)
+        return await slide_service.get().generate_slides(
+            theme=payload.theme,
+            files=files,
+            settings=payload.settings,
+            status_update_fn=status.update,
+            checkpoint_fn=checkpoint.save,
+        )
     except Exception as e:
-        logging.error(f"Failed to mark job as completed: {e}")
+        logging.error(f"Failed to generate slides: {e}")
+        await status.fail(f"Failed to generate slides: {e}", stageTimings=trace.summary(), lease=None)
         raise HTTPException(status_code=500, detail=str(e))
 
-    return JSONResponse(content={"status": "success", "jobID": payload.jobID})
-    
\ No newline at end of file
+
+async def optimize_results(payload: TaskPayload, pdf_data: bytes, html_data: bytes) -> tuple[bytes, bytes, dict]:
+    """Shrink the rendered artifacts with the job's quality preset; the report is saved on the job
+    """
+    quality, _ = quality_preset(payload.settings)
+    with span("optimize_artifacts", quality=quality, bytes=len(pdf_data) + len(html_data)) as attributes:
+        pdf_data, html_data, report = await asyncio.to_thread(optimize_artifacts, pdf_data, html_data, quality)
+        attributes["savedBytes"] = report["savedBytes"]
+        attributes["cpuMs"] = report["cpuMs"]
+    return pdf_data, html_data, report
+
+
+async def store_results(job_id: str, pdf_data: bytes, html_data: bytes) -> dict:
+    with span("precompress", bytes=len(html_data)):
+        html_variants = await asyncio.to_thread(precompress, html_data)
+    gcs = gcs_service.get()
+    with span("result_store", objects=2 + len(html_variants)) as attributes:
+        pdf_artifact, html_artifact, *encoded = await asyncio.gather(
+            gcs.upload_result(job_id, "presentation.pdf", pdf_data, "application/pdf"),
+            gcs.upload_result(job_id, "presentation.html", html_data, "text/html; charset=utf-8"),
+            *(gcs.upload_result(job_id, f"presentation.html{ENCODING_SUFFIXES[encoding]}", body, "text/html; charset=utf-8")
+              for encoding, body in html_variants.items()),
+        )
+        attributes["bytes"] = sum(artifact["size"] for artifact in [pdf_artifact, html_artifact, *encoded])
+    html_artifact["encodings"] = dict(zip(html_variants, encoded))
+    return {"pdf": pdf_artifact, "html": html_artifact}
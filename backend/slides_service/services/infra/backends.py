@@ -0,0 +1,41 @@
+import os
+
+
+# Defaults for each BACKEND preset, matching the api; JOB_STORE and BLOB_STORE override single parts
+PRESETS = {
+    "gcp": {"JOB_STORE": "firestore", "BLOB_STORE": "gcs"},
+    "local": {"JOB_STORE": "sqlite", "BLOB_STORE": "filesystem"},
+}
+
+
+def backend_choice() -> dict:
+    preset = PRESETS.get(os.getenv("BACKEND", "gcp"))
+    if preset is None:
+        raise ValueError(f"Unknown BACKEND {os.getenv('BACKEND')!r}, expected one of {', '.join(PRESETS)}")
+    return {name: os.getenv(name) or default for name, default in preset.items()}
+
+
+def create_job_store():
+    """FirestoreService, or the SQLite store shared with a local api (LOCAL_DB_PATH)
+    """
+    kind = backend_choice()["JOB_STORE"]
+    if kind == "firestore":
+        from services.infra.firestore import FirestoreService
+        return FirestoreService()
+    if kind == "sqlite":
+        from services.infra.local import LocalJobStore
+        return LocalJobStore(os.getenv("LOCAL_DB_PATH", "/tmp/ai-slider/jobs.db"))
+    raise ValueError(f"Unknown JOB_STORE {kind!r}")
+
+
+def create_blob_store():
+    """GCSService, or the blob directory shared with a local api (LOCAL_BLOB_ROOT)
+    """
+    kind = backend_choice()["BLOB_STORE"]
+    if kind == "gcs":
+        from services.infra.gcs import GCSService
+        return GCSService()
+    if kind == "filesystem":
+        from services.infra.local import LocalBlobStore
+        return LocalBlobStore(os.getenv("LOCAL_BLOB_ROOT", "/tmp/ai-slider/blobs"))
+    raise ValueError(f"Unknown BLOB_STORE {kind!r}")
@@ -0,0 +1,131 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+
+
+# A delivery holds the job for this long and renews it a few times per period while it works
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+
+
+class LeaseHeldError(RuntimeError):
+    """Another delivery of the same task is processing the job
+    """
+
+
+def claim_lease(job: dict, owner: str, seconds: int, now: float) -> Optional[dict]:
+    """Updates that give `owner` the job's lease, or None if the job needs no processing (completed).
+       Raises LeaseHeldError while another owner's lease is live.
+    """
+    if job.get("status") == "completed":
+        return None
+    lease = job.get("lease") or {}
+    if lease.get("owner") not in (None, owner) and lease.get("expiresAt", 0) > now:
+        raise LeaseHeldError(f"Job is being processed by another delivery until {int(lease['expiresAt'])}")
+    # A retried job is no longer failed, so it must not expire while it runs
+    return {"lease": {"owner": owner, "expiresAt": now + seconds}, "expiresAt": 0}
+
+
+def renew_lease(job: dict, owner: str, seconds: int, now: float) -> dict:
+    lease = job.get("lease") or {}
+    if lease.get("owner") != owner:
+        raise LeaseHeldError("Lease was taken over by another delivery")
+    return {"lease": {"owner": owner, "expiresAt": now + seconds}}
+
+
+class LeaseKeeper:
+
+
+    def __init__(self, firestore_service, job_id: str, owner: str, seconds: int = LEASE_SECONDS):
+        """Renews a job lease in the background until stopped
+        """
+        self.firestore = firestore_service
+        self.job_id = job_id
+        self.owner = owner
+        self.seconds = seconds
+        self._task: Optional[asyncio.Task] = None
+
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.seconds / 3)
+            try:
+                await self.firestore.renew_lease(self.job_id, self.owner, self.seconds)
+            except LeaseHeldError as e:
+                logging.warning(f"Lost the lease of job {self.job_id}: {e}")
+                return
+            except Exception as e:
+                logging.warning(f"Failed to renew the lease of job {self.job_id}: {e}")
+
+
+class JobCheckpoint:
+
+
+    def __init__(self, firestore_service, gcs_service, job_id: str, data: Optional[dict] = None):
+        """Progress of one job that survives a retry, kept in the job document's `checkpoint` field:
+           `geminiFiles` (File API handles of the inputs), `markdown` (object path of the generated deck),
+           `artifacts` (rendered results already in storage) and `optimization` (their size report).
+           Saving is best effort; a failed save only means a retry redoes that stage.
+        """
+        self.firestore = firestore_service
+        self.gcs = gcs_service
+        self.job_id = job_id
+        self.data = dict(data or {})
+
+
+    @property
+    def markdown_path(self) -> str:
+        # Under the job's upload prefix, so it is cleaned up with the inputs
+        return f"{self.job_id}/checkpoints/deck.md"
+
+
+    async def save(
+        self,
+        geminiFiles: Optional[list] = None,
+        markdown: Optional[str] = None,
+        artifacts: Optional[dict] = None,
+        optimization: Optional[dict] = None,
+    ) -> None:
+        try:
+            if markdown is not None:
+                await self.gcs.upload_file(self.markdown_path, markdown.encode(), "text/markdown; charset=utf-8")
+                self.data["markdown"] = self.markdown_path
+            if geminiFiles is not None:
+                self.data["geminiFiles"] = geminiFiles
+            if artifacts is not None:
+                self.data["artifacts"] = artifacts
+            if optimization is not None:
+                self.data["optimization"] = optimization
+            await self.firestore.save_checkpoint(self.job_id, self.data)
+        except Exception as e:
+            logging.warning(f"Failed to checkpoint job {self.job_id}: {e}")
+
+
+    async def load_markdown(self) -> Optional[str]:
+        if "markdown" not in self.data:
+            return None
+        try:
+            data, _ = await self.gcs.download_file_from_gcs(self.data["markdown"])
+            return data.decode()
+        except Exception as e:
+            logging.warning(f"Checkpointed markdown of job {self.job_id} is unavailable, generating again: {e}")
+            return None
+
+
+    @property
+    def stage(self) -> str:
+        if "artifacts" in self.data:
+            return "rendered"
+        if "markdown" in self.data:
+            return "generated"
+        return "started"
@@ -3,69 +3,97 @@ import logging
 
 from google.cloud import firestore
 
-from models.task import FireStoreResult
+from services.infra.checkpoints import claim_lease, renew_lease
 
 
 class FirestoreService:
     
     
     def __init__(self):
-        self.client = firestore.Client()
+        self.client = firestore.AsyncClient()
         
         
-    def update_job_status(self, job_id: str, status: str, message: str, result_url: str = "") -> None:
-        """Update the job document with new status and message
+    async def update_job_status(self, job_id: str, status: str, message: str, result_url: str = "", extra: dict | None = None) -> None:
+        """Update the job document with new status and message (plus any `extra` fields)
         """
         try: 
             now = int(time.time())
             updates = {
+                **(extra or {}),
                 "status": status,
                 "message": message,
                 "updatedAt": now
             }
-            self.client.collection("jobs").document(job_id).update(updates)
+            await self.client.collection("jobs").document(job_id).update(updates)
             logging.info(f"Job {job_id} updated: status={status}, message={message}")           
         except Exception as e:
             logging.error(f"Faild to update job status in Firestore: {e}")
             raise  
         
         
-    def set_job_completed(self, job_id: str, message: str, result_url: str = ""):
-        """Mark the job as completed and set its expiration time
+    async def complete_job(self, job_id: str, message: str, result_url: str, artifacts: dict, extra: dict | None = None) -> None:
+        """Store the result metadata and mark the job completed in a single batched write,
+           so watchers never see a completed job without its results document.
+           The PDF/HTML bytes live in GCS, `artifacts` maps each format to its object path, size and content type.
         """
         try:
             now = int(time.time())
+            result = {
+                "id": job_id,
+                "resultUrl": result_url,
+                **artifacts,
+                "createdAt": now,
+                "expiresAt": now + 3600,
+            }
             expires_at = now + 300
             updates = {
+                **(extra or {}),
                 "status": "completed",
                 "message": message,
                 "updatedAt": now,
-                "expiresAt": expires_at
+                "expiresAt": expires_at,
             }
-            self.client.collection("jobs").document(job_id).update(updates)            
-            logging.info(f"Job {job_id} completed adn will expire at {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(expires_at))}")           
+
+            batch = self.client.batch()
+            batch.set(self.client.collection("results").document(job_id), result)
+            batch.update(self.client.collection("jobs").document(job_id), updates)
+            await batch.commit()
+            logging.info(f"Job {job_id} completed and will expire at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(expires_at))}")
         except Exception as e:
-            logging.error(f"Failed to mark job as completed in Firestore: {e}")
+            logging.error(f"Failed to complete job {job_id} in Firestore: {e}")
             raise
-        
-        
-    def store_result(self, job_id: str, result_url: str, pdf_data: bytes, html_data: bytes) -> None:
-        """Store the final job result (PDF + HTML) in Firestore
+
+
+    async def acquire_lease(self, job_id: str, owner: str, seconds: int) -> dict | None:
+        """Take the job's processing lease in a transaction and return the job document
+           (None if the job no longer exists). Raises LeaseHeldError if another delivery holds it.
         """
-        try:
-            now = int(time.time())
-            expires_at = now + 3600
-            result = FireStoreResult(
-                id=job_id,
-                resultUrl=result_url,
-                pdfData=pdf_data,
-                htmlData=html_data,
-                createdAt=now,
-                expiresAt=expires_at
-            )
-            self.client.collection("results").document(job_id).set(result.model_dump())
-            logging.info(f"Stored result for job {job_id} (expires at {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(expires_at))})")   
-        except Exception as e:
-            logging.error(f"Failed to store result for job {job_id}: {e}")
-            raise
-        
\ No newline at end of file
+        ref = self.client.collection("jobs").document(job_id)
+
+        @firestore.async_transactional
+        async def claim(transaction):
+            snapshot = await ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return None
+            job = snapshot.to_dict()
+            updates = claim_lease(job, owner, seconds, time.time())
+            if updates is not None:
+                transaction.update(ref, updates)
+            return job
+
+        return await claim(self.client.transaction())
+
+
+    async def renew_lease(self, job_id: str, owner: str, seconds: int) -> None:
+        ref = self.client.collection("jobs").document(job_id)
+
+        @firestore.async_transactional
+        async def renew(transaction):
+            snapshot = await ref.get(transaction=transaction)
+            transaction.update(ref, renew_lease(snapshot.to_dict() or {}, owner, seconds, time.time()))
+
+        await renew(self.client.transaction())
+
+
+    async def save_checkpoint(self, job_id: str, checkpoint: dict) -> None:
+        await self.client.collection("jobs").document(job_id).update({"checkpoint": checkpoint})
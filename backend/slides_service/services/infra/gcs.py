@@ -1,19 +1,27 @@
 import os
+import asyncio
+import hashlib
 import logging
 
 from google.cloud import storage
 
 
 class GCSService:
-    
-    
+
+
     def __init__(self):
         self.client = storage.Client()
         self.bucket = self.client.bucket(os.environ.get("GCS_BUCKET_NAME"))
-        
-        
-    def download_file_from_gcs(self, gcs_path: str):
-        try: 
+
+
+    async def download_file_from_gcs(self, gcs_path: str):
+        """Download an object without blocking the event loop (storage has no async client)
+        """
+        return await asyncio.to_thread(self._download_file, gcs_path)
+
+
+    def _download_file(self, gcs_path: str):
+        try:
             blob = self.bucket.blob(gcs_path)
             if not blob.exists():
                 raise FileNotFoundError(f"Object {gcs_path} not found in bucket {self.bucket}")
@@ -23,13 +31,39 @@ class GCSService:
         except Exception as e:
             logging.error(f"Failed to download {gcs_path} from GCS: {e}")
             raise
-        
-        
-    def delete_file_from_gcs(self, gcs_path: str) -> None:
+
+
+    async def upload_result(self, job_id: str, filename: str, data: bytes, content_type: str) -> dict:
+        """Upload a rendered artifact and return the metadata stored in the results document
+        """
+        gcs_path = f"results/{job_id}/{filename}"
+        await asyncio.to_thread(self._upload_bytes, gcs_path, data, content_type)
+        # The digest doubles as the strong ETag of the served representation
+        return {"path": gcs_path, "size": len(data), "contentType": content_type, "sha256": hashlib.sha256(data).hexdigest()}
+
+
+    async def upload_file(self, gcs_path: str, data: bytes, content_type: str) -> None:
+        await asyncio.to_thread(self._upload_bytes, gcs_path, data, content_type)
+
+
+    def _upload_bytes(self, gcs_path: str, data: bytes, content_type: str) -> None:
+        try:
+            self.bucket.blob(gcs_path).upload_from_string(data, content_type=content_type)
+            logging.info(f"Uploaded {gcs_path} ({len(data)} bytes) to GCS")
+        except Exception as e:
+            logging.error(f"Failed to upload {gcs_path} to GCS: {e}")
+            raise
+
+
+    async def delete_file_from_gcs(self, gcs_path: str) -> None:
+        await asyncio.to_thread(self._delete_file, gcs_path)
+
+
+    def _delete_file(self, gcs_path: str) -> None:
         blob = self.bucket.blob(gcs_path)
         try:
             blob.delete()
             logging.info(f"Deleted file {gcs_path} from GCS")
         except Exception as e:
             logging.warning(f"Falied to delete file {gcs_path} from GCS: {e}")
-            
\ No newline at end of file
+
@@ -0,0 +1,59 @@
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Generic, TypeVar
+
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+
+
+    def __init__(self, factory: Callable[[], T], name: str):
+        """Shared object built by `factory` on first use, or earlier by `warm()` in the background.
+           Building happens once per process; a failed build is retried on the next use.
+        """
+        self.factory = factory
+        self.name = name
+        self._value: T | None = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                self._value = self.factory()
+                self._ready = True
+                logging.info(f"Created {self.name} in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return self._value
+
+
+    def set(self, value: T) -> None:
+        """Replace the shared object, e.g. with a fake in tests and benchmarks
+        """
+        with self._lock:
+            self._value = value
+            self._ready = True
+
+
+    async def warm(self) -> bool:
+        """Build the object in a worker thread, so the event loop keeps serving meanwhile.
+           Errors are logged, not raised: the first request that needs the object tries again.
+        """
+        try:
+            await asyncio.to_thread(self.get)
+            return True
+        except Exception as e:
+            logging.error(f"Warmup of {self.name} failed: {e}")
+            return False
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import mimetypes
+import threading
+
+from services.infra.checkpoints import claim_lease, renew_lease
+
+
+class LocalJobStore:
+
+
+    def __init__(self, path: str):
+        """SQLite stand-in for FirestoreService, sharing its file with the api's SQLiteStore
+           (same `documents` and `changes` tables), so the api sees the worker's updates.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (collection, id)
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                changed_at REAL NOT NULL
+            );
+        """)
+
+
+    async def update_job_status(self, job_id: str, status: str, message: str, result_url: str = "", extra: dict | None = None) -> None:
+        updates = {**(extra or {}), "status": status, "message": message, "updatedAt": int(time.time())}
+        await asyncio.to_thread(self._commit, [("update", "jobs", job_id, updates)])
+        logging.info(f"Job {job_id} updated: status={status}, message={message}")
+
+
+    async def complete_job(self, job_id: str, message: str, result_url: str, artifacts: dict, extra: dict | None = None) -> None:
+        """Store the result and mark the job completed in one transaction
+        """
+        now = int(time.time())
+        result = {"id": job_id, "resultUrl": result_url, **artifacts, "createdAt": now, "expiresAt": now + 3600}
+        updates = {**(extra or {}), "status": "completed", "message": message, "updatedAt": now, "expiresAt": now + 300}
+        await asyncio.to_thread(self._commit, [("set", "results", job_id, result), ("update", "jobs", job_id, updates)])
+        logging.info(f"Job {job_id} completed")
+
+
+    async def acquire_lease(self, job_id: str, owner: str, seconds: int) -> dict | None:
+        """Take the job's processing lease and return the job document, like FirestoreService.acquire_lease
+        """
+        def claim(job):
+            updates = claim_lease(job, owner, seconds, time.time())
+            return [("update", "jobs", job_id, updates)] if updates is not None else []
+
+        return await asyncio.to_thread(self._commit, [], ("jobs", job_id, claim))
+
+
+    async def renew_lease(self, job_id: str, owner: str, seconds: int) -> None:
+        def renew(job):
+            return [("update", "jobs", job_id, renew_lease(job, owner, seconds, time.time()))]
+
+        await asyncio.to_thread(self._commit, [], ("jobs", job_id, renew))
+
+
+    async def save_checkpoint(self, job_id: str, checkpoint: dict) -> None:
+        await asyncio.to_thread(self._commit, [("update", "jobs", job_id, {"checkpoint": checkpoint})])
+
+
+    def _commit(self, writes: list[tuple[str, str, str, dict]], read: tuple | None = None) -> dict | None:
+        """Apply `writes` in one transaction. With `read` = (collection, doc_id, fn), the document is
+           read inside the transaction first and the writes returned by `fn(document)` are added.
+           Returns the document read, or None.
+        """
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                document = None
+                if read is not None:
+                    collection, doc_id, fn = read
+                    row = conn.execute(
+                        "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)).fetchone()
+                    document = json.loads(row[0]) if row else None
+                    if document is not None:
+                        writes = writes + fn(document)
+                for op, collection, doc_id, data in writes:
+                    if op == "update":
+                        row = conn.execute(
+                            "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)).fetchone()
+                        if row is None:
+                            raise KeyError(f"{collection}/{doc_id} not found")
+                        data = {**json.loads(row[0]), **data}
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                        (collection, doc_id, json.dumps(data)),
+                    )
+                    conn.execute(
+                        "INSERT INTO changes (collection, id, changed_at) VALUES (?, ?, ?)",
+                        (collection, doc_id, time.time()),
+                    )
+                conn.execute("COMMIT")
+                return document
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+
+class LocalBlobStore:
+
+
+    def __init__(self, root: str):
+        """Filesystem stand-in for GCSService, reading and writing the api's blob directory
+        """
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+
+    def file_path(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid object path: {path}")
+        return full_path
+
+
+    async def download_file_from_gcs(self, gcs_path: str):
+        def read():
+            with open(self.file_path(gcs_path), "rb") as f:
+                return f.read()
+
+        data = await asyncio.to_thread(read)
+        # The api stores uploads under their original file name
+        return data, mimetypes.guess_type(gcs_path)[0] or "application/octet-stream"
+
+
+    async def upload_result(self, job_id: str, filename: str, data: bytes, content_type: str) -> dict:
+        path = f"results/{job_id}/{filename}"
+        await self.upload_file(path, data, content_type)
+        return {"path": path, "size": len(data), "contentType": content_type, "sha256": hashlib.sha256(data).hexdigest()}
+
+
+    async def upload_file(self, gcs_path: str, data: bytes, content_type: str) -> None:
+        def write():
+            full_path = self.file_path(gcs_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            temp_path = f"{full_path}.{uuid.uuid4().hex}.part"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, full_path)
+
+        await asyncio.to_thread(write)
+
+
+    async def delete_file_from_gcs(self, gcs_path: str) -> None:
+        try:
+            await asyncio.to_thread(os.remove, self.file_path(gcs_path))
+        except Exception as e:
+            logging.warning(f"Failed to delete file {gcs_path}: {e}")
@@ -0,0 +1,125 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+
+
+# Minimum seconds between two intermediate ("processing") writes of one job
+STATUS_WRITE_INTERVAL_SECONDS = float(os.getenv("STATUS_WRITE_INTERVAL_SECONDS", "1"))
+TERMINAL_WRITE_ATTEMPTS = 3
+# Failed jobs stay readable this long before the api's sweeper deletes them
+FAILED_JOB_TTL_SECONDS = int(os.getenv("FAILED_JOB_TTL_SECONDS", "3600"))
+
+
+class JobStatusWriter:
+
+
+    def __init__(self, firestore_service, job_id: str, interval: float = STATUS_WRITE_INTERVAL_SECONDS):
+        """Coalesces the status writes of one job.
+           Intermediate updates are written in the background at most once per `interval`,
+           keeping only the latest message and merging their extra fields. Terminal states
+           are never dropped: they wait for an in-flight write, carry any pending fields and
+           are retried.
+        """
+        self.firestore = firestore_service
+        self.job_id = job_id
+        self.interval = interval
+        self.writes = 0
+
+        self._message: Optional[str] = None
+        self._fields: dict = {}
+        self._last_write = float("-inf")
+        self._task: Optional[asyncio.Task] = None
+        self._writing = False
+        self._closed = False
+
+
+    async def update(self, message: str, **fields) -> None:
+        """Queue a progress update; returns without waiting for Firestore
+        """
+        if self._closed:
+            return
+        self._message = message
+        self._fields.update(fields)
+
+        if self._task is None or self._task.done():
+            delay = max(self._last_write + self.interval - time.monotonic(), 0)
+            self._task = asyncio.create_task(self._run(delay))
+
+
+    async def flush(self) -> None:
+        """Write the pending update now and raise if Firestore rejects it
+        """
+        await self._stop()
+        self._closed = False
+        await self._write_pending()
+
+
+    async def fail(self, message: str, **fields) -> None:
+        fields = {"expiresAt": int(time.time()) + FAILED_JOB_TTL_SECONDS, **fields}
+        await self._terminal(fields, self.firestore.update_job_status, self.job_id, "failed", message)
+
+
+    async def complete(self, message: str, result_url: str, artifacts: dict, **fields) -> None:
+        """Store the result and mark the job completed in one atomic write
+        """
+        await self._terminal(fields, self.firestore.complete_job, self.job_id, message, result_url, artifacts)
+
+
+    async def _run(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        while self._message is not None and not self._closed:
+            try:
+                await self._write_pending()
+            except Exception as e:
+                # Progress is best effort; the next update or the terminal state supersedes it
+                logging.warning(f"Failed to write progress of job {self.job_id}: {e}")
+            if self._message is not None and not self._closed:
+                await asyncio.sleep(self.interval)
+
+
+    async def _write_pending(self) -> None:
+        if self._message is None:
+            return
+        message, fields = self._message, self._fields
+        self._message, self._fields = None, {}
+
+        self._writing = True
+        self._last_write = time.monotonic()
+        try:
+            await self.firestore.update_job_status(self.job_id, "processing", message, extra=fields)
+            self.writes += 1
+        finally:
+            self._writing = False
+
+
+    async def _stop(self) -> None:
+        """Stop background writes, letting one that already reached Firestore finish first
+           so it cannot land after the write that follows
+        """
+        self._closed = True
+        if self._task is None or self._task.done():
+            return
+        if self._writing:
+            await asyncio.gather(self._task, return_exceptions=True)
+        else:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+    async def _terminal(self, fields: dict, write, *args) -> None:
+        await self._stop()
+        # Fields of coalesced updates (e.g. preprocessing stats) still reach the job document
+        extra, self._message, self._fields = {**self._fields, **fields}, None, {}
+
+        for attempt in range(1, TERMINAL_WRITE_ATTEMPTS + 1):
+            try:
+                await write(*args, extra=extra)
+                self.writes += 1
+                return
+            except Exception as e:
+                if attempt == TERMINAL_WRITE_ATTEMPTS:
+                    raise
+                logging.warning(f"Terminal write for job {self.job_id} failed (attempt {attempt}): {e}")
+                await asyncio.sleep(0.2 * 2 ** attempt)
@@ -0,0 +1,111 @@
+import time
+import json
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+from uuid import uuid4
+
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+
+TRACE_HEADER = "X-Trace-Id"
+
+STAGE_SECONDS = Histogram(
+    "slides_service_stage_seconds",
+    "Duration of one stage of a slide generation job",
+    ["stage", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+)
+STAGE_BYTES = Histogram(
+    "slides_service_stage_bytes",
+    "Bytes read or written by one stage of a slide generation job",
+    ["stage"],
+    buckets=tuple(4 ** n * 1024 for n in range(9)),
+)
+STAGE_TOKENS = Histogram(
+    "slides_service_stage_tokens",
+    "Tokens sent to or received from the model by one stage",
+    ["stage"],
+    buckets=tuple(4 ** n * 256 for n in range(8)),
+)
+
+
+class Trace:
+
+
+    def __init__(self, trace_id: str, job_id: str):
+        """Spans of one job. Tasks and threads started while the trace is current inherit it,
+           so concurrent stages of the job (downloads, renders) all land here.
+        """
+        self.trace_id = trace_id
+        self.job_id = job_id
+        self.stages: dict[str, dict] = {}
+
+
+    def record(self, stage: str, seconds: float, attributes: dict) -> None:
+        summary = self.stages.setdefault(stage, {"count": 0, "ms": 0.0})
+        summary["count"] += 1
+        summary["ms"] = round(summary["ms"] + seconds * 1000, 1)
+        for key in ("bytes", "tokens"):
+            if isinstance(attributes.get(key), int):
+                summary[key] = summary.get(key, 0) + attributes[key]
+
+
+    def summary(self) -> dict:
+        """Per-stage count, total milliseconds and bytes/tokens, saved on the job document
+        """
+        return {stage: dict(values) for stage, values in self.stages.items()}
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace(trace_id: Optional[str], job_id: str, stages: Optional[dict] = None) -> Trace:
+    """Make a trace current for this task. `stages` are the api's timings from the task payload
+    """
+    trace = Trace(trace_id or uuid4().hex, job_id)
+    trace.stages.update({stage: dict(values) for stage, values in (stages or {}).items()})
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Time a stage, observe it in the stage histograms and log it as one JSON line.
+       Yields the attributes dict, so `bytes` or `tokens` known only at the end can be added.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield attributes
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage, outcome).observe(seconds)
+        if isinstance(attributes.get("bytes"), int):
+            STAGE_BYTES.labels(stage).observe(attributes["bytes"])
+        if isinstance(attributes.get("tokens"), int):
+            STAGE_TOKENS.labels(stage).observe(attributes["tokens"])
+
+        trace = _current.get()
+        if trace is not None:
+            trace.record(stage, seconds, attributes)
+        logging.info(json.dumps({
+            "span": stage,
+            "traceId": trace.trace_id if trace else None,
+            "jobId": trace.job_id if trace else None,
+            "durationMs": round(seconds * 1000, 1),
+            "outcome": outcome,
+            **attributes,
+        }, default=str))
+
+
+def metrics_response() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,126 @@
+import os
+import re
+from dataclasses import dataclass, field
+
+from services.slides.preprocess import PreparedDocument, estimate_tokens
+
+
+# Inputs estimated above this many tokens are outlined section by section first
+TOKEN_LIMIT = int(os.getenv("GENERATION_TOKEN_LIMIT", "16384"))
+# Upper bound on the document tokens sent in a single outline call
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "12000"))
+# Outline calls one job may have in flight; all jobs also share the LLM semaphore
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "4"))
+# Beyond this many sections a job is rejected rather than fanned out
+MAX_SECTIONS = int(os.getenv("MAX_SECTIONS", "32"))
+OUTLINE_MAX_OUTPUT_TOKENS = int(os.getenv("OUTLINE_MAX_OUTPUT_TOKENS", "1024"))
+# Rounds of outlining the outlines before giving up
+MAX_REDUCE_ROUNDS = 3
+
+HEADING = re.compile(r"^#{1,6} ", re.MULTILINE)
+
+OUTLINE_PROMPT = """You are preparing material for a slide deck.
+The text above is section {index} of {total} of the user's documents.
+Write a compact outline of this section in markdown: its headings, key points,
+important numbers, names and conclusions. Keep the original language.
+Do not write slides, introductions or comments, only the outline.
+Stay under {words} words."""
+
+
+@dataclass
+class Section:
+    title: str
+    parts: list[dict] = field(default_factory=list)
+    tokens: int = 0
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """Split text into pieces of at most `max_tokens`, preferring headings, then paragraphs,
+       then lines, and only cutting inside a line when nothing else fits.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    for pattern in (r"\n(?=#{1,6} )", r"\n\n", r"\n"):
+        pieces = [piece for piece in re.split(pattern, text) if piece.strip()]
+        if len(pieces) > 1:
+            break
+    else:
+        limit = max_tokens * 4
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if estimate_tokens(piece) > max_tokens:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(split_text(piece, max_tokens))
+            continue
+        candidate = f"{current}\n\n{piece}" if current else piece
+        if estimate_tokens(candidate) > max_tokens:
+            chunks.append(current)
+            candidate = piece
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_sections(documents: list[PreparedDocument], uploads: list, max_tokens: int = CHUNK_TOKENS) -> list[Section]:
+    """Pack documents into token-bounded sections for the outline calls.
+       Inline text is split and packed; each uploaded file (`uploads`, in the order of the
+       non-inline documents) becomes a section of its own since it cannot be split locally.
+    """
+    sections: list[Section] = []
+    current = Section(title="")
+    handles = iter(uploads)
+
+    for doc in documents:
+        if not doc.inline:
+            handle = next(handles)
+            sections.append(Section(title=doc.file.filename, parts=[{"file_data": {"uri": handle.uri}}], tokens=doc.tokens))
+            continue
+
+        chunks = split_text(doc.text, max_tokens)
+        for number, chunk in enumerate(chunks, start=1):
+            name = doc.file.filename if len(chunks) == 1 else f"{doc.file.filename} (part {number} of {len(chunks)})"
+            tokens = estimate_tokens(chunk)
+            if current.parts and current.tokens + tokens > max_tokens:
+                sections.append(current)
+                current = Section(title="")
+            current.title = f"{current.title}, {name}" if current.title else name
+            current.parts.append({"text": f"# Document: {name}\n\n{chunk}"})
+            current.tokens += tokens
+
+    if current.parts:
+        sections.append(current)
+    return sections
+
+
+def outline_sections(outlines: list[tuple[str, str]], max_tokens: int = CHUNK_TOKENS) -> list[Section]:
+    """Turn (title, outline) pairs into sections again, for another round of outlining
+    """
+    sections: list[Section] = []
+    current = Section(title="")
+    for title, outline in outlines:
+        part = outline_part(title, outline)
+        tokens = estimate_tokens(part["text"])
+        if current.parts and current.tokens + tokens > max_tokens:
+            sections.append(current)
+            current = Section(title="")
+        current.title = f"{current.title}, {title}" if current.title else title
+        current.parts.append(part)
+        current.tokens += tokens
+    if current.parts:
+        sections.append(current)
+    return sections
+
+
+def outline_part(title: str, outline: str) -> dict:
+    return {"text": f"# Outline of {title}\n\n{outline.strip()}"}
+
+
+def outline_prompt(index: int, total: int) -> str:
+    return OUTLINE_PROMPT.format(index=index, total=total, words=OUTLINE_MAX_OUTPUT_TOKENS * 3 // 5)
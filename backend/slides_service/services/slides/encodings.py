@@ -0,0 +1,28 @@
+import os
+import gzip
+import logging
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "9"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "9"))
+
+# Extension of the precompressed object for each Content-Encoding
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def precompress(data: bytes) -> dict[str, bytes]:
+    """Compress an artifact once at store time for every supported Content-Encoding.
+       Variants that do not come out smaller than the original are skipped.
+    """
+    variants = {"gzip": gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        logging.info("brotli is not installed, storing gzip variant only")
+
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
@@ -0,0 +1,69 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+
+class FakeResponse:
+
+
+    def __init__(self, text: str):
+        self.text = text
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text)]))]
+
+
+class FakeModel:
+
+
+    def __init__(self, latency: float = 0.0, slides: int = 8, chunks: int = 20):
+        """Deterministic stand-in for the Gemini model (LLM_BACKEND=fake).
+           The same contents always produce the same deck, after `latency` seconds; streamed
+           responses spread that time over `chunks` pieces.
+        """
+        self.latency = latency
+        self.slides = slides
+        self.chunks = chunks
+        self.calls = 0
+
+
+    @classmethod
+    def from_env(cls) -> "FakeModel":
+        return cls(
+            latency=float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "2")),
+            slides=int(os.getenv("FAKE_LLM_SLIDES", "8")),
+        )
+
+
+    async def generate_content_async(self, contents, generation_config=None, stream: bool = False):
+        self.calls += 1
+        seed = hashlib.sha256(json.dumps(contents, sort_keys=True, default=str).encode()).hexdigest()
+        # Outline calls (map step of chunked generation) pass their own generation config
+        text = self.outline(seed) if generation_config is not None else self.deck(seed)
+
+        if stream:
+            return self.stream(text)
+        await asyncio.sleep(self.latency)
+        return FakeResponse(text)
+
+
+    async def stream(self, text: str):
+        size = max(len(text) // self.chunks, 1)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        for piece in pieces:
+            await asyncio.sleep(self.latency / len(pieces))
+            yield FakeResponse(piece)
+
+
+    def deck(self, seed: str) -> str:
+        rng = random.Random(seed)
+        slides = [f"# Presentation {seed[:8]}\n\nGenerated offline"]
+        for n in range(1, self.slides):
+            points = "\n".join(f"- Point {n}.{m}: {rng.choice(['growth', 'risk', 'plan', 'result', 'cost'])}" for m in range(1, 4))
+            slides.append(f"## Topic {n}\n\n{points}")
+        return "```markdown\n---\nmarp: true\ntheme: default\n---\n\n" + "\n\n---\n\n".join(slides) + "\n```"
+
+
+    def outline(self, seed: str) -> str:
+        return "\n".join(f"- Key point {seed[n:n + 6]}" for n in range(0, 30, 6))
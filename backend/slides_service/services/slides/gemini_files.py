@@ -0,0 +1,239 @@
+import io
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import uuid4
+
+from services.infra.telemetry import span
+
+
+@dataclass
+class GeminiFileHandle:
+    key: str
+    name: str
+    uri: str
+    mime_type: str
+    expires_at: float
+    refs: int = 0
+    last_used: float = field(default_factory=time.time)
+
+
+def file_key(data: bytes, mime_type: str) -> str:
+    return hashlib.sha256(mime_type.encode() + b"\0" + data).hexdigest()
+
+
+def expiration_timestamp(remote_file) -> float:
+    expiration = getattr(remote_file, "expiration_time", None)
+    if isinstance(expiration, datetime):
+        return expiration.timestamp()
+    # The File API keeps uploads for 48 hours
+    return time.time() + 48 * 3600
+
+
+class GeminiFileCache:
+
+
+    def __init__(self, api, semaphore: Optional[asyncio.Semaphore] = None):
+        """Reuse Gemini File API uploads across jobs, keyed by a SHA-256 of the bytes and mime type.
+
+        `api` provides `upload_file(file, display_name=, mime_type=)` and `delete_file(name)`;
+        the `google.generativeai` module in production, `FakeFileAPI` in tests.
+        """
+        self.api = api
+        self.semaphore = semaphore or asyncio.Semaphore(8)
+        # Handles must outlive the generation that uses them
+        self.min_remaining = int(os.getenv("GEMINI_FILE_MIN_REMAINING_SECONDS", "1800"))
+        # Unreferenced uploads are deleted after this long without reuse
+        self.idle_seconds = int(os.getenv("GEMINI_FILE_IDLE_SECONDS", "3600"))
+        self.reap_interval = int(os.getenv("GEMINI_FILE_REAP_INTERVAL_SECONDS", "300"))
+
+        self.stats = {"hits": 0, "uploads": 0, "deletes": 0}
+        self._handles: dict[str, GeminiFileHandle] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+
+    async def acquire(self, files: list) -> list[GeminiFileHandle]:
+        """Return a live handle for each file, uploading cache misses concurrently.
+           Every acquired handle must be given back with `release`.
+        """
+        self._ensure_reaper()
+        handles = await asyncio.gather(*(self._acquire_one(file) for file in files), return_exceptions=True)
+
+        failed = next((handle for handle in handles if isinstance(handle, BaseException)), None)
+        if failed is not None:
+            self.release([handle for handle in handles if isinstance(handle, GeminiFileHandle)])
+            raise failed
+        return handles
+
+
+    def release(self, handles: list[GeminiFileHandle]) -> None:
+        now = time.time()
+        for handle in handles:
+            handle.refs = max(handle.refs - 1, 0)
+            handle.last_used = now
+
+
+    def records(self, handles: list[GeminiFileHandle]) -> list[dict]:
+        """Serializable form of `handles`, checkpointed so a retry on another instance can `adopt` them
+        """
+        return [
+            {"key": h.key, "name": h.name, "uri": h.uri, "mimeType": h.mime_type, "expiresAt": h.expires_at}
+            for h in handles
+        ]
+
+
+    def adopt(self, records: list[dict]) -> int:
+        """Seed the cache with uploads made by an earlier delivery of the same job, unless they expire soon.
+           Returns the number of handles adopted.
+        """
+        now = time.time()
+        adopted = 0
+        for record in records:
+            if record["key"] in self._handles or record["expiresAt"] - now <= self.min_remaining:
+                continue
+            self._handles[record["key"]] = GeminiFileHandle(
+                key=record["key"],
+                name=record["name"],
+                uri=record["uri"],
+                mime_type=record["mimeType"],
+                expires_at=record["expiresAt"],
+            )
+            adopted += 1
+        return adopted
+
+
+    async def _acquire_one(self, file) -> GeminiFileHandle:
+        key = file_key(file.data, file.type)
+
+        handle = self._handles.get(key)
+        if handle is not None and handle.expires_at - time.time() > self.min_remaining:
+            self.stats["hits"] += 1
+            handle.refs += 1
+            handle.last_used = time.time()
+            return handle
+
+        # Jobs sharing a file while it uploads wait for the same upload
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._upload(key, file))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        handle = await asyncio.shield(pending)
+        handle.refs += 1
+        handle.last_used = time.time()
+        return handle
+
+
+    async def _upload(self, key: str, file) -> GeminiFileHandle:
+        async with self.semaphore:
+            with span("gemini_file_upload", bytes=len(file.data), mimeType=file.type):
+                remote = await asyncio.to_thread(
+                    self.api.upload_file, io.BytesIO(file.data), display_name=file.filename, mime_type=file.type)
+
+        self.stats["uploads"] += 1
+        handle = GeminiFileHandle(
+            key=key,
+            name=remote.name,
+            uri=remote.uri,
+            mime_type=file.type,
+            expires_at=expiration_timestamp(remote),
+        )
+
+        previous = self._handles.get(key)
+        self._handles[key] = handle
+        if previous is not None and previous.refs == 0:
+            asyncio.ensure_future(self._delete(previous))
+        logging.info(f"Uploaded {file.filename} to Gemini as {handle.name}")
+        return handle
+
+
+    async def reap(self) -> int:
+        """Forget expired handles and delete remote files nobody used for `idle_seconds`.
+           Returns the number of handles removed.
+        """
+        now = time.time()
+        stale = [
+            handle for handle in self._handles.values()
+            if handle.refs == 0 and (handle.expires_at <= now or now - handle.last_used >= self.idle_seconds)
+        ]
+        for handle in stale:
+            del self._handles[handle.key]
+        await asyncio.gather(*(self._delete(handle) for handle in stale))
+        return len(stale)
+
+
+    async def _delete(self, handle: GeminiFileHandle) -> None:
+        if handle.expires_at <= time.time():
+            # Already removed by the File API
+            return
+        try:
+            await asyncio.to_thread(self.api.delete_file, handle.name)
+            self.stats["deletes"] += 1
+        except Exception as e:
+            logging.warning(f"Failed to delete Gemini file {handle.name}: {e}")
+
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.ensure_future(self._reap_forever())
+
+
+    async def _reap_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                removed = await self.reap()
+                if removed:
+                    logging.info(f"Reaped {removed} Gemini file handles")
+            except Exception as e:
+                logging.warning(f"Gemini file reaper failed: {e}")
+
+
+class FakeFileAPI:
+
+
+    def __init__(self, latency: float = 0.0, lifetime: float = 48 * 3600):
+        """In-memory stand-in for the Gemini File API, for offline tests and benchmarks
+        """
+        self.latency = latency
+        self.lifetime = lifetime
+        self.files: dict[str, bytes] = {}
+        self.uploads = 0
+        self.deletes = 0
+
+
+    def upload_file(self, file, display_name: str = None, mime_type: str = None):
+        time.sleep(self.latency)
+        name = f"files/{uuid4().hex[:12]}"
+        self.files[name] = file.read()
+        self.uploads += 1
+        return FakeRemoteFile(
+            name=name,
+            uri=f"https://generativelanguage.googleapis.com/v1beta/{name}",
+            display_name=display_name,
+            mime_type=mime_type,
+            expiration_time=datetime.now(timezone.utc) + timedelta(seconds=self.lifetime),
+        )
+
+
+    def delete_file(self, name: str) -> None:
+        if name not in self.files:
+            raise KeyError(f"{name} not found")
+        del self.files[name]
+        self.deletes += 1
+
+
+@dataclass
+class FakeRemoteFile:
+    name: str
+    uri: str
+    display_name: Optional[str]
+    mime_type: Optional[str]
+    expiration_time: datetime
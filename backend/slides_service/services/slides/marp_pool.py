@@ -0,0 +1,237 @@
+import io
+import os
+import json
+import time
+import queue
+import atexit
+import base64
+import logging
+import threading
+import subprocess
+from itertools import count
+from typing import Optional, Tuple
+
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "marp_worker.js")
+FORMATS = ("pdf", "html")
+
+
+class MarpWorkerError(RuntimeError):
+    pass
+
+
+class MarpWorker:
+
+
+    def __init__(self, script_path: str = WORKER_SCRIPT, startup_timeout: float = 30):
+        """Spawn a Node process running the Marp render worker and wait until it is ready
+        """
+        self.renders = 0
+        self._ids = count(1)
+        self.proc = subprocess.Popen(
+            ["node", script_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=os.environ.copy(),
+        )
+        ready = self._read_message(startup_timeout)
+        if not ready.get("ready"):
+            self.close()
+            raise MarpWorkerError(f"Marp worker failed to start: {ready}")
+        logging.info("Started Marp worker pid=%s", self.proc.pid)
+
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+
+    def render(self, markdown: str, theme: str, timeout: float, formats: Tuple[str, ...] = FORMATS) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """Render markdown into PDF and HTML on this worker; formats not requested come back as None
+        """
+        request_id = next(self._ids)
+        request = {"id": request_id, "markdown": markdown, "theme": theme, "formats": list(formats)}
+        try:
+            self.proc.stdin.write((json.dumps(request) + "\n").encode())
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise MarpWorkerError(f"Marp worker pipe is closed: {e}")
+
+        response = self._read_message(timeout)
+        self.renders += 1
+
+        if response.get("id") != request_id:
+            raise MarpWorkerError(f"Unexpected response from Marp worker: {response.get('id')}")
+        if not response.get("ok"):
+            raise RuntimeError(f"Failed to render presentation with Marp: {response.get('error')}")
+
+        pdf, html = response.get("pdf"), response.get("html")
+        return (base64.b64decode(pdf) if pdf is not None else None, base64.b64decode(html) if html is not None else None)
+
+
+    def _read_message(self, timeout: float) -> dict:
+        # The worker gets killed if it does not answer in time, which unblocks readline
+        watchdog = threading.Timer(timeout, self.proc.kill)
+        watchdog.start()
+        try:
+            line = self.proc.stdout.readline()
+        finally:
+            watchdog.cancel()
+
+        if not line:
+            raise MarpWorkerError(f"Marp worker exited (code={self.proc.poll()})")
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise MarpWorkerError(f"Invalid message from Marp worker: {e}")
+
+
+    def close(self) -> None:
+        if self.proc.poll() is not None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except Exception:
+            self.proc.kill()
+            self.proc.wait()
+        logging.info("Stopped Marp worker pid=%s after %d renders", self.proc.pid, self.renders)
+
+
+class MarpWorkerPool:
+
+
+    def __init__(self, size: int = 2, max_renders: int = 50, render_timeout: float = 120):
+        """Pool of warm Marp workers.
+           Workers are started lazily and recycled after `max_renders` renders or when they crash.
+        """
+        self.size = size
+        self.max_renders = max_renders
+        self.render_timeout = render_timeout
+
+        # Each slot holds either a running worker or None (not started / recycled)
+        self._slots: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put(None)
+        self._closed = False
+
+        atexit.register(self.close)
+
+
+    @classmethod
+    def from_env(cls) -> "MarpWorkerPool":
+        return cls(
+            size=int(os.getenv("MARP_POOL_SIZE", "2")),
+            max_renders=int(os.getenv("MARP_WORKER_MAX_RENDERS", "50")),
+            render_timeout=float(os.getenv("MARP_RENDER_TIMEOUT", "120")),
+        )
+
+
+    def warmup(self) -> None:
+        """Start every worker up front instead of on the first render
+        """
+        workers = [self._acquire() for _ in range(self.size)]
+        for worker in workers:
+            self._release(worker)
+
+
+    def render(self, markdown: str, theme: str, formats: Tuple[str, ...] = FORMATS) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """Render markdown into (PDF, HTML) bytes using a warm worker.
+           A worker that crashed mid-render is replaced and the render is retried once.
+        """
+        for attempt in range(2):
+            worker = self._acquire()
+            try:
+                return worker.render(markdown, theme, self.render_timeout, formats)
+            except MarpWorkerError as e:
+                logging.warning("Marp worker failed (attempt %d): %s", attempt + 1, e)
+                worker.close()
+                worker = None
+                if attempt == 1:
+                    raise RuntimeError(f"Failed to render presentation with Marp: {e}")
+            finally:
+                self._release(worker)
+
+
+    def _acquire(self) -> MarpWorker:
+        if self._closed:
+            raise RuntimeError("Marp worker pool is closed")
+
+        worker: Optional[MarpWorker] = self._slots.get()
+        if worker is not None and worker.alive():
+            return worker
+
+        try:
+            return MarpWorker()
+        except Exception:
+            self._slots.put(None)
+            raise
+
+
+    def _release(self, worker: Optional[MarpWorker]) -> None:
+        if worker is not None and (self._closed or not worker.alive() or worker.renders >= self.max_renders):
+            worker.close()
+            worker = None
+        self._slots.put(worker)
+
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                worker = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
+
+
+class FakeRenderer:
+
+
+    def __init__(self, latency: float = 0.5):
+        """Offline stand-in for the worker pool (RENDER_BACKEND=fake): sleeps `latency` seconds per
+           render and returns a one-page-per-slide PDF and a minimal HTML page
+        """
+        self.size = 1
+        self.latency = latency
+        self.renders = 0
+
+
+    @classmethod
+    def from_env(cls) -> "FakeRenderer":
+        return cls(latency=float(os.getenv("FAKE_RENDER_SECONDS", "0.5")))
+
+
+    def warmup(self) -> None:
+        pass
+
+
+    def render(self, markdown: str, theme: str, formats: Tuple[str, ...] = FORMATS) -> Tuple[Optional[bytes], Optional[bytes]]:
+        time.sleep(self.latency)
+        self.renders += 1
+        slides = max(markdown.count("\n---\n") - (2 if markdown.startswith("---") else 0) + 1, 1)
+
+        pdf = html = None
+        if "pdf" in formats:
+            pdf = fake_pdf(slides)
+        if "html" in formats:
+            body = "".join(f"<section>{index}</section>" for index in range(1, slides + 1))
+            html = f"<!DOCTYPE html><html><head><title>{theme}</title></head><body>{body}</body></html>".encode()
+        return pdf, html
+
+
+    def close(self) -> None:
+        pass
+
+
+def fake_pdf(pages: int) -> bytes:
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        return b"%PDF-1.4\n%%EOF\n"
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=1280, height=720)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
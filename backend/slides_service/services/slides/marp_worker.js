@@ -0,0 +1,145 @@
+// Long-lived Marp render worker.
+//
+// Reads one JSON request per line from stdin:
+//   {"id": "...", "markdown": "...", "theme": "<css path or theme name>", "formats": ["pdf", "html"]}
+// and writes one JSON response per line to stdout:
+//   {"id": "...", "ok": true, "pdf": "<base64>", "html": "<base64>"}
+//   {"id": "...", "ok": false, "error": "..."}
+//
+// Node, the Marp CLI module and the Chromium instance used for PDF output are
+// kept alive between requests so a render does not pay the boot cost again.
+
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+const readline = require("readline");
+
+const { marpCli } = require("@marp-team/marp-cli");
+const puppeteer = require("puppeteer-core");
+
+// Keep stdout reserved for protocol messages.
+const out = process.stdout;
+console.log = console.error;
+console.info = console.error;
+
+let browserPromise = null;
+
+function getBrowser() {
+  if (!browserPromise) {
+    browserPromise = puppeteer
+      .launch({
+        executablePath: process.env.CHROME_PATH || "/usr/bin/chromium",
+        headless: true,
+        args: ["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"],
+      })
+      .then((browser) => {
+        browser.on("disconnected", () => {
+          browserPromise = null;
+        });
+        return browser;
+      })
+      .catch((err) => {
+        browserPromise = null;
+        throw err;
+      });
+  }
+  return browserPromise;
+}
+
+async function runMarp(args) {
+  const code = await marpCli(args);
+  if (code !== 0) {
+    throw new Error(`marp-cli exited with code ${code}`);
+  }
+}
+
+async function renderPdf(mdPath, theme, dir) {
+  // Same pipeline marp-cli uses for --pdf: render the bare template, then
+  // print it with Chromium. Only the browser launch is shared.
+  const barePath = path.join(dir, "bare.html");
+  await runMarp([mdPath, "--html", "--template", "bare", "--theme", theme, "--output", barePath]);
+
+  const browser = await getBrowser();
+  const page = await browser.newPage();
+  try {
+    await page.goto(`file://${barePath}`, { waitUntil: "networkidle0" });
+    const size = await page.evaluate(() => {
+      const svg = document.querySelector("svg[data-marpit-svg]");
+      const box = svg && svg.viewBox && svg.viewBox.baseVal;
+      return box ? { width: box.width, height: box.height } : { width: 1280, height: 720 };
+    });
+    await page.setViewport({ width: Math.round(size.width), height: Math.round(size.height) });
+    await page.evaluate(() => document.fonts.ready);
+    return await page.pdf({
+      width: `${size.width}px`,
+      height: `${size.height}px`,
+      printBackground: true,
+      margin: { top: 0, right: 0, bottom: 0, left: 0 },
+    });
+  } finally {
+    await page.close();
+  }
+}
+
+async function handle(request) {
+  const dir = fs.mkdtempSync(path.join(os.tmpdir(), "ai-slider-worker-"));
+  try {
+    const mdPath = path.join(dir, "ppt.md");
+    fs.writeFileSync(mdPath, request.markdown, "utf-8");
+
+    const formats = request.formats || ["pdf", "html"];
+    const response = { id: request.id, ok: true };
+
+    if (formats.includes("html")) {
+      const htmlPath = path.join(dir, "ppt.html");
+      await runMarp([mdPath, "--html", "--theme", request.theme, "--output", htmlPath]);
+      response.html = fs.readFileSync(htmlPath).toString("base64");
+    }
+    if (formats.includes("pdf")) {
+      const pdf = await renderPdf(mdPath, request.theme, dir);
+      response.pdf = Buffer.from(pdf).toString("base64");
+    }
+    return response;
+  } finally {
+    fs.rmSync(dir, { recursive: true, force: true });
+  }
+}
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+// Requests are handled one at a time; the Python pool never sends a second
+// request before the first one is answered.
+let chain = Promise.resolve();
+
+rl.on("line", (line) => {
+  if (!line.trim()) {
+    return;
+  }
+  chain = chain.then(async () => {
+    let request;
+    try {
+      request = JSON.parse(line);
+      const response = await handle(request);
+      out.write(JSON.stringify(response) + "\n");
+    } catch (err) {
+      const id = request ? request.id : null;
+      out.write(JSON.stringify({ id, ok: false, error: String(err && err.stack ? err.stack : err) }) + "\n");
+    }
+  });
+});
+
+rl.on("close", async () => {
+  await chain;
+  if (browserPromise) {
+    try {
+      const browser = await browserPromise;
+      await browser.close();
+    } catch (err) {
+      // Browser already gone.
+    }
+  }
+  process.exit(0);
+});
+
+// Signal readiness once the modules are loaded.
+out.write(JSON.stringify({ id: null, ok: true, ready: true }) + "\n");
@@ -0,0 +1,201 @@
+import io
+import os
+import re
+import time
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from prometheus_client import Counter
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # Without pypdf PDFs are stored as rendered
+    PdfReader = PdfWriter = None
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow images keep their rendered resolution
+    Image = None
+
+
+# ARTIFACT_OPTIMIZATION_ENABLED=false stores every artifact exactly as Marp rendered it
+OPTIMIZATION_ENABLED = os.getenv("ARTIFACT_OPTIMIZATION_ENABLED", "true").lower() == "true"
+# Preset for jobs whose settings do not name one (`artifactQuality`)
+DEFAULT_QUALITY = os.getenv("ARTIFACT_QUALITY", "standard")
+# Data URIs at least this long that appear more than once in a deck's HTML are stored once
+DEDUPE_MIN_CHARS = int(os.getenv("HTML_DEDUPE_MIN_CHARS", "1024"))
+
+BYTES_SAVED = Counter(
+    "slides_service_artifact_bytes_saved_total",
+    "Bytes removed from rendered artifacts by the optimization stage",
+    ["format"],
+)
+
+
+@dataclass(frozen=True)
+class QualityPreset:
+    minify_html: bool
+    compress_pdf: bool
+    # Longest side in pixels of images embedded in the PDF; larger ones are downsampled (0 keeps them)
+    image_max_pixels: int = 0
+    # JPEG quality of downsampled images
+    image_quality: int = 85
+
+
+QUALITY_PRESETS = {
+    "original": QualityPreset(minify_html=False, compress_pdf=False),
+    # Renders exactly like the original: minified HTML, recompressed PDF content, deduplicated objects
+    "lossless": QualityPreset(minify_html=True, compress_pdf=True),
+    # Slides are 1280x720, so 1920 pixels still covers a 1.5x display
+    "standard": QualityPreset(minify_html=True, compress_pdf=True, image_max_pixels=1920, image_quality=85),
+    "compact": QualityPreset(minify_html=True, compress_pdf=True, image_max_pixels=1280, image_quality=70),
+}
+
+# Elements whose content must not be reflowed; <style> content is minified as CSS instead
+RAW_ELEMENT = re.compile(r"(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2\s*>)", re.IGNORECASE | re.DOTALL)
+# Comments, except conditional comments which old browsers execute
+HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+WHITESPACE = re.compile(r"\s+")
+CSS_STRING = r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'"
+CSS_COMMENT = re.compile(rf"({CSS_STRING})|/\*.*?\*/", re.DOTALL)
+CSS_SPACE = re.compile(rf"({CSS_STRING})|\s*([{{}};,>])\s*|\s+", re.DOTALL)
+# url(...) around a base64 data URI, in CSS or in a style attribute (where quotes are escaped)
+DATA_URL = re.compile(r"url\((&quot;|[\"']?)(data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+)\1\)")
+
+
+def quality_preset(settings) -> tuple[str, QualityPreset]:
+    """Preset named by the job's `artifactQuality` setting, or DEFAULT_QUALITY
+    """
+    name = getattr(settings, "artifactQuality", None) or DEFAULT_QUALITY
+    if name not in QUALITY_PRESETS:
+        logging.warning(f"Unknown artifact quality {name!r}, using {DEFAULT_QUALITY!r}")
+        name = DEFAULT_QUALITY
+    return name, QUALITY_PRESETS[name]
+
+
+def optimize_artifacts(pdf: bytes, html: bytes, quality: str) -> tuple[bytes, bytes, dict]:
+    """Shrink the rendered PDF and HTML of a deck with the given preset.
+       A format whose optimization fails or does not come out smaller is kept as rendered.
+       Returns both artifacts and a report of their sizes and the CPU time spent.
+    """
+    preset = QUALITY_PRESETS[quality]
+    start = time.thread_time()
+    report = {"quality": quality}
+
+    optimized_pdf = optimized_html = None
+    if OPTIMIZATION_ENABLED and preset.compress_pdf:
+        optimized_pdf = attempt("pdf", optimize_pdf, pdf, preset)
+    if OPTIMIZATION_ENABLED and preset.minify_html:
+        optimized_html = attempt("html", optimize_html, html)
+
+    results = []
+    for name, original, optimized in (("pdf", pdf, optimized_pdf), ("html", html, optimized_html)):
+        if optimized is None or len(optimized) >= len(original):
+            optimized = original
+        report[name] = {"originalBytes": len(original), "bytes": len(optimized)}
+        BYTES_SAVED.labels(name).inc(len(original) - len(optimized))
+        results.append(optimized)
+
+    report["savedBytes"] = sum(report[name]["originalBytes"] - report[name]["bytes"] for name in ("pdf", "html"))
+    report["cpuMs"] = round((time.thread_time() - start) * 1000, 1)
+    return results[0], results[1], report
+
+
+def attempt(name: str, optimize, data: bytes, *args) -> Optional[bytes]:
+    try:
+        return optimize(data, *args)
+    except Exception as e:
+        logging.warning(f"Failed to optimize {name} artifact, storing it as rendered: {e}")
+        return None
+
+
+def optimize_html(html: bytes) -> bytes:
+    return minify_html(dedupe_data_urls(html.decode("utf-8"))).encode("utf-8")
+
+
+def dedupe_data_urls(html: str) -> str:
+    """Store each large data URI used more than once (e.g. a background on every slide) a single time,
+       as a CSS custom property on :root that every former occurrence refers to
+    """
+    counts: dict[str, int] = {}
+    for match in DATA_URL.finditer(html):
+        counts[match.group(2)] = counts.get(match.group(2), 0) + 1
+    shared = [uri for uri, uses in counts.items() if uses > 1 and len(uri) >= DEDUPE_MIN_CHARS]
+    head_end = html.lower().find("</head>")
+    if not shared or head_end == -1:
+        return html
+
+    names = {uri: f"--asset-{number}" for number, uri in enumerate(shared)}
+    html = DATA_URL.sub(lambda match: f"var({names[match.group(2)]})" if match.group(2) in names else match.group(0), html)
+    declarations = ";".join(f'{name}:url("{uri}")' for uri, name in names.items())
+    head_end = html.lower().find("</head>")
+    return f"{html[:head_end]}<style>:root{{{declarations}}}</style>{html[head_end:]}"
+
+
+def minify_html(html: str) -> str:
+    """Drop comments and collapse whitespace runs to a single character, which renders the same.
+       <pre>, <textarea> and <script> stay as they are; <style> blocks are minified as CSS and
+       repeated ones dropped.
+    """
+    parts = []
+    styles = set()
+    position = 0
+    for match in RAW_ELEMENT.finditer(html):
+        parts.append(minify_text(html[position:match.start()]))
+        position = match.end()
+        opening, tag, content, closing = match.groups()
+        if tag.lower() == "style":
+            content = minify_css(content)
+            if (opening, content) in styles:
+                continue
+            styles.add((opening, content))
+        parts.append(opening + content + closing)
+    parts.append(minify_text(html[position:]))
+    return "".join(parts)
+
+
+def minify_text(html: str) -> str:
+    html = HTML_COMMENT.sub("", html)
+    return WHITESPACE.sub(lambda match: "\n" if "\n" in match.group(0) else " ", html)
+
+
+def minify_css(css: str) -> str:
+    css = CSS_COMMENT.sub(lambda match: match.group(1) or " ", css)
+
+    def collapse(match):
+        if match.group(1):
+            return match.group(1)
+        return match.group(2) or " "
+
+    return CSS_SPACE.sub(collapse, css).strip()
+
+
+def optimize_pdf(pdf: bytes, preset: QualityPreset) -> bytes:
+    """Recompress page content streams, downsample oversized images and merge identical objects
+       (fonts and images repeated by batch renders that were concatenated)
+    """
+    if PdfWriter is None:
+        return pdf
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(pdf)))
+    for page in writer.pages:
+        if preset.image_max_pixels and Image is not None:
+            for image in page.images:
+                downsample(image, preset)
+        page.compress_content_streams(level=9)
+    writer.compress_identical_objects()
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def downsample(image, preset: QualityPreset) -> None:
+    picture = image.image
+    width, height = picture.size
+    # Images with transparency or a palette keep their encoding
+    if max(width, height) <= preset.image_max_pixels or picture.mode not in ("RGB", "L"):
+        return
+    scale = preset.image_max_pixels / max(width, height)
+    resized = picture.resize((max(round(width * scale), 1), max(round(height * scale), 1)), Image.LANCZOS)
+    image.replace(resized, quality=preset.image_quality)
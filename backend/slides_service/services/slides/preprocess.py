@@ -0,0 +1,184 @@
+import io
+import re
+import os
+import hashlib
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Without pypdf every PDF is uploaded as-is
+    PdfReader = None
+
+
+# Gemini bills each PDF page as an image of this many tokens, on top of its text
+PDF_TOKENS_PER_PAGE = 258
+CHARS_PER_TOKEN = 4
+
+# Below this much extracted text per page a PDF is probably scanned or mostly images
+MIN_CHARS_PER_PAGE = int(os.getenv("PREPROCESS_MIN_CHARS_PER_PAGE", "200"))
+# A line on at least this share of pages is a running header or footer
+REPEATED_LINE_RATIO = 0.5
+# Paragraphs shorter than this are too generic to deduplicate
+MIN_DEDUP_CHARS = 40
+
+TEXT_TYPES = ("text/markdown", "text/plain", "text/x-markdown")
+PAGE_NUMBER = re.compile(r"^\s*(page\s*)?\d+(\s*(/|of)\s*\d+)?\s*$", re.IGNORECASE)
+# Page objects in a PDF's raw bytes ("/Pages" tree nodes do not match)
+PDF_PAGE_OBJECT = re.compile(rb"/Type\s*/Page\b")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (about four characters per token)
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def fallback_tokens(file) -> int:
+    """Size-based estimate for a file that could not be parsed: the PDF page objects found in its bytes,
+       billed per page, or else its size as text
+    """
+    pages = len(PDF_PAGE_OBJECT.findall(file.data))
+    if pages:
+        return pages * PDF_TOKENS_PER_PAGE
+    return (len(file.data) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PreparedDocument:
+    file: object
+    text: Optional[str]
+    original_tokens: int
+    tokens: int
+
+    @property
+    def inline(self) -> bool:
+        return self.text is not None
+
+
+    def as_part(self) -> dict:
+        return {"text": f"# Document: {self.file.filename}\n\n{self.text}"}
+
+
+@dataclass
+class PreprocessReport:
+    documents: list[PreparedDocument]
+
+    @property
+    def original_tokens(self) -> int:
+        return sum(doc.original_tokens for doc in self.documents)
+
+    @property
+    def tokens(self) -> int:
+        return sum(doc.tokens for doc in self.documents)
+
+
+    def as_dict(self) -> dict:
+        return {
+            "files": len(self.documents),
+            "inlined": sum(1 for doc in self.documents if doc.inline),
+            "originalTokens": self.original_tokens,
+            "tokens": self.tokens,
+            "savedTokens": max(self.original_tokens - self.tokens, 0),
+        }
+
+
+def normalize_text(text: str) -> str:
+    """Unify line endings and whitespace and collapse runs of blank lines
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace(" ", " ")
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def dedupe_paragraphs(text: str) -> str:
+    """Drop paragraphs that already appeared earlier in the document
+    """
+    seen = set()
+    kept = []
+    for paragraph in text.split("\n\n"):
+        key = paragraph.lower()
+        if len(paragraph) >= MIN_DEDUP_CHARS and key in seen:
+            continue
+        seen.add(key)
+        kept.append(paragraph)
+    return "\n\n".join(kept)
+
+
+def edge_lines(page: str, depth: int = 2) -> list[str]:
+    lines = page.split("\n")
+    return lines[:depth] + lines[-depth:]
+
+
+def compact_pages(pages: list[str]) -> list[str]:
+    """Remove running headers/footers, page numbers, empty and duplicate pages
+    """
+    pages = [normalize_text(page) for page in pages]
+
+    repeated = set()
+    if len(pages) >= 3:
+        # Running headers and footers sit in the first or last lines of a page
+        counts = Counter(line for page in pages for line in set(edge_lines(page)) if line)
+        repeated = {line for line, count in counts.items() if count >= max(2, len(pages) * REPEATED_LINE_RATIO)}
+
+    compacted = []
+    seen = set()
+    for page in pages:
+        lines = [line for line in page.split("\n") if line not in repeated and not PAGE_NUMBER.match(line)]
+        text = normalize_text("\n".join(lines))
+        digest = hashlib.sha1(text.lower().encode()).hexdigest()
+        if not text or digest in seen:
+            continue
+        seen.add(digest)
+        compacted.append(text)
+    return compacted
+
+
+def prepare_text(file) -> PreparedDocument:
+    raw = file.data.decode("utf-8", errors="replace")
+    text = dedupe_paragraphs(normalize_text(raw))
+    return PreparedDocument(file=file, text=text, original_tokens=estimate_tokens(raw), tokens=estimate_tokens(text))
+
+
+def prepare_pdf(file) -> PreparedDocument:
+    if PdfReader is None:
+        tokens = fallback_tokens(file)
+        return PreparedDocument(file=file, text=None, original_tokens=tokens, tokens=tokens)
+
+    reader = PdfReader(io.BytesIO(file.data))
+    raw_pages = [page.extract_text() or "" for page in reader.pages]
+    page_count = len(raw_pages)
+    upload_tokens = page_count * PDF_TOKENS_PER_PAGE + estimate_tokens("".join(raw_pages))
+
+    pages = compact_pages(raw_pages)
+    text = dedupe_paragraphs("\n\n".join(pages))
+    inline_tokens = estimate_tokens(text)
+
+    # Scanned or image-heavy PDFs need the model to see the pages themselves
+    if page_count == 0 or len(text) < MIN_CHARS_PER_PAGE * page_count * 0.5 or inline_tokens >= upload_tokens:
+        return PreparedDocument(file=file, text=None, original_tokens=upload_tokens, tokens=upload_tokens)
+    return PreparedDocument(file=file, text=text, original_tokens=upload_tokens, tokens=inline_tokens)
+
+
+def preprocess_files(files: list) -> PreprocessReport:
+    """Turn uploaded files into compact inline text parts where that is cheaper than a file upload.
+       Documents that cannot be inlined keep `text=None` and go through the Gemini File API.
+    """
+    documents = []
+    for file in files:
+        try:
+            if file.type in TEXT_TYPES or file.filename.lower().endswith((".md", ".txt")):
+                documents.append(prepare_text(file))
+            elif file.type == "application/pdf" or file.filename.lower().endswith(".pdf"):
+                documents.append(prepare_pdf(file))
+            else:
+                # Images are billed like a single PDF page
+                tokens = PDF_TOKENS_PER_PAGE if file.type.startswith("image/") else 0
+                documents.append(PreparedDocument(file=file, text=None, original_tokens=tokens, tokens=tokens))
+        except Exception as e:
+            logging.warning(f"Failed to preprocess {file.filename}, uploading it as-is: {e}")
+            tokens = fallback_tokens(file)
+            documents.append(PreparedDocument(file=file, text=None, original_tokens=tokens, tokens=tokens))
+    return PreprocessReport(documents=documents)
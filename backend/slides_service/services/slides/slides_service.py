@@ -1,29 +1,51 @@
 import os
-import io
+import time
+import asyncio
 import shutil
 import tempfile
 import logging
 import subprocess
-from typing import Callable, List, Tuple
-
-import google.generativeai as genai
+from typing import Awaitable, Callable, List, Optional, Tuple
 
 from services.slides.prompts_service import PromptsService
+from services.slides.marp_pool import FakeRenderer, MarpWorkerPool
+from services.slides.gemini_files import FakeFileAPI, GeminiFileCache
+from services.slides.fake_llm import FakeModel
+from services.slides.preprocess import estimate_tokens, preprocess_files
+from services.slides import chunking, streaming
+from services.slides.streaming import SlideStreamParser, ProgressThrottle
+from services.infra.telemetry import span
 from models.task import File, SlideSettings
 
 class SlideService:
     
     
     def __init__(self):
-        """Initialize the Gemini model and prompt service
+        """Initialize the Gemini model (or the offline fake with LLM_BACKEND=fake) and prompt service
         """
-        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
-        self.model = genai.GenerativeModel("gemini-1.5-flash", 
-            generation_config = {
-                "max_output_tokens": 4096
-            }
-        )
+        if os.getenv("LLM_BACKEND", "gemini") == "fake":
+            self.model = FakeModel.from_env()
+            file_api = FakeFileAPI()
+        else:
+            # Imported here: the client library alone takes about a second to load
+            import google.generativeai as genai
+            genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+            self.model = genai.GenerativeModel("gemini-1.5-flash", 
+                generation_config = {
+                    "max_output_tokens": 4096
+                }
+            )
+            file_api = genai
         self.prompt_service = PromptsService()
+        # RENDER_BACKEND=fake replaces Marp with a fixed-latency stand-in for offline benchmarks
+        render_pool = FakeRenderer.from_env() if os.getenv("RENDER_BACKEND", "marp") == "fake" else MarpWorkerPool.from_env()
+        self.render_pool = render_pool if render_pool.size > 0 else None
+
+        # Jobs mostly wait on Gemini, so many LLM calls may overlap while only a few renders run at once
+        self.llm_semaphore = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "16")))
+        self.render_semaphore = asyncio.Semaphore(int(os.getenv("RENDER_CONCURRENCY", str(max(render_pool.size, 1)))))
+
+        self.file_cache = GeminiFileCache(file_api, semaphore=self.llm_semaphore)
         
 
     async def generate_slides(
@@ -31,49 +53,232 @@ class SlideService:
         theme: str,
         files: list[File],
         settings: SlideSettings,
-        status_update_fn: Callable[[str], None],
+        status_update_fn: Callable[..., Awaitable[None]],
+        checkpoint_fn: Optional[Callable[..., Awaitable[None]]] = None,
     ) -> Tuple[bytes, bytes]:
-        """Generate slides from uploaded files and user-defined settings
+        """Generate slides from uploaded files and user-defined settings.
+           `status_update_fn(message, **fields)` reports progress; extra fields are saved on the job.
+           `checkpoint_fn(geminiFiles=...)` and `checkpoint_fn(markdown=...)` are called as stages finish,
+           so a retried task can resume from them.
         """
         await status_update_fn("Analyzing your uploaded files...")
-        # await asyncio.sleep(5)
-        gemini_files = []
-        for file in files:
-            file_reader = io.BytesIO(file.data)
-            gemini_file = genai.upload_file(file_reader, display_name=file.filename, mime_type=file.type)
-            gemini_files.append(gemini_file)
+        with span("preprocess", files=len(files), bytes=sum(len(file.data) for file in files)) as attributes:
+            report = await asyncio.to_thread(preprocess_files, files)
+            attributes["tokens"] = report.tokens
+        logging.info("Preprocessing: %s", report.as_dict())
+
+        # Only documents that could not be inlined as text go through the File API
+        gemini_files = await self.file_cache.acquire([doc.file for doc in report.documents if not doc.inline])
+        try:
+            if checkpoint_fn is not None and gemini_files:
+                await checkpoint_fn(geminiFiles=self.file_cache.records(gemini_files))
+            await status_update_fn("Designing your presentation...", preprocessing=report.as_dict())
+
+            prompt = self.prompt_service.generate_prompt(theme, settings)
+            logging.info("Prompts: %s", prompt)
+
+            # Local estimate instead of a count_tokens round trip on every job
+            with span("count_tokens") as attributes:
+                attributes["tokens"] = report.tokens + estimate_tokens(prompt)
+            if attributes["tokens"] > chunking.TOKEN_LIMIT:
+                sections = chunking.build_sections(report.documents, gemini_files)
+                parts = await self.outline_documents(sections, status_update_fn)
+            else:
+                parts = [{"file_data": {"uri": f.uri}} for f in gemini_files]
+                parts += [doc.as_part() for doc in report.documents if doc.inline]
+            return await self._generate(theme, parts, prompt, status_update_fn, checkpoint_fn)
+        finally:
+            self.file_cache.release(gemini_files)
+
+
+    async def outline_documents(
+        self,
+        sections: list[chunking.Section],
+        status_update_fn: Callable[..., Awaitable[None]],
+    ) -> list[dict]:
+        """Map-reduce for inputs over the token limit: outline each section concurrently,
+           then outline the outlines until they fit into a single generation call.
+        """
+        limit = asyncio.Semaphore(chunking.MAP_CONCURRENCY)
+
+        for round_number in range(1, chunking.MAX_REDUCE_ROUNDS + 1):
+            if len(sections) > chunking.MAX_SECTIONS:
+                raise ValueError("Documents are too large to process")
+
+            done = 0
+            await status_update_fn(f"Summarizing your documents (0 of {len(sections)})...", sections=len(sections))
+
+            async def outline(index: int, section: chunking.Section) -> tuple[str, str]:
+                nonlocal done
+                parts = section.parts + [{"text": chunking.outline_prompt(index, len(sections))}]
+                async with limit, self.llm_semaphore:
+                    with span("outline", section=index, round=round_number) as attributes:
+                        response = await self.model.generate_content_async(
+                            contents=[{"role": "user", "parts": parts}],
+                            generation_config={"max_output_tokens": chunking.OUTLINE_MAX_OUTPUT_TOKENS},
+                        )
+                        text = response.candidates[0].content.parts[0].text
+                        attributes["tokens"] = estimate_tokens(text)
+                done += 1
+                await status_update_fn(f"Summarizing your documents ({done} of {len(sections)})...")
+                return section.title, text
 
-        await status_update_fn("Designing your presentation...")
+            outlines = await asyncio.gather(*(outline(i, section) for i, section in enumerate(sections, start=1)))
+            parts = [chunking.outline_part(title, text) for title, text in outlines]
 
-        prompt = self.prompt_service.generate_prompt(theme, settings)
-        logging.info("Prompts: ", prompt)
+            tokens = sum(estimate_tokens(part["text"]) for part in parts)
+            logging.info(f"Outline round {round_number}: {len(sections)} sections -> {tokens} tokens")
+            if tokens <= chunking.CHUNK_TOKENS:
+                return parts
+            sections = chunking.outline_sections(outlines)
 
+        raise ValueError("Documents are too large to process")
+
+
+    async def _generate(
+        self,
+        theme: str,
+        document_parts: list[dict],
+        prompt: str,
+        status_update_fn: Callable[..., Awaitable[None]],
+        checkpoint_fn: Optional[Callable[..., Awaitable[None]]] = None,
+    ) -> Tuple[bytes, bytes]:
+        """Stream the Marp markdown from the model, reporting slide progress as it arrives,
+           and render it. Batches of finished slides are rendered to PDF while generation continues.
+        """
         await status_update_fn("Preparing the slide content...")
 
-        parts = [{"file_data": {"uri": f.uri}} for f in gemini_files]
-        parts.append({"text": prompt})
-        
-        contents = [{"role": "user", "parts": parts}]
-        
-        token_info = self.model.count_tokens(contents=contents)
-        if token_info.total_tokens > 16384:
-            raise ValueError("Documents are too large to process")
-       
-        response = self.model.generate_content(contents=contents)
-        response_text = response.candidates[0].content.parts[0].text
-        
-        marp_text = self.extract_markdown_content(response_text)
-        if not marp_text:
-            raise ValueError("Failed to generate presentation.")
+        contents = [{"role": "user", "parts": document_parts + [{"text": prompt}]}]
+
+        parser = SlideStreamParser()
+        throttle = ProgressThrottle()
+        early_renders: list[asyncio.Task] = []
+        rendered = 0
+        render_early = self.render_pool is not None and streaming.EARLY_RENDER_SLIDES > 0
+
+        try:
+            async with self.llm_semaphore:
+                with span("generate_content") as attributes:
+                    start = time.perf_counter()
+                    response = await self.model.generate_content_async(contents=contents, stream=True)
+                    async for chunk in response:
+                        attributes.setdefault("firstChunkMs", round((time.perf_counter() - start) * 1000, 1))
+                        parser.feed(self.chunk_text(chunk))
 
-        await status_update_fn("Finalizing your slides...")
+                        if render_early and len(parser.slides) - rendered >= streaming.EARLY_RENDER_SLIDES and streaming.segmentable(parser):
+                            segment = parser.segment(rendered, len(parser.slides))
+                            early_renders.append(asyncio.create_task(self.render_async(segment, theme, ("pdf",))))
+                            rendered = len(parser.slides)
 
-        return self.render_with_marp(marp_text, theme)
+                        if throttle.ready():
+                            await self.report_progress(parser, status_update_fn)
+                    # Output size of the response; the streamed API reports no usage before the end
+                    attributes["bytes"] = len(parser.text.encode())
+                    attributes["tokens"] = estimate_tokens(parser.text)
+            parser.finish()
+
+            with span("markdown_extraction", bytes=len(parser.text.encode())):
+                marp_text = self.extract_markdown_content(parser.text)
+            if not marp_text:
+                raise ValueError("Failed to generate presentation.")
+            if checkpoint_fn is not None:
+                await checkpoint_fn(markdown=marp_text)
+
+            await status_update_fn("Finalizing your slides...", progress={"slides": len(parser.slides), "expectedSlides": len(parser.slides)})
+
+            # Early renders are only valid if the finished deck splits the same way
+            if early_renders and streaming.segmentable(parser) and parser.markdown == marp_text:
+                try:
+                    return await self.finish_early_render(parser, early_renders, rendered, marp_text, theme)
+                except Exception as e:
+                    logging.warning(f"Early render failed, rendering the whole deck: {e}")
+
+            return await self.render_slides(marp_text, theme)
+        finally:
+            for task in early_renders:
+                task.cancel()
+
+
+    async def report_progress(self, parser: SlideStreamParser, status_update_fn: Callable[..., Awaitable[None]]) -> None:
+        finished = len(parser.slides)
+        current = finished + 1 if parser.writing else max(finished, 1)
+        expected = max(streaming.EXPECTED_SLIDES, current)
+
+        fields = {"progress": {"slides": finished, "expectedSlides": expected}}
+        if streaming.PREVIEW_CHARS > 0:
+            fields["preview"] = parser.markdown[-streaming.PREVIEW_CHARS:]
+        await status_update_fn(f"Writing slide {current} of ~{expected}...", **fields)
+
+
+    async def finish_early_render(
+        self,
+        parser: SlideStreamParser,
+        early_renders: list[asyncio.Task],
+        rendered: int,
+        marp_text: str,
+        theme: str,
+    ) -> Tuple[bytes, bytes]:
+        """Render the slides not covered by early renders plus the HTML of the whole deck,
+           and concatenate the PDF batches
+        """
+        final_renders = [self.render_async(marp_text, theme, ("html",))]
+        if rendered < len(parser.slides):
+            final_renders.append(self.render_async(parser.segment(rendered), theme, ("pdf",)))
+
+        batches = await asyncio.gather(*early_renders)
+        (_, html), *rest = await asyncio.gather(*final_renders)
+        pdfs = [pdf for pdf, _ in batches + rest]
+        logging.info(f"Merging {len(pdfs)} PDF batches for {len(parser.slides)} slides")
+        with span("merge_pdfs", batches=len(pdfs)):
+            return await asyncio.to_thread(streaming.merge_pdfs, pdfs), html
+
+
+    async def render_slides(self, markdown: str, theme: str) -> Tuple[bytes, bytes]:
+        """Render a finished deck to PDF and HTML, e.g. markdown checkpointed by an earlier delivery
+        """
+        async with self.render_semaphore:
+            return await asyncio.to_thread(self.render_with_marp, markdown, theme)
+
+
+    async def render_async(self, markdown: str, theme: str, formats: Tuple[str, ...]) -> Tuple[bytes, bytes]:
+        """Render selected formats on the worker pool without blocking the event loop
+        """
+        async with self.render_semaphore:
+            with span("marp_render", formats=",".join(formats)) as attributes:
+                pdf, html = await asyncio.to_thread(self.render_pool.render, markdown, self.theme_argument(theme), formats)
+                attributes["bytes"] = len(pdf or b"") + len(html or b"")
+                return pdf, html
+
+
+    def chunk_text(self, chunk) -> str:
+        try:
+            return chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. the final one carrying only the finish reason)
+            return ""
+
+
+    def theme_argument(self, theme: str) -> str:
+        theme_path = os.path.join("services", "slides", "themes", f"{theme}.css")
+        return os.path.abspath(theme_path) if os.path.exists(theme_path) else theme
 
 
     def render_with_marp(self, markdown: str, theme: str) -> Tuple[bytes, bytes]:
-        """Render the markdown content into PDF and HTML using Marp CLI
+        """Render the markdown content into PDF and HTML using Marp
         """
+        with span("marp_render", formats="pdf,html") as attributes:
+            pdf, html = self._render_with_marp(markdown, theme)
+            attributes["bytes"] = len(pdf) + len(html)
+            return pdf, html
+
+
+    def _render_with_marp(self, markdown: str, theme: str) -> Tuple[bytes, bytes]:
+        theme_arg = self.theme_argument(theme)
+
+        if self.render_pool is not None:
+            return self.render_pool.render(markdown, theme_arg)
+
+        # Pool disabled (MARP_POOL_SIZE=0): spawn the Marp CLI for each output
         temp_dir = tempfile.mkdtemp(prefix="ai-slider-")
         try:
             md_path = os.path.join(temp_dir, "ppt.md")
@@ -83,11 +288,8 @@ class SlideService:
             pdf_path = os.path.join(temp_dir, "ppt.pdf")
             html_path = os.path.join(temp_dir, "ppt.html")
 
-            theme_path = os.path.join("services", "slides", "themes", f"{theme}.css")
-            theme_arg = ["--theme", theme_path] if os.path.exists(theme_path) else ["--theme", theme]
-
-            self.run_marp_cli(md_path, pdf_path, ["--pdf"] + theme_arg)
-            self.run_marp_cli(md_path, html_path, ["--html"] + theme_arg)
+            self.run_marp_cli(md_path, pdf_path, ["--pdf", "--theme", theme_arg])
+            self.run_marp_cli(md_path, html_path, ["--html", "--theme", theme_arg])
 
             with open(pdf_path, "rb") as f:
                 pdf_bytes = f.read()
@@ -105,10 +307,7 @@ class SlideService:
         cmd = ["npx", "@marp-team/marp-cli", input_path, "--output", output_path] + extra_args
         logging.info("Running Marp CLI: %s", ' '.join(cmd))
         result = subprocess.run(cmd, capture_output=True)
-        
-        print("stdout: %s", result.stdout.decode())
-        print("stderr: %s", result.stderr.decode())
-        logging.info("stdout: %s", result.stdout.decode())
+        logging.debug("Marp CLI stdout: %s", result.stdout.decode())
         
         if result.returncode != 0:
             logging.error("Marp CLI error: %s", result.stderr.decode())
@@ -0,0 +1,169 @@
+import io
+import os
+import re
+import time
+from typing import Optional
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # Without pypdf decks are only rendered once generation finishes
+    PdfWriter = None
+
+
+# Minimum seconds between two progress writes to the job document
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("PROGRESS_INTERVAL_SECONDS", "1"))
+# Store a tail of the markdown written so far on the job document (0 disables)
+PREVIEW_CHARS = int(os.getenv("PROGRESS_PREVIEW_CHARS", "1500"))
+# Slide count shown before the model has written that many slides
+EXPECTED_SLIDES = int(os.getenv("EXPECTED_SLIDES", "12"))
+# Completed slides rendered to PDF together while the model keeps writing (0 disables)
+EARLY_RENDER_SLIDES = int(os.getenv("EARLY_RENDER_SLIDES", "4"))
+
+SEPARATOR = re.compile(r"^---\s*$")
+# Marp directives in HTML comments can carry over to later slides
+DIRECTIVE = re.compile(r"<!--.*?:.*?-->", re.DOTALL)
+PAGINATE = re.compile(r"^\s*paginate\s*:\s*true\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+class SlideStreamParser:
+
+
+    def __init__(self):
+        """Incrementally split streamed Marp markdown into front matter and slides at `---` lines.
+           Mirrors `SlideService.extract_markdown_content`: if the model wraps the deck in a code
+           fence, only the lines between the first two fence lines count.
+        """
+        self.text = ""
+        self.front_matter: list[str] = []
+        self.slides: list[str] = []
+        self._buffer = ""
+        self._fenced = False
+        self._reset()
+
+
+    def _reset(self) -> None:
+        self.front_matter = []
+        self.slides = []
+        self._lines: list[str] = []
+        self._current: list[str] = []
+        self._state = "start"
+
+
+    def feed(self, chunk: str) -> int:
+        """Consume a chunk of model output and return how many slides it completed
+        """
+        self.text += chunk
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        before = len(self.slides)
+        for line in lines:
+            self._line(line)
+        return max(len(self.slides) - before, 0)
+
+
+    def _line(self, line: str) -> None:
+        if self._state == "closed":
+            return
+        if line.startswith("```"):
+            if not self._fenced:
+                # Anything before the opening fence was preamble
+                self._reset()
+                self._fenced = True
+            else:
+                self._close_slide()
+                self._state = "closed"
+            return
+
+        self._lines.append(line)
+        if self._state == "start":
+            if not line.strip():
+                return
+            if SEPARATOR.match(line):
+                self._state = "front"
+                return
+            self._state = "body"
+        elif self._state == "front":
+            if SEPARATOR.match(line):
+                self._state = "body"
+            else:
+                self.front_matter.append(line)
+            return
+
+        if SEPARATOR.match(line):
+            self.slides.append("\n".join(self._current).strip("\n"))
+            self._current = []
+        else:
+            self._current.append(line)
+
+
+    def _close_slide(self) -> None:
+        if self._state == "body" and any(line.strip() for line in self._current):
+            self.slides.append("\n".join(self._current).strip("\n"))
+        self._current = []
+
+
+    @property
+    def markdown(self) -> str:
+        """The deck so far, as `extract_markdown_content` would return it for the text seen so far
+        """
+        return "\n".join(self._lines)
+
+
+    @property
+    def writing(self) -> bool:
+        """Whether the model is currently inside a slide (past the front matter)
+        """
+        return self._state == "body"
+
+
+    def segment(self, start: int, end: Optional[int] = None) -> str:
+        """Markdown for slides[start:end] with the deck's front matter
+        """
+        header = "---\n" + "\n".join(self.front_matter) + "\n---\n\n" if self.front_matter else ""
+        return header + "\n\n---\n\n".join(self.slides[start:end]) + "\n"
+
+
+    def finish(self) -> None:
+        """Flush the last line and close the final slide
+        """
+        if self._buffer:
+            self._line(self._buffer)
+            self._buffer = ""
+        self._close_slide()
+
+
+def segmentable(parser: SlideStreamParser) -> bool:
+    """Whether slides can be rendered in separate batches and the PDFs concatenated.
+       Page numbers and comment directives depend on earlier slides, so decks using them are
+       rendered in one piece.
+    """
+    if PdfWriter is None or PAGINATE.search("\n".join(parser.front_matter)):
+        return False
+    return not any(DIRECTIVE.search(slide) for slide in parser.slides)
+
+
+def merge_pdfs(documents: list[bytes]) -> bytes:
+    writer = PdfWriter()
+    for document in documents:
+        writer.append(io.BytesIO(document))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+class ProgressThrottle:
+
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL_SECONDS):
+        """Rate limit for progress writes; the first one always goes through
+        """
+        self.interval = interval
+        self._last = float("-inf")
+
+
+    def ready(self) -> bool:
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return False
+        self._last = now
+        return True
@@ -0,0 +1,67 @@
+import time
+import asyncio
+
+import pytest
+
+from services.infra.checkpoints import JobCheckpoint, LeaseHeldError, claim_lease
+from services.infra.local import LocalBlobStore, LocalJobStore
+from services.slides.gemini_files import FakeFileAPI, GeminiFileCache
+
+
+def test_lease_blocks_duplicate_deliveries_until_it_expires():
+    """다른 전달이 유효한 임대를 가진 동안은 작업을 가져갈 수 없고, 만료되면 넘겨받는다."""
+    job = {"status": "processing", "lease": {"owner": "first", "expiresAt": 100}}
+    with pytest.raises(LeaseHeldError):
+        claim_lease(job, "second", 60, now=50)
+    assert claim_lease(job, "first", 60, now=50)["lease"] == {"owner": "first", "expiresAt": 110}
+    assert claim_lease(job, "second", 60, now=150)["lease"]["owner"] == "second"
+    # A failed job being retried must not be swept while it runs
+    assert claim_lease({"status": "failed", "expiresAt": 10}, "second", 60, now=50)["expiresAt"] == 0
+    assert claim_lease({"status": "completed"}, "second", 60, now=50) is None
+
+
+def test_local_job_store_leases_and_checkpoints(tmp_path):
+    """로컬 작업 저장소에서 임대와 체크포인트를 기록하고, 재시도 시 생성된 마크다운을 다시 읽는다."""
+    store = LocalJobStore(str(tmp_path / "jobs.db"))
+    blobs = LocalBlobStore(str(tmp_path / "blobs"))
+    store._commit([("set", "jobs", "job", {"id": "job", "status": "queued"})])
+
+    async def scenario():
+        job = await store.acquire_lease("job", "first", 60)
+        with pytest.raises(LeaseHeldError):
+            await store.acquire_lease("job", "second", 60)
+        await store.renew_lease("job", "first", 60)
+
+        checkpoint = JobCheckpoint(store, blobs, "job", job.get("checkpoint"))
+        await checkpoint.save(markdown="# Deck")
+
+        retried = await store.acquire_lease("job", "first", 60)
+        resumed = JobCheckpoint(store, blobs, "job", retried.get("checkpoint"))
+        return job, resumed.stage, await resumed.load_markdown(), await store.acquire_lease("missing", "first", 60)
+
+    job, stage, markdown, missing = asyncio.run(scenario())
+    assert "checkpoint" not in job
+    assert stage == "generated" and markdown == "# Deck"
+    assert missing is None
+
+
+def test_gemini_uploads_are_adopted_from_a_checkpoint():
+    """체크포인트에 남은 Gemini 업로드를 다른 인스턴스가 재사용하고, 곧 만료될 업로드는 무시한다."""
+    class Upload:
+        filename, type, data = "doc.pdf", "application/pdf", b"%PDF"
+
+    async def scenario():
+        first = GeminiFileCache(FakeFileAPI())
+        handles = await first.acquire([Upload()])
+        records = first.records(handles)
+
+        api = FakeFileAPI()
+        second = GeminiFileCache(api)
+        expiring = [{**records[0], "key": "other", "expiresAt": time.time() + 60}]
+        adopted = second.adopt(records + expiring)
+        reused = await second.acquire([Upload()])
+        return handles[0].uri, reused[0].uri, adopted, api.uploads
+
+    original, reused, adopted, uploads = asyncio.run(scenario())
+    assert reused == original
+    assert adopted == 1 and uploads == 0
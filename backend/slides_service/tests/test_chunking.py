@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from services.slides.chunking import build_sections, outline_sections, split_text
+from services.slides.preprocess import PreparedDocument, estimate_tokens
+
+
+def make_document(name: str, text: str | None, tokens: int = 0) -> PreparedDocument:
+    file = SimpleNamespace(filename=name, data=b"", type="text/markdown")
+    tokens = estimate_tokens(text) if text is not None else tokens
+    return PreparedDocument(file=file, text=text, original_tokens=tokens, tokens=tokens)
+
+
+def test_split_text_respects_the_token_bound_and_keeps_headings_together():
+    """큰 문서는 제목 단위로 나누고, 각 조각은 토큰 한도를 넘지 않는다."""
+    sections = [f"## Section {n}\n\n" + ("lorem ipsum dolor " * 40) for n in range(10)]
+    text = "\n".join(sections)
+
+    chunks = split_text(text, max_tokens=400)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 400 for chunk in chunks)
+    assert all(chunk.startswith("## Section") for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+
+def test_split_text_cuts_a_single_long_line():
+    """나눌 경계가 없는 긴 줄은 글자 수 기준으로 자른다."""
+    chunks = split_text("x" * 10000, max_tokens=1000)
+    assert [len(chunk) for chunk in chunks] == [4000, 4000, 2000]
+
+
+def test_build_sections_packs_small_documents_and_isolates_uploads():
+    """작은 문서들은 한 섹션에 묶고, 업로드된 파일은 각각 별도의 섹션이 된다."""
+    documents = [
+        make_document("a.md", "alpha " * 100),
+        make_document("scan.pdf", None, tokens=2580),
+        make_document("b.md", "beta " * 100),
+        make_document("big.md", "gamma delta\n\n" * 600),
+    ]
+    uploads = [SimpleNamespace(uri="https://files/scan")]
+
+    sections = build_sections(documents, uploads, max_tokens=1000)
+    assert sections[0].parts == [{"file_data": {"uri": "https://files/scan"}}]
+    assert sections[1].title == "a.md, b.md"
+    assert sections[2].title.startswith("big.md (part 1 of")
+    assert all(section.tokens <= 1000 for section in sections[1:])
+
+
+def test_outline_sections_regroups_outlines():
+    """외곽선이 여전히 크면 다시 묶어 한 번 더 요약할 수 있다."""
+    outlines = [(f"part {n}", "- point\n" * 200) for n in range(4)]
+    sections = outline_sections(outlines, max_tokens=1000)
+    assert len(sections) == 2
+    assert sections[0].title == "part 0, part 1"
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from services.slides.gemini_files import FakeFileAPI, GeminiFileCache
+
+
+def make_file(name: str, data: bytes, mime_type: str = "application/pdf"):
+    return SimpleNamespace(filename=name, data=data, type=mime_type)
+
+
+def test_identical_files_are_uploaded_once():
+    """같은 내용과 MIME 타입의 파일은 한 번만 업로드하고 핸들을 재사용한다."""
+    async def scenario():
+        api = FakeFileAPI()
+        cache = GeminiFileCache(api)
+
+        first = await cache.acquire([make_file("a.pdf", b"alpha"), make_file("b.pdf", b"beta")])
+        second = await cache.acquire([make_file("copy.pdf", b"alpha")])
+        assert api.uploads == 2
+        assert second[0].uri == first[0].uri
+
+        other_type = await cache.acquire([make_file("a.md", b"alpha", "text/markdown")])
+        assert other_type[0].uri != first[0].uri
+        assert api.uploads == 3
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_upload():
+    async def scenario():
+        api = FakeFileAPI(latency=0.05)
+        cache = GeminiFileCache(api)
+
+        results = await asyncio.gather(*(cache.acquire([make_file("a.pdf", b"alpha")]) for _ in range(5)))
+        assert api.uploads == 1
+        assert len({handles[0].uri for handles in results}) == 1
+        assert results[0][0].refs == 5
+
+    asyncio.run(scenario())
+
+
+def test_handles_close_to_expiry_are_replaced():
+    async def scenario():
+        api = FakeFileAPI(lifetime=60)
+        cache = GeminiFileCache(api)
+        cache.min_remaining = 600
+
+        first = await cache.acquire([make_file("a.pdf", b"alpha")])
+        cache.release(first)
+        second = await cache.acquire([make_file("a.pdf", b"alpha")])
+        assert api.uploads == 2
+        assert second[0].uri != first[0].uri
+
+    asyncio.run(scenario())
+
+
+def test_reaper_deletes_only_unreferenced_idle_files():
+    async def scenario():
+        api = FakeFileAPI()
+        cache = GeminiFileCache(api)
+        cache.idle_seconds = 0
+
+        idle = await cache.acquire([make_file("a.pdf", b"alpha")])
+        busy = await cache.acquire([make_file("b.pdf", b"beta")])
+        cache.release(idle)
+        idle[0].last_used = time.time() - 1
+
+        assert await cache.reap() == 1
+        assert api.deletes == 1
+        assert list(api.files) == [busy[0].name]
+
+    asyncio.run(scenario())
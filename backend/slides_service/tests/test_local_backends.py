@@ -0,0 +1,66 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from services.infra.local import LocalBlobStore, LocalJobStore
+from services.slides.fake_llm import FakeModel
+
+
+def read_document(path, collection, doc_id):
+    row = sqlite3.connect(path).execute(
+        "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def test_local_job_store_completes_jobs_atomically(tmp_path):
+    """로컬 작업 저장소는 결과 저장과 완료 처리를 하나의 트랜잭션으로 기록한다."""
+    path = str(tmp_path / "jobs.db")
+    store = LocalJobStore(path)
+    store._commit([("set", "jobs", "job", {"id": "job", "status": "queued"})])
+
+    async def scenario():
+        await store.update_job_status("job", "processing", "Working...", extra={"progress": {"slides": 1}})
+        with pytest.raises(KeyError):
+            await store.complete_job("missing", "done", "/results/missing", {})
+        await store.complete_job("job", "done", "/results/job", {"pdf": {"path": "results/job/presentation.pdf"}})
+
+    asyncio.run(scenario())
+    job = read_document(path, "jobs", "job")
+    assert job["status"] == "completed" and job["progress"] == {"slides": 1}
+    assert read_document(path, "results", "job")["pdf"]["path"] == "results/job/presentation.pdf"
+    assert read_document(path, "results", "missing") is None
+
+
+def test_local_blob_store_round_trip(tmp_path):
+    blobs = LocalBlobStore(str(tmp_path))
+    (tmp_path / "job").mkdir()
+    (tmp_path / "job" / "notes.md").write_bytes(b"# Notes")
+
+    async def scenario():
+        assert await blobs.download_file_from_gcs("job/notes.md") == (b"# Notes", "text/markdown")
+        artifact = await blobs.upload_result("job", "presentation.pdf", b"%PDF", "application/pdf")
+        await blobs.delete_file_from_gcs("job/notes.md")
+        return artifact
+
+    artifact = asyncio.run(scenario())
+    assert (tmp_path / artifact["path"]).read_bytes() == b"%PDF"
+    assert not (tmp_path / "job" / "notes.md").exists()
+
+
+def test_fake_model_is_deterministic_and_streams_the_same_deck():
+    """가짜 LLM은 같은 입력에 항상 같은 덱을 만들고, 스트리밍 결과도 동일하다."""
+    async def scenario():
+        model = FakeModel(slides=5)
+        contents = [{"role": "user", "parts": [{"text": "hello"}]}]
+        first = (await model.generate_content_async(contents=contents)).text
+        second = (await model.generate_content_async(contents=contents)).text
+        streamed = "".join([chunk.text async for chunk in await model.generate_content_async(contents=contents, stream=True)])
+        other = (await model.generate_content_async(contents=[{"role": "user", "parts": [{"text": "bye"}]}])).text
+        return first, second, streamed, other
+
+    first, second, streamed, other = asyncio.run(scenario())
+    assert first == second == streamed
+    assert first != other
+    assert first.count("\n---\n") == 2 + 4
@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from services.slides import optimize
+from services.slides.marp_pool import fake_pdf
+from services.slides.streaming import merge_pdfs
+
+
+BACKGROUND = "data:image/png;base64," + "QUJD" * 400
+
+
+def test_html_is_minified_and_shared_assets_are_stored_once():
+    """HTML은 공백과 주석을 줄이고, 반복되는 data URI와 같은 스타일 블록은 한 번만 남긴다."""
+    style = "<style>\n  /* theme */\n  section { color: red ; content: \"a  ;  b\" }\n</style>"
+    html = (
+        f"<html>\n  <head>\n    <!-- marp -->\n    {style}\n    {style}\n  </head>\n  <body>\n"
+        f"    <section style=\"background-image:url(&quot;{BACKGROUND}&quot;)\"><b>a</b> <i>b</i></section>\n"
+        f"    <section style=\"background-image:url(&quot;{BACKGROUND}&quot;)\"></section>\n"
+        "    <pre>  keep\n    indent</pre>\n  </body>\n</html>"
+    )
+    result = optimize.optimize_html(html.encode()).decode()
+
+    assert result.count(BACKGROUND) == 1
+    assert result.count("var(--asset-0)") == 2
+    assert result.count('section{color: red;content: "a  ;  b"}') == 1
+    assert "<!--" not in result and "/* theme */" not in result
+    assert "<b>a</b> <i>b</i>" in result
+    assert "<pre>  keep\n    indent</pre>" in result
+
+
+def test_optimized_artifacts_never_grow():
+    """최적화 결과가 원본보다 작지 않으면 원본을 그대로 저장한다."""
+    pdf = merge_pdfs([fake_pdf(3), fake_pdf(3)])
+    optimized, html, report = optimize.optimize_artifacts(pdf, b"<p>  x  </p>", "lossless")
+
+    assert len(optimized) <= len(pdf)
+    assert html == b"<p> x </p>"
+    assert report["savedBytes"] == report["pdf"]["originalBytes"] - report["pdf"]["bytes"] + 2
+    assert report["cpuMs"] >= 0
+
+    original, _, report = optimize.optimize_artifacts(pdf, b"<p>  x  </p>", "original")
+    assert original == pdf and report["savedBytes"] == 0
+
+
+def test_pdf_batches_share_images_and_oversized_ones_are_downsampled():
+    """이어 붙인 PDF 배치의 중복 이미지를 합치고, 압축 프리셋만 기준보다 큰 이미지를 줄인다."""
+    Image = pytest.importorskip("PIL.Image")
+    from pypdf import PdfReader
+
+    buffer = io.BytesIO()
+    Image.linear_gradient("L").resize((2560, 1440)).convert("RGB").save(buffer, "PDF", quality=95)
+    pdf = merge_pdfs([buffer.getvalue(), buffer.getvalue()])
+
+    def image_sizes(data: bytes) -> list[tuple[int, int]]:
+        return [page.images[0].image.size for page in PdfReader(io.BytesIO(data)).pages]
+
+    lossless, _, report = optimize.optimize_artifacts(pdf, b"", "lossless")
+    assert image_sizes(lossless) == [(2560, 1440)] * 2
+    assert report["pdf"]["bytes"] < report["pdf"]["originalBytes"] * 0.6
+
+    compact, _, _ = optimize.optimize_artifacts(pdf, b"", "compact")
+    assert image_sizes(compact) == [(1280, 720)] * 2
+    assert len(compact) < len(lossless)
+
+
+def test_unknown_quality_falls_back_to_the_default():
+    class Settings:
+        artifactQuality = "ultra"
+
+    assert optimize.quality_preset(Settings())[0] == optimize.DEFAULT_QUALITY
+    assert optimize.quality_preset(object())[0] == optimize.DEFAULT_QUALITY
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from services.slides.preprocess import PDF_TOKENS_PER_PAGE, compact_pages, dedupe_paragraphs, estimate_tokens, preprocess_files
+
+
+def make_file(name: str, data: bytes, mime_type: str):
+    return SimpleNamespace(filename=name, data=data, type=mime_type)
+
+
+def test_markdown_is_inlined_without_duplicate_paragraphs():
+    """텍스트 파일은 업로드 대신 인라인 텍스트로 보내고, 반복된 문단은 한 번만 남긴다."""
+    paragraph = "This paragraph is repeated verbatim across the document body."
+    raw = f"# Title\r\n\r\n{paragraph}\r\n\r\n\r\n\r\n{paragraph}\n\nclosing   words"
+    report = preprocess_files([make_file("notes.md", raw.encode(), "text/markdown")])
+
+    document = report.documents[0]
+    assert document.inline
+    assert document.text.count(paragraph) == 1
+    assert "closing words" in document.text
+    assert document.as_part()["text"].startswith("# Document: notes.md")
+    assert report.as_dict()["savedTokens"] == estimate_tokens(raw) - estimate_tokens(document.text)
+
+
+def test_running_headers_page_numbers_and_duplicate_pages_are_removed():
+    """모든 페이지에 반복되는 머리글, 페이지 번호, 중복 페이지를 제거한다."""
+    pages = [
+        "ACME Confidential\nIntro to the topic\n1",
+        "ACME Confidential\nDetails of the topic\nPage 2 of 4",
+        "ACME Confidential\nDetails of the topic\n3",
+        "ACME Confidential\nSummary of the findings\nand next steps\n4",
+        "ACME Confidential\n\n5",
+    ]
+    assert compact_pages(pages) == ["Intro to the topic", "Details of the topic", "Summary of the findings\nand next steps"]
+
+
+def test_short_paragraphs_are_not_deduplicated():
+    """짧은 문단(예: 'Summary')은 중복이어도 의미가 있을 수 있으므로 유지한다."""
+    assert dedupe_paragraphs("Summary\n\nSummary") == "Summary\n\nSummary"
+
+
+def test_unknown_types_fall_back_to_upload():
+    """지원하지 않는 형식이나 읽을 수 없는 PDF는 원본 그대로 업로드한다."""
+    report = preprocess_files([
+        make_file("image.png", b"\x89PNG", "image/png"),
+        make_file("broken.pdf", b"not a pdf", "application/pdf"),
+    ])
+    assert [doc.inline for doc in report.documents] == [False, False]
+    assert report.as_dict()["inlined"] == 0
+
+
+def test_unreadable_pdfs_are_estimated_from_their_size():
+    """PDF 텍스트 추출에 실패해도 토큰 추정치는 0이 아니라 페이지 수나 파일 크기로 계산한다."""
+    pages = b"1 0 obj << /Type /Pages /Count 2 >> 2 0 obj << /Type /Page >> 3 0 obj << /Type/Page >>"
+    report = preprocess_files([
+        make_file("truncated.pdf", b"%PDF-1.7 " + pages, "application/pdf"),
+        make_file("broken.pdf", b"x" * 4000, "application/pdf"),
+    ])
+    assert [doc.tokens for doc in report.documents] == [2 * PDF_TOKENS_PER_PAGE, 1000]
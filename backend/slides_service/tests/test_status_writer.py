@@ -0,0 +1,76 @@
+import time
+import asyncio
+
+from services.infra.status_writer import JobStatusWriter
+
+
+class RecordingFirestore:
+
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        self.latency = latency
+        self.failures = failures
+        self.writes = []
+
+
+    async def update_job_status(self, job_id, status, message, result_url="", extra=None):
+        await asyncio.sleep(self.latency)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("unavailable")
+        self.writes.append((status, message, extra))
+
+
+    async def complete_job(self, job_id, message, result_url, artifacts, extra=None):
+        await asyncio.sleep(self.latency)
+        self.writes.append(("completed", message, extra))
+
+
+def test_rapid_updates_are_coalesced_to_the_latest():
+    """짧은 간격의 진행 상황 업데이트는 합쳐서 최신 메시지만 기록한다."""
+    async def scenario():
+        firestore = RecordingFirestore()
+        writer = JobStatusWriter(firestore, "job", interval=0.05)
+        for n in range(10):
+            await writer.update(f"step {n}", progress={"slides": n})
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.15)
+        return firestore.writes
+
+    writes = asyncio.run(scenario())
+    assert 2 <= len(writes) <= 3
+    assert writes[0][1] == "step 0"
+    assert writes[-1] == ("processing", "step 9", {"progress": {"slides": 9}})
+
+
+def test_terminal_state_is_written_after_pending_progress_and_keeps_its_fields():
+    """완료 상태는 진행 중인 쓰기 뒤에 기록되며, 아직 쓰지 않은 필드를 함께 저장한다."""
+    async def scenario():
+        firestore = RecordingFirestore(latency=0.02)
+        writer = JobStatusWriter(firestore, "job", interval=10)
+        await writer.update("Starting...")
+        await asyncio.sleep(0.005)
+        await writer.update("Designing...", preprocessing={"savedTokens": 10})
+        await writer.complete("done", "/results/job", {})
+        await writer.update("late update")
+        await asyncio.sleep(0.05)
+        return firestore.writes
+
+    writes = asyncio.run(scenario())
+    assert writes == [
+        ("processing", "Starting...", {}),
+        ("completed", "done", {"preprocessing": {"savedTokens": 10}}),
+    ]
+
+
+def test_failed_state_is_retried_and_expires():
+    """실패 상태 쓰기가 일시적으로 실패하면 다시 시도하고, 만료 시각을 함께 기록한다."""
+    async def scenario():
+        firestore = RecordingFirestore(failures=1)
+        writer = JobStatusWriter(firestore, "job")
+        await writer.fail("boom")
+        return firestore.writes
+
+    [(status, message, extra)] = asyncio.run(scenario())
+    assert (status, message) == ("failed", "boom")
+    assert extra["expiresAt"] > time.time()
@@ -0,0 +1,44 @@
+from services.slides.streaming import SlideStreamParser, segmentable
+
+
+DECK = "```markdown\n---\nmarp: true\ntheme: default\n---\n\n# Title\n\n---\n\n## Agenda\n- one\n\n---\n\n## End\n```\nTrailing remarks"
+
+
+def feed_in_pieces(text: str, size: int) -> SlideStreamParser:
+    parser = SlideStreamParser()
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    parser.finish()
+    return parser
+
+
+def test_slides_are_split_at_separators_regardless_of_chunking():
+    """스트리밍 조각 크기와 관계없이 `---` 구분선 기준으로 슬라이드를 나눈다."""
+    for size in (1, 7, 64, len(DECK)):
+        parser = feed_in_pieces(DECK, size)
+        assert parser.front_matter == ["marp: true", "theme: default"]
+        assert parser.slides == ["# Title", "## Agenda\n- one", "## End"]
+
+
+def test_slides_complete_as_soon_as_the_separator_arrives():
+    """구분선이 도착하는 즉시 앞 슬라이드가 완료된 것으로 센다."""
+    parser = SlideStreamParser()
+    assert parser.feed("```markdown\n---\nmarp: true\n---\n\n# Title\n") == 0
+    assert parser.writing
+    assert parser.feed("\n---\n\n## Ag") == 1
+    assert parser.slides == ["# Title"]
+
+
+def test_markdown_matches_the_extracted_deck():
+    """파서가 재구성한 마크다운은 응답에서 추출한 마크다운과 같다."""
+    parser = feed_in_pieces("Here you go:\n" + DECK, 5)
+    lines = DECK.splitlines()
+    assert parser.markdown == "\n".join(lines[1:lines.index("```")])
+    assert parser.segment(1).startswith("---\nmarp: true\ntheme: default\n---\n\n## Agenda")
+
+
+def test_decks_with_pagination_or_directives_are_not_segmented():
+    """페이지 번호나 지시어가 있는 덱은 나눠서 렌더링하지 않는다."""
+    assert segmentable(feed_in_pieces(DECK, 16))
+    assert not segmentable(feed_in_pieces(DECK.replace("theme: default", "paginate: true"), 16))
+    assert not segmentable(feed_in_pieces(DECK.replace("## End", "<!-- backgroundColor: red -->\n## End"), 16))
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from services.infra.telemetry import span, start_trace
+
+
+def test_spans_of_threads_and_tasks_are_summarized_on_the_trace():
+    """스레드와 태스크에서 실행된 구간도 작업의 트레이스에 합산된다."""
+    def render():
+        with span("marp_render", bytes=100):
+            pass
+
+    async def scenario():
+        trace = start_trace("trace-1", "job-1")
+        await asyncio.gather(asyncio.to_thread(render), asyncio.to_thread(render))
+        with span("count_tokens") as attributes:
+            attributes["tokens"] = 42
+        return trace
+
+    trace = asyncio.run(scenario())
+    summary = trace.summary()
+    assert trace.trace_id == "trace-1"
+    assert summary["marp_render"]["count"] == 2
+    assert summary["marp_render"]["bytes"] == 200
+    assert summary["count_tokens"]["tokens"] == 42
+
+
+def test_failed_span_is_observed_with_error_outcome():
+    """예외가 발생한 구간은 error 결과로 히스토그램에 기록된다."""
+    labels = {"stage": "gcs_download", "outcome": "error"}
+    before = REGISTRY.get_sample_value("slides_service_stage_seconds_count", labels) or 0
+    with pytest.raises(RuntimeError):
+        with span("gcs_download"):
+            raise RuntimeError("boom")
+    assert REGISTRY.get_sample_value("slides_service_stage_seconds_count", labels) == before + 1
+
+
+def test_missing_trace_id_is_generated():
+    """트레이스 ID가 전달되지 않으면 새로 생성한다."""
+    async def scenario():
+        return start_trace(None, "job-2")
+
+    assert len(asyncio.run(scenario()).trace_id) == 32